@@ -0,0 +1,132 @@
+"""Отзывы и комментарии одного пользователя по всем произведениям
+
+Лента читается по составным индексам (author_id, pub_date) живых и
+архивных таблиц с курсорной пагинацией: курсор — (pub_date, id) последней
+строки страницы, следующая страница берёт строки строго «раньше» него.
+Из каждой таблицы выбирается не больше page_size + 1 строк, страница
+собирается слиянием, поэтому число запросов не зависит ни от номера
+страницы, ни от числа произведений. Название произведения и контекст
+отзыва подтягиваются тем же запросом (select_related) или одной пачкой
+для архивных строк.
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from .archive import load_comments, load_reviews
+from .models import ArchivedComment, ArchivedReview, Review
+
+
+def encode_cursor(obj):
+    position = f'{obj.pub_date.isoformat()}|{obj.id}'
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(value):
+    try:
+        pub_date, obj_id = (
+            base64.urlsafe_b64decode(value.encode()).decode().split('|')
+        )
+        position = (parse_datetime(pub_date), int(obj_id))
+    except (binascii.Error, UnicodeError, ValueError):
+        position = (None, None)
+    if position[0] is None:
+        raise NotFound('Неверный курсор.')
+    return position
+
+
+class ActivityPagination(BasePagination):
+    """Курсорная пагинация по (-pub_date, -id) над несколькими таблицами"""
+    cursor_query_param = 'cursor'
+    ordering = ('-pub_date', '-id')
+
+    def __init__(self):
+        self.page_size = api_settings.PAGE_SIZE
+
+    def paginate_sources(self, request, sources):
+        """sources — пары (queryset, load): load(rows) даёт объекты"""
+        self.request = request
+        cursor = request.query_params.get(self.cursor_query_param)
+        after = Q()
+        if cursor:
+            pub_date, obj_id = decode_cursor(cursor)
+            after = Q(pub_date__lt=pub_date) | Q(
+                pub_date=pub_date, id__lt=obj_id
+            )
+        items = []
+        for queryset, load in sources:
+            rows = queryset.filter(after).order_by(*self.ordering)
+            items.extend(load(rows[:self.page_size + 1]))
+        items.sort(key=lambda obj: (obj.pub_date, obj.id), reverse=True)
+        self.has_next = len(items) > self.page_size
+        page = items[:self.page_size]
+        self.next_cursor = encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.next_cursor,
+        )
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+
+def review_sources(user):
+    return [
+        (
+            Review.objects.filter(author=user, is_hidden=False)
+            .select_related('title'),
+            list,
+        ),
+        (ArchivedReview.objects.filter(author_id=user.id), load_reviews),
+    ]
+
+
+def attach_reviews(comments):
+    """Проставляет архивным комментариям отзывы с произведением и автором"""
+    ids = {comment.review_id for comment in comments}
+    reviews = Review.objects.filter(is_hidden=False).select_related(
+        'title', 'author'
+    ).in_bulk(ids)
+    missing = ids - set(reviews)
+    if missing:
+        reviews.update(
+            (review.id, review) for review in load_reviews(
+                ArchivedReview.objects.filter(id__in=missing)
+            )
+        )
+    for comment in comments:
+        comment.review = reviews[comment.review_id]
+    return comments
+
+
+def comment_sources(user):
+    return [
+        (
+            user.comments.filter(is_hidden=False, review__is_hidden=False)
+            .select_related('review__title', 'review__author'),
+            list,
+        ),
+        (
+            # Комментарии скрытых отзывов отсекаются до среза страницы
+            ArchivedComment.objects.filter(author_id=user.id).filter(
+                Q(review_id__in=Review.objects.filter(
+                    is_hidden=False
+                ).values('id'))
+                | Q(review_id__in=ArchivedReview.objects.values('id'))
+            ),
+            lambda rows: attach_reviews(load_comments(rows)),
+        ),
+    ]
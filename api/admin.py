@@ -1,6 +1,14 @@
 from django.contrib import admin
 
-from .models import Genre, Category, Title, User, Review
+from .models import (
+    Category,
+    Genre,
+    ModerationLog,
+    ModerationLogItem,
+    Review,
+    Title,
+    User,
+)
 
 
 class CategoryAdmin(admin.ModelAdmin):
@@ -38,7 +46,7 @@ class UserAdmin(admin.ModelAdmin):
         'username',
         'role',
         'email',
-        'confirmation_code',
+        'confirmation_code_expires',
         'bio',
         'first_name',
         'last_name'
@@ -54,8 +62,33 @@ class ReviewAdmin(admin.ModelAdmin):
         'title',
         'text',
         'score',
-        'pub_date'
+        'pub_date',
+        'is_hidden',
     )
+    list_filter = ('is_hidden',)
+    empty_value_display = '-пусто-'
+
+
+class ModerationLogItemInline(admin.TabularInline):
+    model = ModerationLogItem
+    fields = ('object_type', 'object_id', 'data')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+class ModerationLogAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'moderator',
+        'action',
+        'object_type',
+        'reviews',
+        'comments',
+        'created'
+    )
+    list_filter = ('action', 'object_type')
+    inlines = (ModerationLogItemInline,)
     empty_value_display = '-пусто-'
 
 
@@ -64,3 +97,4 @@ admin.site.register(Genre, GenreAdmin)
 admin.site.register(Title, TitleAdmin)
 admin.site.register(User, UserAdmin)
 admin.site.register(Review, ReviewAdmin)
+admin.site.register(ModerationLog, ModerationLogAdmin)
@@ -0,0 +1,257 @@
+"""Холодное хранение старых отзывов и комментариев
+
+Строки старше ARCHIVE['AFTER_DAYS'] пачками переносятся в таблицы
+ArchivedReview и ArchivedComment: текст сжимается zlib, открытыми остаются
+только колонки для поиска и сортировки. Отзыв уходит в архив лишь тогда,
+когда у него не осталось живых комментариев. Перенос не считается
+изменением данных: события, счётчики оценок и очистка шлюза его не видят.
+
+Вьюсеты с ArchiveMixin дочитывают архив после живых строк (архивные
+всегда старше), а запись в архивный объект сначала восстанавливает его.
+"""
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.http import Http404
+from django.utils import timezone
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .metrics import record_archive_read
+from .models import (
+    ArchivedComment,
+    ArchivedReview,
+    Comment,
+    Review,
+    Title,
+    User,
+)
+
+
+def compress(text):
+    return zlib.compress(text.encode(), settings.ARCHIVE['COMPRESSION_LEVEL'])
+
+
+def decompress(payload):
+    return zlib.decompress(bytes(payload)).decode()
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = settings.ARCHIVE['AFTER_DAYS']
+    return timezone.now() - timedelta(days=days)
+
+
+def _move_batches(queryset, fields, make_row, archive_model, batch_size):
+    """Переносит строки queryset пачками, каждая пачка — одна транзакция"""
+    model = queryset.model
+    moved = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                queryset.select_for_update().order_by('id')
+                .values(*fields)[:batch_size]
+            )
+            if not batch:
+                return moved
+            archive_model.objects.bulk_create(
+                [make_row(row) for row in batch]
+            )
+            # Удаление без сигналов: для читателей строка никуда не делась
+            model.objects.filter(
+                id__in=[row['id'] for row in batch]
+            )._raw_delete(model.objects.db)
+        moved += len(batch)
+
+
+def archive_comments(before, batch_size=None):
+    return _move_batches(
+        Comment.objects.filter(pub_date__lt=before, is_hidden=False),
+        ['id', 'review_id', 'author_id', 'pub_date', 'text'],
+        lambda row: ArchivedComment(
+            id=row['id'],
+            review_id=row['review_id'],
+            author_id=row['author_id'],
+            pub_date=row['pub_date'],
+            payload=compress(row['text']),
+        ),
+        ArchivedComment,
+        batch_size or settings.ARCHIVE['BATCH_SIZE'],
+    )
+
+
+def archive_reviews(before, batch_size=None):
+    return _move_batches(
+        Review.objects.filter(pub_date__lt=before, is_hidden=False).filter(
+            ~Exists(Comment.objects.filter(review_id=OuterRef('id')))
+        ),
+        ['id', 'title_id', 'author_id', 'score', 'pub_date', 'text'],
+        lambda row: ArchivedReview(
+            id=row['id'],
+            title_id=row['title_id'],
+            author_id=row['author_id'],
+            score=row['score'],
+            pub_date=row['pub_date'],
+            payload=compress(row['text']),
+        ),
+        ArchivedReview,
+        batch_size or settings.ARCHIVE['BATCH_SIZE'],
+    )
+
+
+def _restore(archive_model, rows, make_object):
+    objects = [make_object(row) for row in rows]
+    if not objects:
+        return 0
+    model = type(objects[0])
+    with transaction.atomic():
+        model.objects.bulk_create(objects)
+        # bulk_create проставляет auto_now_add, возвращаем исходные даты
+        for obj, row in zip(objects, rows):
+            obj.pub_date = row.pub_date
+        model.objects.bulk_update(objects, ['pub_date'])
+        archive_model.objects.filter(
+            id__in=[row.id for row in rows]
+        ).delete()
+    return len(objects)
+
+
+def restore_reviews(ids):
+    rows = list(ArchivedReview.objects.filter(id__in=ids))
+    return _restore(ArchivedReview, rows, lambda row: Review(
+        id=row.id,
+        title_id=row.title_id,
+        author_id=row.author_id,
+        score=row.score,
+        pub_date=row.pub_date,
+        text=decompress(row.payload),
+    ))
+
+
+def restore_comments(ids):
+    """Восстанавливает комментарии, а при необходимости и их отзывы"""
+    rows = list(ArchivedComment.objects.filter(id__in=ids))
+    restore_reviews({row.review_id for row in rows})
+    return _restore(ArchivedComment, rows, lambda row: Comment(
+        id=row.id,
+        review_id=row.review_id,
+        author_id=row.author_id,
+        pub_date=row.pub_date,
+        text=decompress(row.payload),
+    ))
+
+
+def load_reviews(rows):
+    """Несохранённые Review из архивных строк, для сериализации"""
+    rows = list(rows)
+    record_archive_read('review', len(rows))
+    authors = User.objects.in_bulk({row.author_id for row in rows})
+    titles = Title.objects.in_bulk({row.title_id for row in rows})
+    return [
+        Review(
+            id=row.id,
+            title=titles.get(row.title_id),
+            author=authors.get(row.author_id),
+            score=row.score,
+            pub_date=row.pub_date,
+            text=decompress(row.payload),
+        )
+        for row in rows
+    ]
+
+
+def load_comments(rows):
+    rows = list(rows)
+    record_archive_read('comment', len(rows))
+    authors = User.objects.in_bulk({row.author_id for row in rows})
+    return [
+        Comment(
+            id=row.id,
+            review_id=row.review_id,
+            author=authors.get(row.author_id),
+            pub_date=row.pub_date,
+            text=decompress(row.payload),
+        )
+        for row in rows
+    ]
+
+
+class ArchiveChain:
+    """Живые строки, за ними архивные — последовательность для пагинатора"""
+    ordered = True
+
+    def __init__(self, live, archived, load):
+        self.live = live
+        self.archived = archived
+        self.load = load
+        self._live_count = None
+
+    def live_count(self):
+        if self._live_count is None:
+            self._live_count = self.live.count()
+        return self._live_count
+
+    def count(self):
+        return self.live_count() + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        live_count = self.live_count()
+        items = list(self.live[start:stop]) if start < live_count else []
+        if stop is None or stop > live_count:
+            rows = self.archived[
+                max(start - live_count, 0):
+                None if stop is None else stop - live_count
+            ]
+            items.extend(self.load(rows))
+        return items
+
+
+class ArchiveMixin:
+    """Чтение архивных объектов через вьюсет, восстановление при записи"""
+
+    def get_archived_queryset(self):
+        raise NotImplementedError
+
+    def load_archived(self, rows):
+        raise NotImplementedError
+
+    def restore_archived(self, ids):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        chain = ArchiveChain(
+            self.filter_queryset(self.get_queryset()),
+            self.get_archived_queryset(),
+            self.load_archived,
+        )
+        page = self.paginate_queryset(chain)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(chain[:], many=True)
+        return Response(serializer.data)
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            row = get_object_or_404(
+                self.get_archived_queryset(),
+                pk=self.kwargs[self.lookup_url_kwarg or self.lookup_field],
+            )
+        if self.request.method not in SAFE_METHODS:
+            self.restore_archived([row.pk])
+            return super().get_object()
+        obj = self.load_archived([row])[0]
+        self.check_object_permissions(self.request, obj)
+        return obj
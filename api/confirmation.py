@@ -0,0 +1,70 @@
+"""Коды подтверждения для получения JWT-токена
+
+В базе хранится только HMAC-SHA256 кода (64 символа) и срок действия.
+Проверка идёт по email с постоянным по времени сравнением, код гасится
+при первом успешном использовании. Частичный индекс по сроку действия
+содержит только непогашенные коды, команда prune_confirmation_codes
+удаляет просроченные пачками.
+"""
+import hashlib
+import hmac
+import secrets
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from .models import User
+
+
+def make_confirmation_code():
+    return secrets.token_urlsafe(settings.CONFIRMATION_CODE_BYTES)
+
+
+def hash_confirmation_code(code):
+    return hmac.new(
+        settings.SECRET_KEY.encode(), code.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def issue_confirmation_code(user):
+    """Новый код: хеш и срок ставятся в user, сам код возвращается"""
+    code = make_confirmation_code()
+    user.confirmation_code = hash_confirmation_code(code)
+    user.confirmation_code_expires = (
+        timezone.now() + settings.CONFIRMATION_CODE_TTL
+    )
+    return code
+
+
+def consume_confirmation_code(email, code):
+    """Пользователь с действующим кодом, код при этом гасится; иначе None"""
+    user = User.objects.filter(email=email).first()
+    if (
+        user is None
+        or user.confirmation_code is None
+        or user.confirmation_code_expires <= timezone.now()
+        or not constant_time_compare(
+            user.confirmation_code, hash_confirmation_code(code)
+        )
+    ):
+        return None
+    consumed = User.objects.filter(
+        pk=user.pk, confirmation_code=user.confirmation_code
+    ).update(confirmation_code=None, confirmation_code_expires=None)
+    return user if consumed else None
+
+
+def prune_confirmation_codes(batch_size=1000):
+    expired = User.objects.filter(
+        confirmation_code__isnull=False,
+        confirmation_code_expires__lt=timezone.now(),
+    ).order_by()
+    pruned = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return pruned
+        pruned += User.objects.filter(id__in=ids).update(
+            confirmation_code=None, confirmation_code_expires=None
+        )
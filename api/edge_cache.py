@@ -0,0 +1,169 @@
+"""Заголовки для кеширующего шлюза и адресная очистка по суррогатным ключам
+
+Ответы на анонимные GET-запросы помечаются заголовками Cache-Control и
+Surrogate-Key. При записи сигналы моделей (api/signals.py) вызывают
+purge_surrogate_keys с ключами затронутых ресурсов, а бэкенд из
+настройки EDGE_CACHE очищает их в шлюзе после фиксации транзакции; те же
+ключи очищаются в кеше ответов приложения (api/response_cache.py).
+
+Поставляемый nginx (proxy_cache) очищать по Surrogate-Key не умеет, и по
+умолчанию бэкенд — DummyEdgeCache: адресная очистка в шлюзе не
+выполняется, а устаревание ответа ограничено коротким max-age
+(EDGE_CACHE['MAX_AGE']). Адресную очистку дают шлюзы с PURGE по ключам
+(Varnish с xkey, CDN) вместе с HttpPurgeEdgeCache.
+"""
+import abc
+import logging
+import threading
+import urllib.request
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+SURROGATE_KEY_HEADER = 'Surrogate-Key'
+
+TITLES_KEY = 'titles'
+GENRES_KEY = 'genres'
+CATEGORIES_KEY = 'categories'
+
+
+def title_key(title_id):
+    return f'title-{title_id}'
+
+
+def title_reviews_key(title_id):
+    return f'title-{title_id}-reviews'
+
+
+def review_comments_key(review_id):
+    return f'review-{review_id}-comments'
+
+
+class BaseEdgeCache(abc.ABC):
+    def __init__(self, **options):
+        self.options = options
+
+    @abc.abstractmethod
+    def purge(self, keys):
+        """Очищает в шлюзе ответы с любым из ключей"""
+
+
+class DummyEdgeCache(BaseEdgeCache):
+    """Шлюз без очистки (nginx proxy_cache): ответы живут до max-age"""
+
+    def purge(self, keys):
+        pass
+
+
+class LocalEdgeCache(BaseEdgeCache):
+    """Кеш шлюза в памяти процесса, для тестов и локальной разработки"""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._lock = threading.Lock()
+        self.entries = {}
+        self.purged_keys = []
+
+    def store(self, path, response):
+        keys = set(response.get(SURROGATE_KEY_HEADER, '').split())
+        with self._lock:
+            self.entries[path] = (keys, response)
+
+    def get(self, path):
+        entry = self.entries.get(path)
+        return entry[1] if entry else None
+
+    def purge(self, keys):
+        keys = set(keys)
+        with self._lock:
+            self.purged_keys.extend(sorted(keys))
+            self.entries = {
+                path: entry for path, entry in self.entries.items()
+                if not entry[0] & keys
+            }
+
+    def clear(self):
+        with self._lock:
+            self.entries = {}
+            self.purged_keys = []
+
+
+class HttpPurgeEdgeCache(BaseEdgeCache):
+    """Очистка шлюза запросом PURGE с заголовком Surrogate-Key
+
+    Подходит для шлюзов с поддержкой очистки по ключам (Varnish с xkey,
+    CDN); адрес задаётся в EDGE_CACHE['OPTIONS']['URL'].
+    """
+
+    def purge(self, keys):
+        request = urllib.request.Request(
+            self.options['URL'],
+            method='PURGE',
+            headers={SURROGATE_KEY_HEADER: ' '.join(sorted(keys))},
+        )
+        # Запись уже зафиксирована: недоступный шлюз не должен превращать
+        # её в 500, устаревание ответов в шлюзе ограничено max-age
+        try:
+            with urllib.request.urlopen(
+                request, timeout=self.options.get('TIMEOUT', 2)
+            ):
+                pass
+        except OSError as error:
+            logger.warning(
+                'Не удалось очистить ключи %s в шлюзе: %s',
+                ' '.join(sorted(keys)), error,
+            )
+
+
+@lru_cache(maxsize=None)
+def get_edge_cache():
+    backend = import_string(settings.EDGE_CACHE['BACKEND'])
+    return backend(**settings.EDGE_CACHE.get('OPTIONS', {}))
+
+
+def purge_surrogate_keys(keys):
+    """После коммита очищает ключи в шлюзе и в кеше ответов приложения"""
+    # api/response_cache.py сам импортирует этот модуль
+    from .response_cache import purge_cached_responses
+
+    keys = set(keys)
+    if not keys:
+        return
+
+    def purge():
+        purge_cached_responses(keys)
+        get_edge_cache().purge(keys)
+
+    transaction.on_commit(purge)
+
+
+class EdgeCacheMixin:
+    """Заголовки кеширования ответов вьюсета для шлюза"""
+
+    def get_surrogate_keys(self):
+        return []
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if request.method not in SAFE_METHODS or response.status_code != 200:
+            return response
+        patch_vary_headers(response, ['Authorization'])
+        if request.auth is not None:
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        max_age = settings.EDGE_CACHE['MAX_AGE']
+        patch_cache_control(
+            response, public=True, max_age=max_age, s_maxage=max_age
+        )
+        keys = self.get_surrogate_keys()
+        if keys:
+            response[SURROGATE_KEY_HEADER] = ' '.join(keys)
+        return response
@@ -0,0 +1,324 @@
+"""Лента изменений отзывов и комментариев в формате Server-Sent Events
+
+Источник событий — таблица ChangeEvent. Для ASGI-сервера лента отдаётся
+приложением event_stream_app: один общий опросчик (EventHub) на процесс
+читает новые события и раздаёт их подписчикам, поэтому простаивающие
+подписчики не создают нагрузки на базу. На PostgreSQL опросчик
+просыпается по LISTEN/NOTIFY. Приложение обслуживает отдельный сервис
+events под uvicorn, nginx направляет в него путь потока. WSGI-воркеры
+поток не держат: представление event_stream отвечает 503 с адресом
+опроса /events/?after=. Клиент переподключается с заголовком
+Last-Event-ID; накопившиеся события отдаются только по курсору, новый
+подписчик без курсора получает события с момента подключения.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs, urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from .models import ChangeEvent
+from .serializers import ChangeEventSerializer
+from .signals import EVENTS_CHANNEL
+
+EVENT_STREAM_BATCH = 500
+
+
+class StreamParamsError(ValueError):
+    pass
+
+
+def parse_stream_params(params, last_event_id=None):
+    """Фильтры и курсор потока: title, review, after или Last-Event-ID"""
+    parsed = {}
+    for name in ('title', 'review', 'after'):
+        value = params.get(name)
+        if name == 'after' and last_event_id:
+            value = last_event_id
+        if value in (None, ''):
+            parsed[name] = None
+            continue
+        try:
+            parsed[name] = int(value)
+        except (TypeError, ValueError):
+            raise StreamParamsError(
+                f'Параметр {name} должен быть целым числом.'
+            )
+    return parsed
+
+
+def event_matches(event, title=None, review=None, **kwargs):
+    return (
+        (title is None or event.title_id == title)
+        and (review is None or event.review_id == review)
+    )
+
+
+def fetch_events(after, title=None, review=None, limit=EVENT_STREAM_BATCH):
+    queryset = ChangeEvent.objects.filter(id__gt=after)
+    if title is not None:
+        queryset = queryset.filter(title_id=title)
+    if review is not None:
+        queryset = queryset.filter(review_id=review)
+    return list(queryset.order_by('id')[:limit])
+
+
+def latest_event_id():
+    return (
+        ChangeEvent.objects.order_by('-id')
+        .values_list('id', flat=True).first()
+    ) or 0
+
+
+def format_event(event):
+    data = JSONRenderer().render(ChangeEventSerializer(event).data)
+    return (
+        f'id: {event.id}\n'
+        f'event: {event.object_type}.{event.action}\n'
+        f'data: {data.decode()}\n\n'
+    ).encode()
+
+
+KEEPALIVE = b': keepalive\n\n'
+STREAM_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',
+}
+
+
+def event_stream(request):
+    """Поток событий под WSGI не отдаётся
+
+    Подписка держала бы поток воркера gunicorn всё время соединения, и
+    несколько десятков открытых вкладок заняли бы все потоки. Поток
+    обслуживает ASGI-сервис events (api_yamdb/asgi.py), сюда запрос
+    попадает только в обход nginx: клиент получает 503 и адрес опроса
+    ленты со своим курсором.
+    """
+    try:
+        params = parse_stream_params(
+            request.GET, request.META.get('HTTP_LAST_EVENT_ID')
+        )
+    except StreamParamsError as error:
+        return JsonResponse({'message': str(error)}, status=400)
+    if params['after'] is None:
+        params['after'] = latest_event_id()
+    query = urlencode({
+        name: value for name, value in params.items() if value is not None
+    })
+    response = JsonResponse({
+        'message': 'Поток событий недоступен, опрашивайте ленту.',
+        'poll': f'{reverse("events-list")}?{query}',
+    }, status=503)
+    response['Retry-After'] = settings.EVENT_STREAM_POLL_INTERVAL
+    return response
+
+
+class Subscriber:
+    def __init__(self, queue_size):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class EventHub:
+    """Общий для процесса опросчик таблицы событий"""
+
+    def __init__(self, poll_interval=None, queue_size=None):
+        self.poll_interval = (
+            poll_interval or settings.EVENT_STREAM_POLL_INTERVAL
+        )
+        self.queue_size = queue_size or settings.EVENT_STREAM_QUEUE_SIZE
+        self.subscribers = set()
+        self.last_id = None
+        self._task = None
+        self._wakeup = None
+        self._listener = None
+
+    def subscribe(self):
+        subscriber = Subscriber(self.queue_size)
+        self.subscribers.add(subscriber)
+        if (self._task is None or self._task.done()
+                or self._task.get_loop() is not asyncio.get_event_loop()):
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    @staticmethod
+    def _connect(params):
+        import psycopg2
+
+        listener = psycopg2.connect(**params)
+        listener.autocommit = True
+        with listener.cursor() as cursor:
+            cursor.execute(f'LISTEN {EVENTS_CHANNEL}')
+        return listener
+
+    async def _listen(self):
+        if connection.vendor != 'postgresql':
+            return
+        # Подключение блокирующее: в пуле потоков, чтобы не стоял цикл
+        # событий со всеми открытыми потоками
+        loop = asyncio.get_event_loop()
+        listener = await loop.run_in_executor(
+            None, self._connect, connection.get_connection_params()
+        )
+        loop.add_reader(listener.fileno(), self._on_notify)
+        self._listener = listener
+
+    def _unlisten(self):
+        if self._listener is None:
+            return
+        asyncio.get_event_loop().remove_reader(self._listener.fileno())
+        self._listener.close()
+        self._listener = None
+
+    def _on_notify(self):
+        self._listener.poll()
+        self._listener.notifies.clear()
+        self._wakeup.set()
+
+    async def _wait(self):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    def _publish(self, events):
+        for event in events:
+            self.last_id = event.id
+            for subscriber in list(self.subscribers):
+                try:
+                    subscriber.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    subscriber.dropped = True
+                    self.unsubscribe(subscriber)
+
+    async def _run(self):
+        self.last_id = await sync_to_async(
+            latest_event_id, thread_sensitive=True
+        )()
+        await self._listen()
+        try:
+            while self.subscribers:
+                await self._wait()
+                events = await sync_to_async(
+                    fetch_events, thread_sensitive=True
+                )(self.last_id)
+                self._publish(events)
+        finally:
+            self._unlisten()
+
+
+hub = EventHub()
+
+
+async def _wait_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def _send_body(send, body):
+    await send({
+        'type': 'http.response.body', 'body': body, 'more_body': True,
+    })
+
+
+async def _reject(send, message):
+    await send({
+        'type': 'http.response.start',
+        'status': 400,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': json.dumps({'message': message}).encode(),
+    })
+
+
+async def _replay(send, params):
+    """Отдаёт накопившиеся после курсора события, возвращает новый курсор
+
+    Без курсора клиент ничего не пропускал: курсором становится последнее
+    событие, и таблица целиком не пересылается.
+    """
+    cursor = params['after']
+    if cursor is None:
+        return await sync_to_async(
+            latest_event_id, thread_sensitive=True
+        )()
+    while True:
+        backlog = await sync_to_async(
+            fetch_events, thread_sensitive=True
+        )(cursor, params['title'], params['review'])
+        for event in backlog:
+            cursor = event.id
+            await _send_body(send, format_event(event))
+        if len(backlog) < EVENT_STREAM_BATCH:
+            return cursor
+
+
+async def _forward(send, subscriber, disconnect, params, cursor):
+    """Пересылает клиенту события из очереди подписчика"""
+    while not disconnect.done():
+        if subscriber.dropped and subscriber.queue.empty():
+            return
+        get = asyncio.ensure_future(subscriber.queue.get())
+        done, _ = await asyncio.wait(
+            {get, disconnect},
+            timeout=settings.EVENT_STREAM_KEEPALIVE,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        if get not in done:
+            get.cancel()
+            if not disconnect.done():
+                await _send_body(send, KEEPALIVE)
+            continue
+        event = get.result()
+        if event.id > cursor and event_matches(event, **params):
+            cursor = event.id
+            await _send_body(send, format_event(event))
+
+
+async def event_stream_app(scope, receive, send):
+    """Поток событий для ASGI-сервера"""
+    headers = dict(scope['headers'])
+    query = {
+        key: values[-1]
+        for key, values in parse_qs(scope['query_string'].decode()).items()
+    }
+    last_event_id = headers.get(b'last-event-id', b'').decode() or None
+    try:
+        params = parse_stream_params(query, last_event_id)
+    except StreamParamsError as error:
+        await _reject(send, str(error))
+        return
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'text/event-stream')] + [
+            (name.lower().encode(), value.encode())
+            for name, value in STREAM_HEADERS.items()
+        ],
+    })
+    subscriber = hub.subscribe()
+    disconnect = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        cursor = await _replay(send, params)
+        await _forward(send, subscriber, disconnect, params, cursor)
+    finally:
+        hub.unsubscribe(subscriber)
+        disconnected = disconnect.done()
+        disconnect.cancel()
+    if not disconnected:
+        await send({'type': 'http.response.body', 'body': b''})
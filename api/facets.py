@@ -0,0 +1,214 @@
+"""Счётчики произведений по жанрам, категориям и десятилетиям
+
+Для произвольных фильтров TitleFilter все три фасета считаются одним
+сгруппированным запросом (UNION ALL трёх GROUP BY по отфильтрованным id).
+Запросы без фильтров и с фильтром только по категории — самые частые на
+странице каталога — читают готовые счётчики FacetCount. Счётчики ведутся
+в разрезе категории и сдвигаются сигналами (api/signals.py) при создании,
+изменении и удалении произведений, их жанров и категорий; массовые
+загрузки в обход сигналов исправляет команда rebuild_facet_counts.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import CharField, Count, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import (
+    NO_CATEGORY,
+    Category,
+    FacetCount,
+    Facets,
+    Genre,
+    Title,
+)
+
+# Фильтры, при которых хватает готовых счётчиков
+STORED_FILTERS = {'category'}
+
+
+def decade(year):
+    return year // 10 * 10
+
+
+def title_facets(category_id, year, genre_ids=()):
+    """Ключи (category_id, facet, value) счётчиков одного произведения"""
+    key = category_id or NO_CATEGORY
+    facets = [(key, Facets.GENRE, genre_id) for genre_id in genre_ids]
+    if category_id:
+        facets.append((key, Facets.CATEGORY, category_id))
+    if year is not None:
+        facets.append((key, Facets.DECADE, decade(year)))
+    return facets
+
+
+def genre_facets(instance, pk_set=None):
+    """Ключи счётчиков для существующих связей произведений с жанрами
+
+    instance — произведение или жанр (обратная сторона m2m), pk_set —
+    id другой стороны, None — все связи.
+    """
+    links = Title.genre.through.objects.all()
+    if isinstance(instance, Title):
+        links, other = links.filter(title_id=instance.id), 'genre_id'
+    else:
+        links, other = links.filter(genre_id=instance.id), 'title_id'
+    if pk_set is not None:
+        links = links.filter(**{f'{other}__in': pk_set})
+    return [
+        (category_id or NO_CATEGORY, Facets.GENRE, genre_id)
+        for category_id, genre_id in links.values_list(
+            'title__category_id', 'genre_id'
+        )
+    ]
+
+
+def change_facet_counts(added=(), removed=()):
+    """Сдвигает счётчики: по UPDATE на ключ, новый ключ создаётся"""
+    changes = Counter(added)
+    changes.subtract(removed)
+    for (category_id, facet, value), delta in changes.items():
+        if not delta:
+            continue
+        counts = FacetCount.objects.filter(
+            category_id=category_id, facet=facet, value=value
+        )
+        if counts.update(count=F('count') + delta) or delta < 0:
+            continue
+        try:
+            with transaction.atomic():
+                FacetCount.objects.create(
+                    category_id=category_id, facet=facet, value=value,
+                    count=delta,
+                )
+        except IntegrityError:
+            counts.update(count=F('count') + delta)
+
+
+def move_category_facets(category_id):
+    """Переносит счётчики удалённой категории в «без категории»"""
+    counts = FacetCount.objects.filter(category_id=category_id)
+    moved = [
+        ((NO_CATEGORY, facet, value), count)
+        for facet, value, count in counts.exclude(
+            facet=Facets.CATEGORY
+        ).values_list('facet', 'value', 'count')
+    ]
+    counts.delete()
+    change_facet_counts(added=Counter(dict(moved)))
+
+
+def grouped_counts(parts):
+    """UNION ALL сгруппированных запросов: строки (facet, value, count)"""
+    querysets = [
+        queryset.values(value=value).annotate(
+            facet=Value(facet, output_field=CharField()),
+            count=Count('*'),
+        ).order_by()
+        for facet, queryset, value in parts
+    ]
+    rows = querysets[0].union(*querysets[1:], all=True)
+    return [(row['facet'], row['value'], row['count']) for row in rows]
+
+
+def query_facet_counts(titles):
+    """Фасеты для произвольно отфильтрованных произведений, один запрос"""
+    ids = titles.order_by().values('id')
+    return grouped_counts([
+        (
+            Facets.GENRE,
+            Title.genre.through.objects.filter(title_id__in=ids),
+            F('genre_id'),
+        ),
+        (
+            Facets.CATEGORY,
+            Title.objects.filter(id__in=ids, category__isnull=False),
+            F('category_id'),
+        ),
+        (
+            Facets.DECADE,
+            Title.objects.filter(id__in=ids, year__isnull=False),
+            F('year') / 10 * 10,
+        ),
+    ])
+
+
+def stored_facet_counts(category_slugs=None):
+    counts = FacetCount.objects.all()
+    if category_slugs:
+        counts = counts.filter(category_id__in=Category.objects.filter(
+            slug__in=category_slugs
+        ).values('id'))
+    return list(
+        counts.values('facet', 'value')
+        .annotate(total=Sum('count'))
+        .filter(total__gt=0)
+        .order_by()
+        .values_list('facet', 'value', 'total')
+    )
+
+
+def represent_facets(rows):
+    """Ответ API: жанры и категории со slug и названием, десятилетия"""
+    ids = {facet: set() for facet in Facets.values}
+    for facet, value, _ in rows:
+        ids[facet].add(value)
+    labels = {
+        Facets.GENRE: Genre.objects.in_bulk(ids[Facets.GENRE]),
+        Facets.CATEGORY: Category.objects.in_bulk(ids[Facets.CATEGORY]),
+    }
+    data = {facet: [] for facet in Facets.values}
+    for facet, value, count in rows:
+        if facet == Facets.DECADE:
+            data[facet].append({'decade': value, 'count': count})
+        elif value in labels[facet]:
+            obj = labels[facet][value]
+            data[facet].append(
+                {'slug': obj.slug, 'name': obj.name, 'count': count}
+            )
+    data[Facets.DECADE].sort(key=lambda item: item['decade'])
+    for facet in (Facets.GENRE, Facets.CATEGORY):
+        data[facet].sort(key=lambda item: (-item['count'], item['name']))
+    return data
+
+
+def rebuild_facet_counts(batch_size=1000):
+    """Пересчитывает все счётчики тремя сгруппированными запросами"""
+    category = Coalesce('category_id', Value(NO_CATEGORY))
+    parts = [
+        (
+            Facets.GENRE,
+            Title.genre.through.objects.values(
+                key=Coalesce('title__category_id', Value(NO_CATEGORY)),
+                value=F('genre_id'),
+            ),
+        ),
+        (
+            Facets.CATEGORY,
+            Title.objects.filter(category__isnull=False).values(
+                key=category, value=F('category_id'),
+            ),
+        ),
+        (
+            Facets.DECADE,
+            Title.objects.filter(year__isnull=False).values(
+                key=category, value=F('year') / 10 * 10,
+            ),
+        ),
+    ]
+    counts = [
+        FacetCount(
+            category_id=row['key'], facet=facet, value=row['value'],
+            count=row['count'],
+        )
+        for facet, queryset in parts
+        for row in queryset.annotate(count=Count('*')).order_by()
+    ]
+    # bulk_create в Django 3.0 сам не ограничивает пачку числом параметров
+    batch_size = min(batch_size, max(connection.ops.bulk_batch_size(
+        ['category_id', 'facet', 'value', 'count'], counts
+    ), 1))
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create(counts, batch_size=batch_size)
+    return len(counts)
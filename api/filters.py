@@ -1,19 +1,58 @@
 import django_filters as filters
+from django.db.models import Count
 
-from .models import Title
+from .models import ChangeEvent, Title
+
+
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    pass
 
 
 class TitleFilter(filters.FilterSet):
-    category = filters.CharFilter(
-        field_name='category__slug', lookup_expr='exact',
-    )
-    genre = filters.CharFilter(
-        field_name='genre__slug', lookup_expr='exact',
+    category = CharInFilter(
+        field_name='category__slug', lookup_expr='in',
     )
+    genre = CharInFilter(method='filter_genre_any')
+    genre_all = CharInFilter(method='filter_genre_all')
     name = filters.CharFilter(
         field_name='name', lookup_expr='icontains',
     )
+    year_min = filters.NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = filters.NumberFilter(field_name='year', lookup_expr='lte')
+    rating_min = filters.NumberFilter(field_name='rating', lookup_expr='gte')
 
     class Meta:
         model = Title
         fields = ['name', 'category', 'genre', 'year']
+
+    @staticmethod
+    def _titles_with_genres(slugs):
+        return Title.genre.through.objects.filter(genre__slug__in=slugs)
+
+    def filter_genre_any(self, queryset, name, value):
+        """Произведения хотя бы одного из жанров"""
+        return queryset.filter(
+            id__in=self._titles_with_genres(value).values('title_id')
+        )
+
+    def filter_genre_all(self, queryset, name, value):
+        """Произведения, относящиеся ко всем перечисленным жанрам"""
+        slugs = set(value)
+        title_ids = (
+            self._titles_with_genres(slugs)
+            .values('title_id')
+            .annotate(matched=Count('genre_id'))
+            .filter(matched=len(slugs))
+            .values('title_id')
+        )
+        return queryset.filter(id__in=title_ids)
+
+
+class ChangeEventFilter(filters.FilterSet):
+    title = filters.NumberFilter(field_name='title_id')
+    review = filters.NumberFilter(field_name='review_id')
+    after = filters.NumberFilter(field_name='id', lookup_expr='gt')
+
+    class Meta:
+        model = ChangeEvent
+        fields = ['title', 'review', 'after']
@@ -0,0 +1,56 @@
+"""Кеш сериализованных представлений произведений
+
+Ключ фрагмента — id произведения, его версия и рейтинг. Версию
+увеличивают сигналы при изменении произведения, его жанров, а также
+переименовании или удалении жанра и категории (api/signals.py). Рейтинг
+входит в ключ сам, поэтому новые отзывы не требуют записи в Title.
+Ключи страницы выбираются лёгким запросом, фрагменты читаются одним
+get_many, а из базы загружаются и сериализуются только промахи.
+
+Устаревшие фрагменты не удаляются: они вытесняются по LRU
+(LocMemCache с MAX_ENTRIES из настройки CACHES['titles']).
+"""
+from django.core.cache import caches
+
+from .metrics import record_cache_lookup
+
+TITLES_CACHE = 'titles'
+# Увеличить при изменении формата TitleListSerializer
+FRAGMENT_FORMAT = 1
+
+
+def fragment_key(title_id, version, rating):
+    return f'title:{FRAGMENT_FORMAT}:{title_id}:{version}:{rating}'
+
+
+def key_rows(queryset):
+    """Лёгкий queryset строк (id, version, rating) вместо произведений"""
+    return queryset.prefetch_related(None).values_list(
+        'id', 'version', 'rating'
+    )
+
+
+def render_titles(rows, load, serialize):
+    """Фрагменты для строк key_rows; промахи сериализуются и кешируются
+
+    load(ids) возвращает queryset произведений, serialize(objects) — список
+    представлений с полем id.
+    """
+    cache = caches[TITLES_CACHE]
+    keys = [
+        (title_id, fragment_key(title_id, version, rating))
+        for title_id, version, rating in rows
+    ]
+    fragments = cache.get_many([key for _, key in keys])
+    misses = {
+        title_id: key for title_id, key in keys if key not in fragments
+    }
+    record_cache_lookup(TITLES_CACHE, len(keys) - len(misses), len(misses))
+    if misses:
+        rendered = {
+            misses[item['id']]: item
+            for item in serialize(list(load(list(misses))))
+        }
+        cache.set_many(rendered)
+        fragments.update(rendered)
+    return [fragments[key] for _, key in keys if key in fragments]
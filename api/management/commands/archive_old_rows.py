@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from api.archive import archive_comments, archive_cutoff, archive_reviews
+from api.models import Comment, Review
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые комментарии и отзывы в холодное хранение'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Возраст строк в днях (по умолчанию ARCHIVE["AFTER_DAYS"])',
+        )
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать строки старше порога',
+        )
+
+    def handle(self, *args, **options):
+        before = archive_cutoff(options['days'])
+        if options['dry_run']:
+            comments = Comment.objects.filter(pub_date__lt=before).count()
+            reviews = Review.objects.filter(pub_date__lt=before).count()
+            self.stdout.write(
+                f'Старше {before:%Y-%m-%d}: комментариев {comments}, '
+                f'отзывов {reviews}'
+            )
+            return
+        comments = archive_comments(before, options['batch_size'])
+        reviews = archive_reviews(before, options['batch_size'])
+        self.stdout.write(
+            f'Перенесено в архив: комментариев {comments}, отзывов {reviews}'
+        )
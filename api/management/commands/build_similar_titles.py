@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.similarity import build_similar_titles, changed_title_ids
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает таблицу похожих произведений'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--titles',
+            help='ID произведений через запятую (по умолчанию — все)',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Только произведения, изменённые с прошлого расчёта',
+        )
+        parser.add_argument('--top-k', type=int, default=None)
+
+    def handle(self, *args, **options):
+        title_ids = None
+        if options['titles']:
+            try:
+                title_ids = {
+                    int(value) for value in options['titles'].split(',')
+                }
+            except ValueError:
+                raise CommandError('ID произведений должны быть числами.')
+        elif options['incremental']:
+            title_ids = changed_title_ids()
+        created = build_similar_titles(title_ids, top_k=options['top_k'])
+        self.stdout.write(f'Сохранено пар похожих произведений: {created}')
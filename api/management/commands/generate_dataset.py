@@ -0,0 +1,91 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Category, Genre, Title
+from api.synthetic import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет пустую базу детерминированным синтетическим набором '
+        'и записывает смесь запросов для воспроизведения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0)
+        for name, default in (
+            ('categories', 10), ('genres', 30), ('users', 1000),
+            ('titles', 2000), ('reviews', 20000), ('comments', 20000),
+        ):
+            parser.add_argument(f'--{name}', type=int, default=default)
+        parser.add_argument(
+            '--title-exponent', type=float, default=1.1,
+            help='Показатель Ципфа для числа отзывов на произведение',
+        )
+        parser.add_argument(
+            '--user-exponent', type=float, default=1.2,
+            help='Показатель степенного закона активности пользователей',
+        )
+        parser.add_argument(
+            '--thread-exponent', type=float, default=1.0,
+            help='Показатель Ципфа для длины веток комментариев',
+        )
+        parser.add_argument(
+            '--days', type=int, default=3 * 365,
+            help='За сколько дней до --end разбросаны даты',
+        )
+        parser.add_argument(
+            '--end', type=date.fromisoformat,
+            help='День отсчёта дат (YYYY-MM-DD), по умолчанию сегодня',
+        )
+        parser.add_argument('--batch-size', type=int, default=50000)
+        parser.add_argument(
+            '--requests-file',
+            help='Куда записать смесь запросов (JSON Lines)',
+        )
+        parser.add_argument('--requests', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        if min(options['categories'], options['genres'], options['users'],
+               options['titles']) < 1:
+            raise CommandError(
+                'Нужны хотя бы одна категория, жанр, пользователь '
+                'и произведение.'
+            )
+        if any(model.objects.exists() for model in (Category, Genre, Title)):
+            raise CommandError(
+                'Каталог не пуст: набор генерируется только в пустую базу.'
+            )
+        generator = DatasetGenerator(
+            seed=options['seed'],
+            categories=options['categories'],
+            genres=options['genres'],
+            users=options['users'],
+            titles=options['titles'],
+            reviews=options['reviews'],
+            comments=options['comments'],
+            title_exponent=options['title_exponent'],
+            user_exponent=options['user_exponent'],
+            thread_exponent=options['thread_exponent'],
+            days=options['days'],
+            end=options['end'],
+            batch_size=options['batch_size'],
+        )
+        report = generator.generate()
+        rows = report.reviews + report.comments
+        self.stdout.write(
+            f'Создано категорий: {report.categories}, жанров: '
+            f'{report.genres}, пользователей: {report.users}, произведений: '
+            f'{report.titles}, отзывов: {report.reviews}, комментариев: '
+            f'{report.comments} за {report.seconds:.1f} с '
+            f'({rows / report.seconds:.0f} отзывов и комментариев в секунду)'
+        )
+        if options['requests_file']:
+            generator.write_request_mix(
+                options['requests_file'], options['requests']
+            )
+            self.stdout.write(
+                f'Смесь запросов: {options["requests"]} строк в '
+                f'{options["requests_file"]}'
+            )
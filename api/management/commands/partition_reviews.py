@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.partitioning import partition_reviews_comments
+
+
+class Command(BaseCommand):
+    help = (
+        'Секционирует таблицы отзывов и комментариев в PostgreSQL; '
+        'запускать при остановленных воркерах'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions',
+            type=int,
+            default=settings.REVIEW_PARTITIONS,
+            help='Число хеш-секций (по умолчанию REVIEW_PARTITIONS)',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Секционирование доступно только в PostgreSQL')
+        if options['partitions'] < 1:
+            raise CommandError(
+                'Укажите --partitions или REVIEW_PARTITIONS больше нуля'
+            )
+        tables = partition_reviews_comments(connection, options['partitions'])
+        if tables:
+            self.stdout.write(f'Секционированы таблицы: {", ".join(tables)}')
+        else:
+            self.stdout.write('Таблицы уже секционированы')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.confirmation import prune_confirmation_codes
+
+
+class Command(BaseCommand):
+    help = 'Гасит просроченные коды подтверждения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        pruned = prune_confirmation_codes(options['batch_size'])
+        self.stdout.write(f'Погашено просроченных кодов: {pruned}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.facets import rebuild_facet_counts
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики фасетов каталога произведений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = rebuild_facet_counts(batch_size=options['batch_size'])
+        self.stdout.write(f'Пересчитано счётчиков: {total}')
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.stats import rebuild_title_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает распределения оценок произведений'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--titles',
+            help='ID произведений через запятую, по умолчанию все',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--chunk-size', type=int, default=100000,
+            help='Строк отзывов, читаемых с сервера за раз',
+        )
+
+    def handle(self, *args, **options):
+        title_ids = None
+        if options['titles']:
+            try:
+                title_ids = {
+                    int(value) for value in options['titles'].split(',')
+                }
+            except ValueError:
+                raise CommandError('ID произведений должны быть числами.')
+        report = rebuild_title_stats(
+            title_ids,
+            batch_size=options['batch_size'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(
+            f'Пересчитано произведений: {report.titles}, '
+            f'изменено: {report.changed}, прочитано отзывов: {report.rows} '
+            f'({report.rows_per_second:.0f} строк/с)'
+        )
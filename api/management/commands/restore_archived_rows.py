@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.archive import restore_comments, restore_reviews
+from api.models import ArchivedComment, ArchivedReview, Review
+
+
+class Command(BaseCommand):
+    help = 'Возвращает отзывы и комментарии из холодного хранения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--titles',
+            help='ID произведений через запятую: все их архивные отзывы '
+                 'и комментарии',
+        )
+        parser.add_argument(
+            '--all', action='store_true', help='Весь архив',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        reviews = ArchivedReview.objects.order_by('id')
+        comments = ArchivedComment.objects.order_by('id')
+        if options['titles']:
+            try:
+                title_ids = {
+                    int(value) for value in options['titles'].split(',')
+                }
+            except ValueError:
+                raise CommandError('ID произведений должны быть числами.')
+            reviews = reviews.filter(title_id__in=title_ids)
+            # Отзывы восстанавливаются первыми, поэтому комментарии
+            # ищутся по уже живым отзывам произведений
+            comments = comments.filter(review_id__in=Review.objects.filter(
+                title_id__in=title_ids
+            ).values('id'))
+        elif not options['all']:
+            raise CommandError('Укажите --titles или --all.')
+        batch_size = options['batch_size']
+        restored_reviews = self._in_batches(
+            reviews, restore_reviews, batch_size
+        )
+        restored_comments = self._in_batches(
+            comments, restore_comments, batch_size
+        )
+        self.stdout.write(
+            f'Восстановлено: отзывов {restored_reviews}, '
+            f'комментариев {restored_comments}'
+        )
+
+    @staticmethod
+    def _in_batches(queryset, restore, batch_size):
+        restored = 0
+        while True:
+            ids = list(queryset.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return restored
+            restored += restore(ids)
@@ -0,0 +1,47 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.sql_profiler import load_report
+
+SORT_FIELDS = ('total_ms', 'p95_ms', 'count', 'mean_ms')
+
+
+class Command(BaseCommand):
+    help = 'Рейтинг SQL-запросов по представлениям из файлов профилировщика'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.SQL_PROFILER['DIR'])
+        parser.add_argument(
+            '--sort', choices=SORT_FIELDS, default='total_ms',
+        )
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--json', dest='json_path',
+            help='Сохранить полный отчёт в JSON-файл',
+        )
+        parser.add_argument(
+            '--explain', action='store_true',
+            help='Печатать планы медленных запросов',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            rows = load_report(options['dir'])
+        except FileNotFoundError:
+            raise CommandError(f'Нет каталога {options["dir"]}')
+        rows.sort(key=lambda row: row[options['sort']], reverse=True)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as file:
+                json.dump(rows, file, ensure_ascii=False, indent=2)
+        for row in rows[:options['limit']]:
+            self.stdout.write(
+                f'{row["total_ms"]:10.1f} ms  {row["count"]:7d}x  '
+                f'p95 {row["p95_ms"]:8.2f} ms  {row["view"]}  '
+                f'[{row["fingerprint"]}]'
+            )
+            self.stdout.write(f'    {row["sql"][:300]}')
+            if options['explain'] and row['explain']:
+                for line in row['explain'].splitlines():
+                    self.stdout.write(f'      {line}')
@@ -0,0 +1,184 @@
+"""Профилирование памяти воркера через tracemalloc
+
+Трассировка включается по требованию в конкретном процессе: запросом к
+/api/v1/diagnostics/memory/ (отвечает тот воркер, который принял запрос,
+его pid есть в ответе) или сигналом MEMORY_PROFILER['SIGNAL'] нужному
+воркеру. Первый сигнал включает трассировку, каждый следующий делает
+снимок и пишет в лог крупнейшие места выделения памяти и разницу с
+предыдущим снимком. Снимки хранятся в памяти процесса, не больше
+MEMORY_PROFILER['MAX_SNAPSHOTS'].
+
+Обработчик сигнала только ставит запрос в очередь: сигнал может прийти,
+пока тот же поток держит блокировку профилировщика, поэтому снимок делает
+отдельный поток воркера.
+"""
+import itertools
+import logging
+import os
+import queue
+import signal
+import threading
+import tracemalloc
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import timezone
+
+from .metrics import current_rss
+
+logger = logging.getLogger(__name__)
+
+KEY_TYPES = ('lineno', 'filename', 'traceback')
+
+
+def _statistic(stat):
+    frame = stat.traceback[0]
+    return {
+        'file': frame.filename,
+        'line': frame.lineno,
+        'size': stat.size,
+        'count': stat.count,
+    }
+
+
+def _difference(stat):
+    return {
+        **_statistic(stat),
+        'size_diff': stat.size_diff,
+        'count_diff': stat.count_diff,
+    }
+
+
+class MemoryProfiler:
+    def __init__(self, options):
+        self.options = options
+        self.snapshots = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # put() у SimpleQueue реентерабелен и безопасен в обработчике сигнала
+        self._signals = queue.SimpleQueue()
+        self._signal_worker = None
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not self.tracing:
+            tracemalloc.start(self.options['FRAMES'])
+
+    def stop(self):
+        with self._lock:
+            self.snapshots.clear()
+        tracemalloc.stop()
+
+    def status(self):
+        current, peak = (
+            tracemalloc.get_traced_memory() if self.tracing else (0, 0)
+        )
+        return {
+            'pid': os.getpid(),
+            'tracing': self.tracing,
+            'rss': current_rss(),
+            'traced_current': current,
+            'traced_peak': peak,
+            'snapshots': [
+                {'id': snapshot_id, 'taken': taken}
+                for snapshot_id, (taken, _) in self.snapshots.items()
+            ],
+        }
+
+    def take_snapshot(self):
+        if not self.tracing:
+            raise RuntimeError('Трассировка памяти не включена.')
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ])
+        with self._lock:
+            snapshot_id = next(self._ids)
+            self.snapshots[snapshot_id] = (timezone.now(), snapshot)
+            while len(self.snapshots) > self.options['MAX_SNAPSHOTS']:
+                self.snapshots.popitem(last=False)
+        return snapshot_id
+
+    def get_snapshot(self, snapshot_id=None):
+        with self._lock:
+            if not self.snapshots:
+                raise KeyError('Снимков нет.')
+            if snapshot_id is None:
+                snapshot_id = next(reversed(self.snapshots))
+            return self.snapshots[snapshot_id][1]
+
+    def top(self, snapshot_id=None, limit=20, key_type='lineno'):
+        stats = self.get_snapshot(snapshot_id).statistics(key_type)
+        return [_statistic(stat) for stat in stats[:limit]]
+
+    def diff(self, first_id, second_id, limit=20, key_type='lineno'):
+        stats = self.get_snapshot(second_id).compare_to(
+            self.get_snapshot(first_id), key_type
+        )
+        return [_difference(stat) for stat in stats[:limit]]
+
+    def handle_signal(self, signum, frame):
+        self._signals.put(signum)
+
+    def start_signal_worker(self):
+        """Поток, обрабатывающий сигналы вне обработчика"""
+        if self._signal_worker is None or not self._signal_worker.is_alive():
+            self._signal_worker = threading.Thread(
+                target=self._process_signals,
+                name='memory-profiler',
+                daemon=True,
+            )
+            self._signal_worker.start()
+
+    def _process_signals(self):
+        while True:
+            self._signals.get()
+            try:
+                self.report()
+            except Exception:
+                logger.exception('pid %s: ошибка снимка памяти', os.getpid())
+
+    def report(self):
+        """Включает трассировку или пишет в лог снимок и разницу"""
+        if not self.tracing:
+            self.start()
+            logger.warning('pid %s: трассировка памяти включена', os.getpid())
+            return
+        previous = next(reversed(self.snapshots), None)
+        snapshot_id = self.take_snapshot()
+        limit = self.options['LIMIT']
+        rows = (
+            self.diff(previous, snapshot_id, limit) if previous
+            else self.top(snapshot_id, limit)
+        )
+        logger.warning(
+            'pid %s: снимок памяти %s, RSS %d КБ',
+            os.getpid(), snapshot_id, current_rss() // 1024,
+        )
+        for row in rows:
+            logger.warning(
+                '%s:%s size=%d count=%d size_diff=%s',
+                row['file'], row['line'], row['size'], row['count'],
+                row.get('size_diff', '-'),
+            )
+
+
+_profiler = None
+
+
+def get_memory_profiler():
+    global _profiler
+    if _profiler is None:
+        _profiler = MemoryProfiler(settings.MEMORY_PROFILER)
+    return _profiler
+
+
+def install_signal_handler():
+    """Вызывается в воркере после fork (хук post_worker_init)"""
+    signum = getattr(signal, settings.MEMORY_PROFILER['SIGNAL'])
+    profiler = get_memory_profiler()
+    profiler.start_signal_worker()
+    signal.signal(signum, profiler.handle_signal)
@@ -0,0 +1,120 @@
+"""Метрики приложения в формате Prometheus
+
+При заданной переменной окружения PROMETHEUS_MULTIPROC_DIR метрики
+воркеров gunicorn пишутся в общий каталог и суммируются при выдаче
+/metrics (multiprocess-режим prometheus_client). RSS воркера обновляется
+в конце каждого запроса.
+"""
+import os
+import resource
+
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1,
+)
+
+REQUESTS = Counter(
+    'yamdb_http_requests_total',
+    'Запросы по маршрутам',
+    ['route', 'method', 'status'],
+)
+REQUEST_LATENCY = Histogram(
+    'yamdb_http_request_duration_seconds',
+    'Время обработки запроса',
+    ['route', 'method'],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Counter(
+    'yamdb_db_queries_total',
+    'SQL-запросы по маршрутам',
+    ['route'],
+)
+DB_QUERY_DURATION = Histogram(
+    'yamdb_db_query_duration_seconds',
+    'Время выполнения SQL-запроса',
+    ['route'],
+    buckets=QUERY_BUCKETS,
+)
+QUERY_BUDGET_VIOLATIONS = Counter(
+    'yamdb_query_budget_violations_total',
+    'Нарушения бюджета SQL: queries или timeout',
+    ['route', 'kind'],
+)
+CACHE_LOOKUPS = Counter(
+    'yamdb_cache_lookups_total',
+    'Обращения к кешам приложения: hit или miss',
+    ['cache', 'result'],
+)
+ARCHIVE_READS = Counter(
+    'yamdb_archive_reads_total',
+    'Строки, прочитанные из холодного хранения',
+    ['model'],
+)
+MAIL_SENT = Counter(
+    'yamdb_mail_sent_total',
+    'Письма, переданные почтовому бэкенду',
+)
+THROTTLE_STORE_ERRORS = Counter(
+    'yamdb_throttle_store_errors_total',
+    'Ошибки хранилища лимитов, запрос пропущен без списания',
+)
+WORKER_RSS = Gauge(
+    'yamdb_worker_rss_bytes',
+    'Резидентная память воркера',
+    multiprocess_mode='liveall',
+)
+
+UNMATCHED_ROUTE = 'unmatched'
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else UNMATCHED_ROUTE
+
+
+def record_cache_lookup(cache, hits=0, misses=0):
+    if hits:
+        CACHE_LOOKUPS.labels(cache, 'hit').inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache, 'miss').inc(misses)
+
+
+def record_archive_read(model, rows):
+    if rows:
+        ARCHIVE_READS.labels(model).inc(rows)
+
+
+def current_rss():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def update_worker_rss():
+    WORKER_RSS.set(current_rss())
+
+
+def metrics_view(request):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        body = generate_latest(registry)
+    else:
+        body = generate_latest(REGISTRY)
+    return HttpResponse(body, content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,91 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import (
+    DB_QUERIES,
+    DB_QUERY_DURATION,
+    REQUEST_LATENCY,
+    REQUESTS,
+    route_name,
+    update_worker_rss,
+)
+from .sql_profiler import get_profiler
+
+
+class RateLimitHeadersMiddleware:
+    """Заголовки X-RateLimit-* по состоянию корзины из api/throttling.py"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        state = getattr(request, 'ratelimit', None)
+        if state is not None:
+            response['X-RateLimit-Limit'] = str(state.limit)
+            response['X-RateLimit-Remaining'] = str(state.remaining)
+            response['X-RateLimit-Reset'] = str(math.ceil(state.reset))
+        return response
+
+
+class SqlProfilerMiddleware:
+    """Сбор статистики SQL по представлениям, включается SQL_PROFILER"""
+
+    def __init__(self, get_response):
+        if not settings.SQL_PROFILER['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.profiler = get_profiler()
+
+    def __call__(self, request):
+        wrapper = self.profiler.wrapper(request)
+        for connection in connections.all():
+            connection.execute_wrappers.append(wrapper)
+        try:
+            return self.get_response(request)
+        finally:
+            for connection in connections.all():
+                connection.execute_wrappers.remove(wrapper)
+            self.profiler.request_finished()
+
+
+class MetricsMiddleware:
+    """Счётчики запросов, время ответа и SQL по маршрутам для /metrics"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = []
+
+        def count_query(run, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return run(sql, params, many, context)
+            finally:
+                queries.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for connection in connections.all():
+            connection.execute_wrappers.append(count_query)
+        try:
+            response = self.get_response(request)
+        finally:
+            for connection in connections.all():
+                connection.execute_wrappers.remove(count_query)
+        route = route_name(request)
+        REQUEST_LATENCY.labels(route, request.method).observe(
+            time.perf_counter() - started
+        )
+        REQUESTS.labels(route, request.method, response.status_code).inc()
+        if queries:
+            DB_QUERIES.labels(route).inc(len(queries))
+            histogram = DB_QUERY_DURATION.labels(route)
+            for duration in queries:
+                histogram.observe(duration)
+        update_worker_rss()
+        return response
@@ -0,0 +1,28 @@
+# Generated by Django 3.0.7 on 2026-10-19 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_sync_model_state'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'year', 'id'], name='title_category_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['year', 'id'], name='title_year_idx'),
+        ),
+        migrations.RunSQL(
+            sql=(
+                'CREATE INDEX title_genre_genre_title_idx '
+                'ON api_title_genre (genre_id, title_id);'
+            ),
+            reverse_sql='DROP INDEX title_genre_genre_title_idx;',
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.0.7 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_title_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(choices=[('review', 'Review'), ('comment', 'Comment')], max_length=10, verbose_name='Тип объекта')),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=10, verbose_name='Действие')),
+                ('object_id', models.IntegerField(verbose_name='ID объекта')),
+                ('title_id', models.IntegerField(verbose_name='ID произведения')),
+                ('review_id', models.IntegerField(verbose_name='ID отзыва')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата события')),
+            ],
+            options={
+                'verbose_name': 'Событие',
+                'verbose_name_plural': 'События',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='changeevent',
+            index=models.Index(fields=['title_id', 'id'], name='event_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changeevent',
+            index=models.Index(fields=['review_id', 'id'], name='event_review_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.0.7 on 2026-10-19 10:23
+
+from django.conf import settings
+from django.db import migrations
+
+from api.partitioning import partition_reviews_comments
+
+
+def partition_tables(apps, schema_editor):
+    # Секционирование по желанию: по умолчанию REVIEW_PARTITIONS = 0, и на
+    # существующей базе таблицы переносит команда partition_reviews
+    partitions = settings.REVIEW_PARTITIONS
+    if schema_editor.connection.vendor != 'postgresql' or not partitions:
+        return
+    partition_reviews_comments(schema_editor.connection, partitions)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_title_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, migrations.RunPython.noop),
+    ]
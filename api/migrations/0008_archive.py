@@ -0,0 +1,64 @@
+# Generated by Django 3.0.7 on 2026-10-19 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_partition_reviews_comments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('review_id', models.IntegerField(verbose_name='ID отзыва')),
+                ('author_id', models.IntegerField(verbose_name='ID автора')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата создания')),
+                ('payload', models.BinaryField(verbose_name='Сжатый текст')),
+            ],
+            options={
+                'verbose_name': 'Архивный комментарий',
+                'verbose_name_plural': 'Архивные комментарии',
+                'ordering': ['-pub_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedReview',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('title_id', models.IntegerField(verbose_name='ID произведения')),
+                ('author_id', models.IntegerField(verbose_name='ID автора')),
+                ('score', models.PositiveSmallIntegerField(verbose_name='Оценка')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('payload', models.BinaryField(verbose_name='Сжатый текст')),
+            ],
+            options={
+                'verbose_name': 'Архивный отзыв',
+                'verbose_name_plural': 'Архивные отзывы',
+                'ordering': ['-pub_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedreview',
+            index=models.Index(fields=['title_id', '-pub_date'], name='archived_review_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedreview',
+            index=models.Index(fields=['author_id'], name='archived_review_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='archivedreview',
+            constraint=models.UniqueConstraint(fields=('title_id', 'author_id'), name='unique_archived_review'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['review_id', '-pub_date'], name='archived_comment_review_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['author_id'], name='archived_comment_author_idx'),
+        ),
+    ]
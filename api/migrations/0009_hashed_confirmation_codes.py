@@ -0,0 +1,50 @@
+# Generated by Django 3.0.7 on 2026-10-19 10:36
+
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def hash_existing_codes(apps, schema_editor):
+    User = apps.get_model('api', 'User')
+    expires = timezone.now() + settings.CONFIRMATION_CODE_TTL
+    users = list(User.objects.filter(confirmation_code__isnull=False))
+    for user in users:
+        user.confirmation_code = hmac.new(
+            settings.SECRET_KEY.encode(),
+            user.confirmation_code.encode(),
+            hashlib.sha256,
+        ).hexdigest()
+        user.confirmation_code_expires = expires
+    User.objects.bulk_update(
+        users, ['confirmation_code', 'confirmation_code_expires'],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='confirmation_code_expires',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Код подтверждения действует до'),
+        ),
+        migrations.RunPython(hash_existing_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='confirmation_code',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, verbose_name='Хеш кода подтверждения'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(confirmation_code__isnull=False), fields=['confirmation_code_expires'], name='user_code_expires_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.7 on 2026-10-19 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_hashed_confirmation_codes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Версия представления'),
+        ),
+    ]
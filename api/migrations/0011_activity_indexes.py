@@ -0,0 +1,37 @@
+# Generated by Django 3.0.7 on 2026-10-19 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_title_version'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='archivedcomment',
+            name='archived_comment_author_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='archivedreview',
+            name='archived_review_author_idx',
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['author_id', '-pub_date'], name='archived_comment_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedreview',
+            index=models.Index(fields=['author_id', '-pub_date'], name='archived_review_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['author', '-pub_date'], name='comment_author_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['author', '-pub_date'], name='review_author_pub_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 3.0.7 on 2026-10-19 10:47
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def fill_facet_counts(apps, schema_editor):
+    Title = apps.get_model('api', 'Title')
+    FacetCount = apps.get_model('api', 'FacetCount')
+    counts = Counter()
+    titles = Title.objects.values_list('id', 'category_id', 'year')
+    categories = {}
+    for title_id, category_id, year in titles.iterator():
+        key = category_id or 0
+        categories[title_id] = key
+        if category_id:
+            counts[key, 'category', category_id] += 1
+        if year is not None:
+            counts[key, 'decade', year // 10 * 10] += 1
+    links = Title.genre.through.objects.values_list('title_id', 'genre_id')
+    for title_id, genre_id in links.iterator():
+        counts[categories[title_id], 'genre', genre_id] += 1
+    FacetCount.objects.bulk_create(
+        [
+            FacetCount(category_id=key, facet=facet, value=value, count=count)
+            for (key, facet, value), count in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_activity_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category_id', models.IntegerField(verbose_name='ID категории')),
+                ('facet', models.CharField(choices=[('genre', 'Genre'), ('category', 'Category'), ('decade', 'Decade')], max_length=10, verbose_name='Фасет')),
+                ('value', models.IntegerField(help_text='ID жанра или категории, первый год десятилетия', verbose_name='Значение')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Число')),
+            ],
+            options={
+                'verbose_name': 'Счётчик фасета',
+                'verbose_name_plural': 'Счётчики фасетов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='facetcount',
+            constraint=models.UniqueConstraint(fields=('category_id', 'facet', 'value'), name='unique_facet_count'),
+        ),
+        migrations.RunPython(fill_facet_counts, migrations.RunPython.noop),
+    ]
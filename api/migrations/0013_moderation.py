@@ -0,0 +1,44 @@
+# Generated by Django 3.0.7 on 2026-10-19 10:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_facet_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='is_hidden',
+            field=models.BooleanField(default=False, verbose_name='Скрыт модератором'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='is_hidden',
+            field=models.BooleanField(default=False, verbose_name='Скрыт модератором'),
+        ),
+        migrations.CreateModel(
+            name='ModerationLog',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('delete', 'Delete'), ('hide', 'Hide')], max_length=10, verbose_name='Действие')),
+                ('object_type', models.CharField(choices=[('review', 'Review'), ('comment', 'Comment')], max_length=10, verbose_name='Тип объектов')),
+                ('criteria', models.TextField(verbose_name='Условия отбора')),
+                ('reviews', models.PositiveIntegerField(default=0, verbose_name='Отзывов')),
+                ('comments', models.PositiveIntegerField(default=0, verbose_name='Комментариев')),
+                ('removed', models.TextField(default='', verbose_name='Объекты')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата')),
+                ('moderator', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='moderation_logs', to=settings.AUTH_USER_MODEL, verbose_name='Модератор')),
+            ],
+            options={
+                'verbose_name': 'Запись модерации',
+                'verbose_name_plural': 'Журнал модерации',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
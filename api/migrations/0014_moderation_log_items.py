@@ -0,0 +1,52 @@
+# Generated by Django 3.0.7 on 2026-10-19 11:25
+
+import json
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def split_removed(apps, schema_editor):
+    ModerationLog = apps.get_model('api', 'ModerationLog')
+    ModerationLogItem = apps.get_model('api', 'ModerationLogItem')
+    for log in ModerationLog.objects.exclude(removed='').iterator():
+        items = []
+        for line in log.removed.splitlines():
+            row = json.loads(line)
+            items.append(ModerationLogItem(
+                log_id=log.id,
+                object_type=row.pop('type'),
+                object_id=row['id'],
+                data=json.dumps(row, ensure_ascii=False),
+            ))
+        ModerationLogItem.objects.bulk_create(items)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_moderation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationLogItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(choices=[('review', 'Review'), ('comment', 'Comment')], max_length=10, verbose_name='Тип объекта')),
+                ('object_id', models.IntegerField(verbose_name='ID объекта')),
+                ('data', models.TextField(verbose_name='Объект')),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='api.ModerationLog', verbose_name='Запись модерации')),
+            ],
+            options={
+                'verbose_name': 'Объект модерации',
+                'verbose_name_plural': 'Объекты модерации',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(split_removed, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='moderationlog',
+            name='removed',
+        ),
+    ]
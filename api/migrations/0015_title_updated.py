@@ -0,0 +1,19 @@
+# Generated by Django 3.0.7 on 2026-10-19 11:39
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_moderation_log_items'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='updated',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False, verbose_name='Дата изменения'),
+        ),
+    ]
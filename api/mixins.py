@@ -0,0 +1,66 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+class MultiGetMixin:
+    """Получение нескольких объектов по списку идентификаторов (?ids=1,2,3)
+
+    Объекты выбираются одним запросом к базе, порядок ответа совпадает с
+    порядком переданных идентификаторов, ненайденные перечисляются в
+    поле missing.
+    """
+    multi_get_param = 'ids'
+    multi_get_max_ids = 500
+
+    def list(self, request, *args, **kwargs):
+        if self.multi_get_param in request.query_params:
+            return self.multi_get(request)
+        return super().list(request, *args, **kwargs)
+
+    def get_multi_get_ids(self):
+        raw_ids = self.request.query_params[self.multi_get_param]
+        ids = [value.strip() for value in raw_ids.split(',') if value.strip()]
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            raise ValidationError(
+                {self.multi_get_param: ['Не указаны идентификаторы.']}
+            )
+        if len(ids) > self.multi_get_max_ids:
+            raise ValidationError(
+                {self.multi_get_param: [
+                    'Можно запросить не более '
+                    f'{self.multi_get_max_ids} объектов за раз.'
+                ]}
+            )
+        if self.lookup_field in ('pk', 'id'):
+            try:
+                ids = [int(value) for value in ids]
+            except ValueError:
+                raise ValidationError(
+                    {self.multi_get_param: [
+                        'Идентификаторы должны быть целыми числами.'
+                    ]}
+                )
+        return ids
+
+    def get_multi_get_objects(self, ids):
+        queryset = self.get_queryset().filter(
+            **{f'{self.lookup_field}__in': ids}
+        )
+        return {getattr(obj, self.lookup_field): obj for obj in queryset}
+
+    def get_multi_get_representations(self, ids):
+        found = self.get_multi_get_objects(ids)
+        ordered = [value for value in ids if value in found]
+        serializer = self.get_serializer(
+            [found[value] for value in ordered], many=True,
+        )
+        return dict(zip(ordered, serializer.data))
+
+    def multi_get(self, request):
+        ids = self.get_multi_get_ids()
+        found = self.get_multi_get_representations(ids)
+        return Response({
+            'results': [found[value] for value in ids if value in found],
+            'missing': [value for value in ids if value not in found],
+        })
@@ -1,6 +1,7 @@
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import F, UniqueConstraint
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django.core.validators import MaxValueValidator, MinValueValidator
 
 from .validators import year_validator
@@ -50,11 +51,17 @@ class User(AbstractUser):
         verbose_name='О себе',
     )
     confirmation_code = models.CharField(
-        max_length=255,
-        unique=True,
+        max_length=64,
+        editable=False,
+        null=True,
+        blank=True,
+        verbose_name='Хеш кода подтверждения',
+    )
+    confirmation_code_expires = models.DateTimeField(
         editable=False,
         null=True,
-        blank=True
+        blank=True,
+        verbose_name='Код подтверждения действует до',
     )
 
     @property
@@ -66,6 +73,13 @@ class User(AbstractUser):
         return self.role == UserRoles.MODERATOR
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['confirmation_code_expires'],
+                name='user_code_expires_idx',
+                condition=models.Q(confirmation_code__isnull=False),
+            ),
+        ]
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
 
@@ -133,11 +147,56 @@ class Title(models.Model):
         null=True,
         verbose_name='Категория',
         related_name='titles')
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name='Версия представления',
+    )
+    updated = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        db_index=True,
+        verbose_name='Дата изменения',
+    )
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['category', 'year', 'id'],
+                name='title_category_year_idx',
+            ),
+            models.Index(fields=['year', 'id'], name='title_year_idx'),
+        ]
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {'category_id', 'year'} <= set(field_names):
+            instance._loaded_facets = (instance.category_id, instance.year)
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Сохранение с увеличением версии представления
+
+        Версия меняется выражением в том же UPDATE и перечитывается, поэтому
+        устаревшее значение экземпляра не попадает обратно в базу. Дата
+        изменения отмечает произведение для пересчёта похожих.
+        """
+        bump = not self._state.adding and not kwargs.get('force_insert')
+        if bump:
+            self.version = F('version') + 1
+            self.updated = timezone.now()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'version', 'updated'
+                }
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=['version'])
+
     def list_genres(self):
         return self.genre.values_list('name')
 
@@ -171,11 +230,27 @@ class Review(models.Model):
         ]
     )
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    is_hidden = models.BooleanField('Скрыт модератором', default=False)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'score' in field_names:
+            # Скрытые отзывы не входят в счётчики оценок
+            instance._loaded_score = (
+                None if instance.__dict__.get('is_hidden') else instance.score
+            )
+        return instance
 
     class Meta:
         constraints = [
             UniqueConstraint(fields=['title', 'author'], name='unique_review')
         ]
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'], name='review_author_pub_idx'
+            ),
+        ]
         ordering = ['-pub_date']
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
@@ -197,11 +272,326 @@ class Comment(models.Model):
         related_name='comments',
     )
     pub_date = models.DateTimeField('Дата создания', auto_now_add=True)
+    is_hidden = models.BooleanField('Скрыт модератором', default=False)
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'], name='comment_author_pub_idx'
+            ),
+        ]
         ordering = ['-pub_date']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
     def __str__(self):
         return self.text
+
+
+class EventObjects(models.TextChoices):
+    REVIEW = 'review'
+    COMMENT = 'comment'
+
+
+class EventActions(models.TextChoices):
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+
+
+class ChangeEvent(models.Model):
+    """Журнал изменений отзывов и комментариев (только добавление)
+
+    Ссылки на объекты хранятся числами, а не внешними ключами, чтобы
+    события об удалении переживали сами объекты.
+    """
+    object_type = models.CharField(
+        max_length=10,
+        choices=EventObjects.choices,
+        verbose_name='Тип объекта',
+    )
+    action = models.CharField(
+        max_length=10,
+        choices=EventActions.choices,
+        verbose_name='Действие',
+    )
+    object_id = models.IntegerField(verbose_name='ID объекта')
+    title_id = models.IntegerField(verbose_name='ID произведения')
+    review_id = models.IntegerField(verbose_name='ID отзыва')
+    created = models.DateTimeField('Дата события', auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['title_id', 'id'], name='event_title_idx'),
+            models.Index(fields=['review_id', 'id'], name='event_review_idx'),
+        ]
+        ordering = ['id']
+        verbose_name = 'Событие'
+        verbose_name_plural = 'События'
+
+    def __str__(self):
+        return f'{self.object_type} {self.object_id} {self.action}'
+
+
+class ModerationActions(models.TextChoices):
+    DELETE = 'delete'
+    HIDE = 'hide'
+
+
+class ModerationLog(models.Model):
+    """Журнал массовой модерации (см. api/moderation.py)
+
+    Сами удалённые или скрытые объекты — строки ModerationLogItem.
+    """
+    moderator = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='moderation_logs',
+        verbose_name='Модератор',
+    )
+    action = models.CharField(
+        max_length=10,
+        choices=ModerationActions.choices,
+        verbose_name='Действие',
+    )
+    object_type = models.CharField(
+        max_length=10,
+        choices=EventObjects.choices,
+        verbose_name='Тип объектов',
+    )
+    criteria = models.TextField(verbose_name='Условия отбора')
+    reviews = models.PositiveIntegerField(default=0, verbose_name='Отзывов')
+    comments = models.PositiveIntegerField(
+        default=0, verbose_name='Комментариев'
+    )
+    created = models.DateTimeField('Дата', auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'Запись модерации'
+        verbose_name_plural = 'Журнал модерации'
+
+    def __str__(self):
+        return f'{self.action} {self.object_type}: {self.criteria}'
+
+
+class ModerationLogItem(models.Model):
+    """Удалённый или скрытый объект: строка JSON в момент модерации"""
+    log = models.ForeignKey(
+        ModerationLog,
+        on_delete=models.CASCADE,
+        related_name='items',
+        verbose_name='Запись модерации',
+    )
+    object_type = models.CharField(
+        max_length=10,
+        choices=EventObjects.choices,
+        verbose_name='Тип объекта',
+    )
+    object_id = models.IntegerField(verbose_name='ID объекта')
+    data = models.TextField(verbose_name='Объект')
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Объект модерации'
+        verbose_name_plural = 'Объекты модерации'
+
+    def __str__(self):
+        return f'{self.object_type} {self.object_id}'
+
+
+class SimilarTitle(models.Model):
+    """Предрассчитанные похожие произведения (см. api/similarity.py)"""
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='similar_titles',
+        verbose_name='Произведение',
+    )
+    similar = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожее произведение',
+    )
+    score = models.FloatField(verbose_name='Степень сходства')
+    updated = models.DateTimeField('Дата расчёта', auto_now=True)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=['title', 'similar'], name='unique_similar_title'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['title', '-score'], name='similar_title_score_idx'
+            ),
+        ]
+        ordering = ['-score']
+        verbose_name = 'Похожее произведение'
+        verbose_name_plural = 'Похожие произведения'
+
+
+SCORES = range(1, 11)
+SCORE_FIELDS = [f'score_{score}' for score in SCORES]
+
+
+class TitleStats(models.Model):
+    """Распределение оценок произведения, обновляется сигналами отзывов"""
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Произведение',
+    )
+    score_1 = models.PositiveIntegerField(default=0)
+    score_2 = models.PositiveIntegerField(default=0)
+    score_3 = models.PositiveIntegerField(default=0)
+    score_4 = models.PositiveIntegerField(default=0)
+    score_5 = models.PositiveIntegerField(default=0)
+    score_6 = models.PositiveIntegerField(default=0)
+    score_7 = models.PositiveIntegerField(default=0)
+    score_8 = models.PositiveIntegerField(default=0)
+    score_9 = models.PositiveIntegerField(default=0)
+    score_10 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Статистика оценок'
+        verbose_name_plural = 'Статистика оценок'
+
+    @classmethod
+    def for_title(cls, title):
+        return cls.objects.filter(title=title).first() or cls(title=title)
+
+    @property
+    def histogram(self):
+        return {
+            score: getattr(self, field)
+            for score, field in zip(SCORES, SCORE_FIELDS)
+        }
+
+    @property
+    def count(self):
+        return sum(self.histogram.values())
+
+    @property
+    def average(self):
+        count = self.count
+        if not count:
+            return None
+        return sum(
+            score * amount for score, amount in self.histogram.items()
+        ) / count
+
+    @property
+    def median(self):
+        count = self.count
+        if not count:
+            return None
+        middle = ((count - 1) // 2, count // 2)
+        values = []
+        seen = 0
+        for score, amount in self.histogram.items():
+            values.extend(
+                score for position in middle
+                if seen <= position < seen + amount
+            )
+            seen += amount
+        return sum(values) / len(values)
+
+
+class Facets(models.TextChoices):
+    GENRE = 'genre'
+    CATEGORY = 'category'
+    DECADE = 'decade'
+
+
+# category_id счётчиков произведений без категории
+NO_CATEGORY = 0
+
+
+class FacetCount(models.Model):
+    """Число произведений в фасете (см. api/facets.py)
+
+    Счётчики ведутся в разрезе категории произведения, поэтому без
+    пересчёта отвечают и на запросы без фильтров, и на фильтр по категории.
+    """
+    category_id = models.IntegerField(verbose_name='ID категории')
+    facet = models.CharField(
+        max_length=10,
+        choices=Facets.choices,
+        verbose_name='Фасет',
+    )
+    value = models.IntegerField(
+        verbose_name='Значение',
+        help_text='ID жанра или категории, первый год десятилетия',
+    )
+    count = models.PositiveIntegerField(default=0, verbose_name='Число')
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=['category_id', 'facet', 'value'],
+                name='unique_facet_count',
+            )
+        ]
+        verbose_name = 'Счётчик фасета'
+        verbose_name_plural = 'Счётчики фасетов'
+
+
+class ArchivedReview(models.Model):
+    """Отзыв в холодном хранении (см. api/archive.py), текст сжат zlib"""
+    id = models.IntegerField(primary_key=True)
+    title_id = models.IntegerField(verbose_name='ID произведения')
+    author_id = models.IntegerField(verbose_name='ID автора')
+    score = models.PositiveSmallIntegerField(verbose_name='Оценка')
+    pub_date = models.DateTimeField('Дата публикации')
+    payload = models.BinaryField(verbose_name='Сжатый текст')
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=['title_id', 'author_id'],
+                name='unique_archived_review',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['title_id', '-pub_date'],
+                name='archived_review_title_idx',
+            ),
+            models.Index(
+                fields=['author_id', '-pub_date'],
+                name='archived_review_author_idx',
+            ),
+        ]
+        ordering = ['-pub_date']
+        verbose_name = 'Архивный отзыв'
+        verbose_name_plural = 'Архивные отзывы'
+
+
+class ArchivedComment(models.Model):
+    """Комментарий в холодном хранении (см. api/archive.py)"""
+    id = models.IntegerField(primary_key=True)
+    review_id = models.IntegerField(verbose_name='ID отзыва')
+    author_id = models.IntegerField(verbose_name='ID автора')
+    pub_date = models.DateTimeField('Дата создания')
+    payload = models.BinaryField(verbose_name='Сжатый текст')
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['review_id', '-pub_date'],
+                name='archived_comment_review_idx',
+            ),
+            models.Index(
+                fields=['author_id', '-pub_date'],
+                name='archived_comment_author_idx',
+            ),
+        ]
+        ordering = ['-pub_date']
+        verbose_name = 'Архивный комментарий'
+        verbose_name_plural = 'Архивные комментарии'
@@ -0,0 +1,277 @@
+"""Массовая модерация отзывов и комментариев
+
+Модератор удаляет или скрывает объекты по списку id, по автору или по
+окну времени внутри произведения. Подходящие строки обрабатываются
+пачками по MODERATION['BATCH_SIZE']: каждая пачка — одна транзакция из
+нескольких запросов над множеством id, без сигналов и без проверки прав
+на каждый объект. Производные данные сдвигаются той же пачкой: счётчики
+оценок (TitleStats) — одним UPDATE на произведение, события ленты — одним
+INSERT, суррогатные ключи шлюза очищаются после коммита. Кеш фрагментов
+произведений сбрасывать не нужно: рейтинг входит в ключ фрагмента.
+
+Удаление затрагивает и архив (api/archive.py), скрытие — только живые
+строки. Вместе с отзывом удаляются его комментарии. Каждый вызов пишет
+ModerationLog со счётчиками, а каждая пачка добавляет одним INSERT по
+строке ModerationLogItem на удалённый или скрытый объект.
+"""
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+
+from .archive import decompress
+from .edge_cache import (
+    TITLES_KEY,
+    purge_surrogate_keys,
+    review_comments_key,
+    title_key,
+    title_reviews_key,
+)
+from .models import (
+    ArchivedComment,
+    ArchivedReview,
+    ChangeEvent,
+    Comment,
+    EventActions,
+    EventObjects,
+    ModerationActions,
+    ModerationLog,
+    ModerationLogItem,
+    Review,
+)
+from .signals import record_events
+from .stats import subtract_score_counts
+
+REVIEW_FIELDS = ['id', 'title_id', 'author_id', 'score', 'pub_date']
+COMMENT_FIELDS = ['id', 'review_id', 'author_id', 'pub_date']
+
+
+def _select(queryset, criteria, title):
+    """Строки по условиям: ids, author, title и окно since/until"""
+    if criteria.get('ids'):
+        queryset = queryset.filter(id__in=criteria['ids'])
+    if criteria.get('author') is not None:
+        queryset = queryset.filter(author_id=criteria['author'])
+    if criteria.get('title') is not None:
+        queryset = queryset.filter(title(criteria['title']))
+    if criteria.get('since'):
+        queryset = queryset.filter(pub_date__gte=criteria['since'])
+    if criteria.get('until'):
+        queryset = queryset.filter(pub_date__lt=criteria['until'])
+    return queryset
+
+
+def _reviews_of_title(title_id):
+    return Q(review_id__in=Review.objects.filter(
+        title_id=title_id
+    ).values('id')) | Q(review_id__in=ArchivedReview.objects.filter(
+        title_id=title_id
+    ).values('id'))
+
+
+def _with_text(rows):
+    """Текст архивных строк из сжатого payload"""
+    for row in rows:
+        if 'payload' in row:
+            row['text'] = decompress(row.pop('payload'))
+    return rows
+
+
+class BulkModeration:
+    """Одно действие модератора над множеством отзывов или комментариев"""
+
+    def __init__(self, object_type, action, criteria, moderator=None,
+                 batch_size=None):
+        self.object_type = object_type
+        self.action = action
+        self.criteria = criteria
+        self.batch_size = batch_size or settings.MODERATION['BATCH_SIZE']
+        self.log = ModerationLog.objects.create(
+            moderator=moderator,
+            action=action,
+            object_type=object_type,
+            criteria=json.dumps(criteria, default=str, ensure_ascii=False),
+        )
+
+    @property
+    def event_action(self):
+        if self.action == ModerationActions.DELETE:
+            return EventActions.DELETED
+        return EventActions.UPDATED
+
+    def run(self):
+        deleting = self.action == ModerationActions.DELETE
+        if self.object_type == EventObjects.REVIEW:
+            reviews = _select(
+                Review.objects.all(), self.criteria,
+                lambda title_id: Q(title_id=title_id),
+            )
+            if deleting:
+                self._in_batches(
+                    reviews, REVIEW_FIELDS + ['text', 'is_hidden'],
+                    lambda batch: self._delete_reviews(Review, batch),
+                )
+                self._in_batches(
+                    _select(
+                        ArchivedReview.objects.all(), self.criteria,
+                        lambda title_id: Q(title_id=title_id),
+                    ),
+                    REVIEW_FIELDS + ['payload'],
+                    lambda batch: self._delete_reviews(ArchivedReview, batch),
+                )
+            else:
+                self._in_batches(
+                    reviews.filter(is_hidden=False),
+                    REVIEW_FIELDS + ['text'],
+                    self._hide_reviews,
+                )
+        else:
+            comments = _select(
+                Comment.objects.all(), self.criteria,
+                lambda title_id: Q(review__title_id=title_id),
+            )
+            if deleting:
+                self._in_batches(
+                    comments, COMMENT_FIELDS + ['text'],
+                    lambda batch: self._delete_comments(Comment, batch),
+                )
+                self._in_batches(
+                    _select(
+                        ArchivedComment.objects.all(), self.criteria,
+                        _reviews_of_title,
+                    ),
+                    COMMENT_FIELDS + ['payload'],
+                    lambda batch: self._delete_comments(
+                        ArchivedComment, batch
+                    ),
+                )
+            else:
+                self._in_batches(
+                    comments.filter(is_hidden=False),
+                    COMMENT_FIELDS + ['text'],
+                    self._hide_comments,
+                )
+        self.log.refresh_from_db()
+        return self.log
+
+    def _in_batches(self, queryset, fields, process):
+        """Каждая пачка — отдельная транзакция; обработанные строки
+        перестают подходить под queryset (удалены или скрыты)"""
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    queryset.select_for_update(of=('self',))
+                    .order_by('id').values(*fields)[:self.batch_size]
+                )
+                if not batch:
+                    return
+                process(_with_text(batch))
+
+    def _delete_reviews(self, model, batch):
+        ids = [row['id'] for row in batch]
+        titles = {row['id']: row['title_id'] for row in batch}
+        comments = self._take_comments(ids)
+        model.objects.filter(id__in=ids)._raw_delete(model.objects.db)
+        subtract_score_counts(
+            (row['title_id'], row['score']) for row in batch
+            if not row.get('is_hidden')
+        )
+        for row in comments:
+            row['title_id'] = titles[row['review_id']]
+        self._finish(batch, comments)
+
+    def _take_comments(self, review_ids):
+        """Удаляет комментарии удаляемых отзывов, возвращает их строки"""
+        taken = []
+        for model, text in ((Comment, 'text'), (ArchivedComment, 'payload')):
+            comments = model.objects.filter(review_id__in=review_ids)
+            taken.extend(_with_text(list(
+                comments.values(*COMMENT_FIELDS, text)
+            )))
+            comments._raw_delete(model.objects.db)
+        return taken
+
+    def _hide_reviews(self, batch):
+        Review.objects.filter(
+            id__in=[row['id'] for row in batch]
+        ).update(is_hidden=True)
+        subtract_score_counts(
+            (row['title_id'], row['score']) for row in batch
+        )
+        self._finish(batch, [])
+
+    def _delete_comments(self, model, batch):
+        self._attach_titles(batch)
+        model.objects.filter(
+            id__in=[row['id'] for row in batch]
+        )._raw_delete(model.objects.db)
+        self._finish([], batch)
+
+    def _hide_comments(self, batch):
+        self._attach_titles(batch)
+        Comment.objects.filter(
+            id__in=[row['id'] for row in batch]
+        ).update(is_hidden=True)
+        self._finish([], batch)
+
+    def _attach_titles(self, comments):
+        review_ids = {row['review_id'] for row in comments}
+        titles = dict(Review.objects.filter(
+            id__in=review_ids
+        ).values_list('id', 'title_id'))
+        titles.update(ArchivedReview.objects.filter(
+            id__in=review_ids - set(titles)
+        ).values_list('id', 'title_id'))
+        for row in comments:
+            row['title_id'] = titles.get(row['review_id'], 0)
+
+    def _finish(self, reviews, comments):
+        """События ленты, очистка шлюза и запись в журнал для пачки"""
+        record_events(
+            [
+                ChangeEvent(
+                    object_type=EventObjects.REVIEW,
+                    action=self.event_action,
+                    object_id=row['id'],
+                    title_id=row['title_id'],
+                    review_id=row['id'],
+                )
+                for row in reviews
+            ] + [
+                ChangeEvent(
+                    object_type=EventObjects.COMMENT,
+                    action=self.event_action,
+                    object_id=row['id'],
+                    title_id=row['title_id'],
+                    review_id=row['review_id'],
+                )
+                for row in comments
+            ]
+        )
+        keys = {review_comments_key(row['review_id']) for row in comments}
+        for row in reviews:
+            keys.update([
+                TITLES_KEY,
+                title_key(row['title_id']),
+                title_reviews_key(row['title_id']),
+                review_comments_key(row['id']),
+            ])
+        purge_surrogate_keys(keys)
+        ModerationLogItem.objects.bulk_create([
+            ModerationLogItem(
+                log_id=self.log.id,
+                object_type=object_type,
+                object_id=row['id'],
+                data=json.dumps(row, default=str, ensure_ascii=False),
+            )
+            for object_type, rows in (
+                (EventObjects.REVIEW, reviews),
+                (EventObjects.COMMENT, comments),
+            )
+            for row in rows
+        ])
+        ModerationLog.objects.filter(id=self.log.id).update(
+            reviews=F('reviews') + len(reviews),
+            comments=F('comments') + len(comments),
+        )
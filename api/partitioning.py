@@ -0,0 +1,117 @@
+"""Секционирование таблиц отзывов и комментариев в PostgreSQL
+
+Отзывы секционируются хешем по title_id, комментарии — хешем по review_id:
+все запросы API ограничены произведением или отзывом, поэтому читают одну
+секцию. Первичный ключ секционированной таблицы обязан включать ключ
+секционирования, поэтому он становится (id, ключ); уникальность id
+по-прежнему обеспечивает последовательность. Внешний ключ комментария на
+отзыв на секционированную таблицу невозможен, поэтому при переносе он
+снимается и целостность держит только каскадное удаление Django. Без
+секционирования ограничение остаётся в базе.
+
+Секционирование включается явно (REVIEW_PARTITIONS > 0) и переписывает обе
+таблицы целиком под блокировкой, поэтому на работающей базе его выполняют
+в окно обслуживания командой partition_reviews, см. README.
+"""
+from django.db import transaction
+
+REVIEW_PARTITIONING = {
+    'table': 'api_review',
+    'key': 'title_id',
+    'unique': [('unique_review', 'title_id, author_id')],
+    'foreign_keys': [('author_id', 'api_user'), ('title_id', 'api_title')],
+    'indexes': [
+        ('review_title_pub_date_idx', 'title_id, pub_date DESC'),
+        ('review_author_idx', 'author_id'),
+    ],
+}
+COMMENT_PARTITIONING = {
+    'table': 'api_comment',
+    'key': 'review_id',
+    'unique': [],
+    'foreign_keys': [('author_id', 'api_user')],
+    'indexes': [
+        ('comment_review_pub_date_idx', 'review_id, pub_date DESC'),
+        ('comment_author_idx', 'author_id'),
+    ],
+}
+
+
+def partition_table(cursor, table, key, partitions, unique=(),
+                    foreign_keys=(), indexes=()):
+    """Переносит таблицу в секционированную по HASH(key) с тем же именем"""
+    old = f'{table}_unpartitioned'
+    cursor.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    cursor.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY NONE')
+    for name, _ in unique:
+        cursor.execute(f'ALTER TABLE {old} DROP CONSTRAINT IF EXISTS {name}')
+    cursor.execute(
+        f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) '
+        f'PARTITION BY HASH ({key})'
+    )
+    cursor.execute(
+        f'ALTER TABLE {table} ADD CONSTRAINT {table}_part_pkey '
+        f'PRIMARY KEY (id, {key})'
+    )
+    for name, columns in unique:
+        cursor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE ({columns})'
+        )
+    for remainder in range(partitions):
+        cursor.execute(
+            f'CREATE TABLE {table}_p{remainder} PARTITION OF {table} '
+            f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+        )
+    cursor.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    cursor.execute(f'DROP TABLE {old}')
+    cursor.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+    for column, target in foreign_keys:
+        cursor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_part_fk '
+            f'FOREIGN KEY ({column}) REFERENCES {target} (id) '
+            f'DEFERRABLE INITIALLY DEFERRED'
+        )
+    for name, columns in indexes:
+        cursor.execute(f'CREATE INDEX {name} ON {table} ({columns})')
+
+
+def drop_foreign_keys(cursor, table, target):
+    """Снимает внешние ключи table, ссылающиеся на target"""
+    cursor.execute(
+        'SELECT c.conname FROM pg_constraint c '
+        'JOIN pg_class t ON t.oid = c.conrelid '
+        'JOIN pg_class r ON r.oid = c.confrelid '
+        "WHERE c.contype = 'f' AND t.relname = %s AND r.relname = %s",
+        [table, target],
+    )
+    for name, in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT {name}')
+
+
+def partition_reviews_comments(connection, partitions):
+    """Секционирует отзывы и комментарии одной транзакцией.
+
+    Возвращает имена перенесённых таблиц; уже секционированные пропускаются.
+    """
+    done = []
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            if not is_partitioned(cursor, REVIEW_PARTITIONING['table']):
+                drop_foreign_keys(
+                    cursor, COMMENT_PARTITIONING['table'],
+                    REVIEW_PARTITIONING['table'],
+                )
+            for options in (REVIEW_PARTITIONING, COMMENT_PARTITIONING):
+                if not is_partitioned(cursor, options['table']):
+                    partition_table(cursor, partitions=partitions, **options)
+                    done.append(options['table'])
+    return done
+
+
+def is_partitioned(cursor, table):
+    cursor.execute(
+        'SELECT 1 FROM pg_partitioned_table p '
+        'JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s',
+        [table],
+    )
+    return cursor.fetchone() is not None
@@ -14,6 +14,17 @@ class IsAdmin(BasePermission):
                 or request.user.is_admin)
 
 
+class IsModerator(BasePermission):
+    """Проверка что пользователь является модератором или админом"""
+
+    def has_permission(self, request, view):
+        return bool(request.auth) and (
+            request.user.is_staff
+            or request.user.is_admin
+            or request.user.is_moderator
+        )
+
+
 class IsAdminOrReadOnly(BasePermission):
     def has_permission(self, request, view):
         if request.method in SAFE_METHODS:
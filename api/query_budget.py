@@ -0,0 +1,115 @@
+"""Бюджеты SQL-запросов и времени выполнения для представлений
+
+Вьюсет с QueryBudgetMixin задаёт в query_budgets для каждого действия
+предельное число запросов и предельное время одного запроса, для
+остальных действий действует QUERY_BUDGET['DEFAULT']. Число запросов
+считает обёртка курсора; на PostgreSQL обработчик выполняется в
+транзакции с SET LOCAL statement_timeout, и зависший запрос отменяет
+сам сервер. Нарушение бюджета — ответ 503. В строгом режиме
+(QUERY_BUDGET['STRICT'], включается в тестах) вместо ответа поднимается
+QueryBudgetError, чтобы регрессия не прошла незамеченной.
+"""
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .metrics import QUERY_BUDGET_VIOLATIONS, route_name
+
+QueryBudget = namedtuple('QueryBudget', ['max_queries', 'timeout_ms'])
+
+QUERY_CANCELED = '57014'
+
+
+class QueryBudgetError(AssertionError):
+    """Нарушение бюджета в строгом режиме"""
+
+
+class QueryBudgetExceeded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Запрос слишком тяжёлый, попробуйте сузить выборку.'
+    default_code = 'query_budget_exceeded'
+
+
+class QueryCounter:
+    def __init__(self, request, budget, strict):
+        self.request = request
+        self.budget = budget
+        self.strict = strict
+        self.count = 0
+
+    def violation(self, kind, message):
+        QUERY_BUDGET_VIOLATIONS.labels(route_name(self.request), kind).inc()
+        if self.strict:
+            return QueryBudgetError(message)
+        return QueryBudgetExceeded()
+
+    def __call__(self, run, sql, params, many, context):
+        self.count += 1
+        if self.count > self.budget.max_queries:
+            raise self.violation(
+                'queries',
+                f'{self.request.method} {self.request.path}: больше '
+                f'{self.budget.max_queries} SQL-запросов',
+            )
+        started = time.perf_counter()
+        result = run(sql, params, many, context)
+        duration = (time.perf_counter() - started) * 1000
+        if self.strict and duration > self.budget.timeout_ms:
+            raise self.violation(
+                'timeout',
+                f'{self.request.method} {self.request.path}: запрос шёл '
+                f'{duration:.0f} мс при бюджете {self.budget.timeout_ms} мс',
+            )
+        return result
+
+
+class QueryBudgetMixin:
+    """Бюджет запросов для действий вьюсета"""
+    query_budgets = {}
+
+    def get_query_budget(self, action):
+        budget = self.query_budgets.get(action)
+        if budget is None:
+            default = settings.QUERY_BUDGET['DEFAULT']
+            budget = QueryBudget(default['MAX_QUERIES'], default['TIMEOUT_MS'])
+        return budget
+
+    def dispatch(self, request, *args, **kwargs):
+        if not settings.QUERY_BUDGET['ENABLED']:
+            return super().dispatch(request, *args, **kwargs)
+        action = self.action_map.get(request.method.lower())
+        budget = self.get_query_budget(action)
+        counter = QueryCounter(
+            request, budget, settings.QUERY_BUDGET['STRICT']
+        )
+        self.query_budget_atomic = connection.vendor == 'postgresql'
+        if not self.query_budget_atomic:
+            with connection.execute_wrapper(counter):
+                return super().dispatch(request, *args, **kwargs)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SET LOCAL statement_timeout = %s', [budget.timeout_ms]
+                )
+            with connection.execute_wrapper(counter):
+                return super().dispatch(request, *args, **kwargs)
+
+    def handle_exception(self, exc):
+        if getattr(self, 'query_budget_atomic', False):
+            transaction.set_rollback(True)
+        cause = getattr(exc, '__cause__', None)
+        if (
+            isinstance(exc, OperationalError)
+            and getattr(cause, 'pgcode', None) == QUERY_CANCELED
+        ):
+            QUERY_BUDGET_VIOLATIONS.labels(
+                route_name(self.request), 'timeout'
+            ).inc()
+            if settings.QUERY_BUDGET['STRICT']:
+                raise QueryBudgetError(str(exc)) from exc
+            exc = QueryBudgetExceeded()
+        return super().handle_exception(exc)
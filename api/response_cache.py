@@ -0,0 +1,200 @@
+"""Кеш готовых тел ответов со сжатыми вариантами
+
+Анонимные GET-ответы вьюсетов с ResponseCacheMixin (произведения, жанры,
+категории) рендерятся и сжимаются один раз: тело без сжатия, его вариант
+gzip и, если установлен пакет brotli, вариант br хранятся одной записью
+в кеше responses. Повторный запрос получает вариант по Accept-Encoding
+без обращения к базе, рендеринга и сжатия.
+
+Запись помнит суррогатные ключи ответа (api/edge_cache.py) и момент
+начала его расчёта. purge_surrogate_keys вместе с очисткой шлюза ставит
+на ключи метки очистки; запись, у которой хотя бы один ключ очищен позже
+её расчёта, не отдаётся. Метки живут столько же, сколько записи.
+"""
+import gzip
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.response import Response
+
+from .edge_cache import SURROGATE_KEY_HEADER
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IDENTITY = 'identity'
+
+
+def get_response_cache():
+    return caches['responses']
+
+
+def compress(body, encoding):
+    if encoding == 'gzip':
+        return gzip.compress(
+            body, compresslevel=settings.RESPONSE_CACHE['GZIP_LEVEL'],
+            mtime=0,
+        )
+    return brotli.compress(
+        body, quality=settings.RESPONSE_CACHE['BROTLI_QUALITY']
+    )
+
+
+def available_encodings():
+    """Поддерживаемые сжатия в порядке предпочтения"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compressed_variants(body):
+    """Тело без сжатия и сжатые варианты, если они меньше исходного"""
+    variants = {IDENTITY: body}
+    if len(body) < settings.RESPONSE_CACHE['MIN_SIZE']:
+        return variants
+    for encoding in available_encodings():
+        compressed = compress(body, encoding)
+        if len(compressed) < len(body):
+            variants[encoding] = compressed
+    return variants
+
+
+def accepted_encodings(header):
+    """Accept-Encoding -> {сжатие: q}"""
+    accepted = {}
+    for part in header.split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def choose_encoding(header, variants):
+    accepted = accepted_encodings(header)
+    for encoding in available_encodings():
+        if encoding in variants and accepted.get(
+            encoding, accepted.get('*', 0)
+        ) > 0:
+            return encoding
+    return IDENTITY
+
+
+def _cache_key(request):
+    # Схема и хост входят в ключ: ссылки пагинации в ответе абсолютные
+    path = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'response:{path}'
+
+
+def _purge_key(key):
+    return f'purged:{key}'
+
+
+def purge_cached_responses(keys):
+    """Метки очистки суррогатных ключей для записей кеша ответов"""
+    now = time.time()
+    get_response_cache().set_many(
+        {_purge_key(key): now for key in keys},
+        settings.RESPONSE_CACHE['TIMEOUT'],
+    )
+
+
+def get_cached_entry(request):
+    cache = get_response_cache()
+    entry = cache.get(_cache_key(request))
+    if entry is None:
+        return None
+    purged = cache.get_many([_purge_key(key) for key in entry['keys']])
+    if any(moment >= entry['created'] for moment in purged.values()):
+        return None
+    return entry
+
+
+def store_entry(request, response, keys, created):
+    entry = {
+        'keys': keys,
+        'created': created,
+        'content_type': response['Content-Type'],
+        'variants': compressed_variants(response.content),
+    }
+    get_response_cache().set(
+        _cache_key(request), entry, settings.RESPONSE_CACHE['TIMEOUT']
+    )
+    return entry
+
+
+def serve_variant(request, response, entry):
+    """Подставляет в ответ вариант тела по Accept-Encoding"""
+    encoding = choose_encoding(
+        request.META.get('HTTP_ACCEPT_ENCODING', ''), entry['variants']
+    )
+    response.content = entry['variants'][encoding]
+    if encoding != IDENTITY:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+class ResponseCacheMixin:
+    """Готовые тела анонимных GET-ответов из кеша responses
+
+    Ставится перед EdgeCacheMixin: кешируются только ответы, которые
+    EdgeCacheMixin пометил суррогатными ключами.
+    """
+    cached_entry = None
+
+    def is_response_cacheable(self, request):
+        return (
+            settings.RESPONSE_CACHE['ENABLED']
+            and request.method == 'GET'
+            and request.auth is None
+            and request.accepted_renderer.format == 'json'
+        )
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.response_cache_started = time.time()
+        if not self.is_response_cacheable(request):
+            return
+        self.cached_entry = get_cached_entry(request)
+        if self.cached_entry is not None:
+            # Обработчик действия заменяется готовым ответом, как
+            # ViewSet.as_view привязывает действия к методам HTTP
+            setattr(self, request.method.lower(), self.cached_response)
+
+    def cached_response(self, request, *args, **kwargs):
+        return HttpResponse(content_type=self.cached_entry['content_type'])
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        entry = self.cached_entry
+        if entry is not None:
+            response[SURROGATE_KEY_HEADER] = ' '.join(entry['keys'])
+            return serve_variant(request, response, entry)
+        if (
+            not isinstance(response, Response)
+            or response.status_code != 200
+            or not response.has_header(SURROGATE_KEY_HEADER)
+            or not self.is_response_cacheable(request)
+        ):
+            return response
+        response.render()
+        entry = store_entry(
+            request, response, response[SURROGATE_KEY_HEADER].split(),
+            self.response_cache_started,
+        )
+        return serve_variant(request, response, entry)
@@ -1,8 +1,20 @@
+from django.conf import settings
 from rest_framework import serializers
 from rest_framework.generics import get_object_or_404
-from rest_framework.validators import UniqueValidator
 
-from .models import User, Category, Title, Review, Comment, Genre
+from .models import (
+    ArchivedReview,
+    User,
+    Category,
+    Title,
+    Review,
+    Comment,
+    Genre,
+    ChangeEvent,
+    ModerationActions,
+    ModerationLog,
+    TitleStats,
+)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -37,6 +49,22 @@ class TitleListSerializer(serializers.ModelSerializer):
         model = Title
 
 
+class TitleStatsSerializer(serializers.ModelSerializer):
+    count = serializers.ReadOnlyField()
+    average = serializers.ReadOnlyField()
+    median = serializers.ReadOnlyField()
+    histogram = serializers.ReadOnlyField()
+
+    class Meta:
+        fields = (
+            'count',
+            'average',
+            'median',
+            'histogram',
+        )
+        model = TitleStats
+
+
 class TitleMasterSerializer(serializers.ModelSerializer):
     category = serializers.SlugRelatedField(
         slug_field='slug',
@@ -51,7 +79,7 @@ class TitleMasterSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        fields = '__all__'
+        exclude = ('version', 'updated')
         model = Title
 
 
@@ -76,7 +104,13 @@ class ReviewSerializer(serializers.ModelSerializer):
         title_id = self.context['view'].kwargs.get('title_id')
         title = get_object_or_404(Title, pk=title_id)
         if request.method == 'POST':
-            if Review.objects.filter(title=title, author=author).exists():
+            reviewed = (
+                Review.objects.filter(title=title, author=author).exists()
+                or ArchivedReview.objects.filter(
+                    title_id=title.id, author_id=author.id
+                ).exists()
+            )
+            if reviewed:
                 raise serializers.ValidationError(
                     {'message': 'Вы уже оставили отзыв на это произведение.'}
                 )
@@ -96,13 +130,42 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['review']
 
 
+class UserReviewSerializer(serializers.ModelSerializer):
+    """Отзыв в ленте пользователя, с произведением"""
+    title_id = serializers.ReadOnlyField()
+    title = serializers.ReadOnlyField(source='title.name')
+
+    class Meta:
+        model = Review
+        fields = ('id', 'title_id', 'title', 'text', 'score', 'pub_date')
+
+
+class UserCommentSerializer(serializers.ModelSerializer):
+    """Комментарий в ленте пользователя, с отзывом и произведением"""
+    review_id = serializers.ReadOnlyField()
+    review_author = serializers.ReadOnlyField(source='review.author.username')
+    title_id = serializers.ReadOnlyField(source='review.title_id')
+    title = serializers.ReadOnlyField(source='review.title.name')
+
+    class Meta:
+        model = Comment
+        fields = (
+            'id',
+            'review_id',
+            'review_author',
+            'title_id',
+            'title',
+            'text',
+            'pub_date',
+        )
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         fields = (
             'username',
             'role',
             'email',
-            'confirmation_code',
             'bio',
             'first_name',
             'last_name'
@@ -131,12 +194,87 @@ class RegistrationSerializer(serializers.ModelSerializer):
             'email',
         )
         model = User
-    email = serializers.EmailField(
-        required=True,
-        validators=[UniqueValidator(queryset=User.objects.all())]
+    # Уникальность проверяет сама вставка, см. views.registration
+    email = serializers.EmailField(required=True)
+    username = serializers.CharField(max_length=30, required=True)
+
+
+class ChangeEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        fields = (
+            'id',
+            'object_type',
+            'action',
+            'object_id',
+            'title_id',
+            'review_id',
+            'created',
+        )
+        model = ChangeEvent
+
+
+class ModerationSerializer(serializers.Serializer):
+    """Условия массовой модерации: ids, author, title и окно времени"""
+    action = serializers.ChoiceField(choices=ModerationActions.choices)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False,
     )
-    username = serializers.CharField(
-        max_length=30,
+    author = serializers.SlugRelatedField(
+        slug_field='username',
+        queryset=User.objects.all(),
         required=False,
-        validators=[UniqueValidator(queryset=User.objects.all())]
     )
+    title = serializers.PrimaryKeyRelatedField(
+        queryset=Title.objects.all(), required=False,
+    )
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+    def validate_ids(self, value):
+        limit = settings.MODERATION['MAX_IDS']
+        if len(value) > limit:
+            raise serializers.ValidationError(
+                f'Можно указать не более {limit} идентификаторов.'
+            )
+        return value
+
+    def validate(self, data):
+        if not data.get('ids') and not {'author', 'title'} & set(data):
+            raise serializers.ValidationError(
+                'Укажите ids, author или title.'
+            )
+        if {'since', 'until'} & set(data) and 'title' not in data:
+            raise serializers.ValidationError(
+                {'title': ['Окно по времени задаётся внутри произведения.']}
+            )
+        return data
+
+    def get_criteria(self):
+        data = self.validated_data
+        criteria = {
+            name: data[name] for name in ('ids', 'since', 'until')
+            if name in data
+        }
+        for name in ('author', 'title'):
+            if name in data:
+                criteria[name] = data[name].id
+        return criteria
+
+
+class ModerationLogSerializer(serializers.ModelSerializer):
+    moderator = serializers.SlugRelatedField(
+        slug_field='username', read_only=True,
+    )
+
+    class Meta:
+        fields = (
+            'id',
+            'moderator',
+            'action',
+            'object_type',
+            'criteria',
+            'reviews',
+            'comments',
+            'created',
+        )
+        model = ModerationLog
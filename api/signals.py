@@ -0,0 +1,275 @@
+from django.db import connection
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .edge_cache import (
+    CATEGORIES_KEY,
+    GENRES_KEY,
+    TITLES_KEY,
+    purge_surrogate_keys,
+    review_comments_key,
+    title_key,
+    title_reviews_key,
+)
+from .facets import (
+    change_facet_counts,
+    genre_facets,
+    move_category_facets,
+    title_facets,
+)
+from .models import (
+    ArchivedComment,
+    ArchivedReview,
+    Category,
+    ChangeEvent,
+    Comment,
+    Genre,
+    EventActions,
+    EventObjects,
+    FacetCount,
+    Facets,
+    Review,
+    Title,
+    TitleStats,
+    User,
+)
+from .stats import change_score_counts, subtract_score_counts
+
+EVENTS_CHANNEL = 'yamdb_events'
+
+
+def notify_events(payload):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_notify(%s, %s)', [EVENTS_CHANNEL, payload]
+            )
+
+
+def record_event(object_type, action, object_id, title_id, review_id):
+    event = ChangeEvent.objects.create(
+        object_type=object_type,
+        action=action,
+        object_id=object_id,
+        title_id=title_id,
+        review_id=review_id,
+    )
+    notify_events(str(event.id))
+    return event
+
+
+def record_events(events, batch_size=1000):
+    """Пачка событий одним INSERT и одним уведомлением"""
+    if events:
+        ChangeEvent.objects.bulk_create(events, batch_size=batch_size)
+        notify_events('')
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    record_event(
+        EventObjects.REVIEW,
+        EventActions.CREATED if created else EventActions.UPDATED,
+        instance.id,
+        instance.title_id,
+        instance.id,
+    )
+
+
+@receiver(pre_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    record_event(
+        EventObjects.REVIEW,
+        EventActions.DELETED,
+        instance.id,
+        instance.title_id,
+        instance.id,
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    record_event(
+        EventObjects.COMMENT,
+        EventActions.CREATED if created else EventActions.UPDATED,
+        instance.id,
+        instance.review.title_id,
+        instance.review_id,
+    )
+
+
+@receiver(pre_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    record_event(
+        EventObjects.COMMENT,
+        EventActions.DELETED,
+        instance.id,
+        instance.review.title_id,
+        instance.review_id,
+    )
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, created, **kwargs):
+    if created:
+        TitleStats.objects.get_or_create(title=instance)
+
+
+@receiver(post_save, sender=Review)
+def review_score_saved(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_loaded_score', None)
+    current = None if instance.is_hidden else instance.score
+    change_score_counts(instance.title_id, added=current, removed=previous)
+    instance._loaded_score = current
+
+
+@receiver(post_delete, sender=Review)
+def review_score_deleted(sender, instance, **kwargs):
+    if not instance.is_hidden:
+        change_score_counts(instance.title_id, removed=instance.score)
+
+
+def bump_title_versions(titles):
+    """Сбрасывает кеш фрагментов произведений (api/fragments.py) и
+    отмечает произведения для пересчёта похожих (api/similarity.py)"""
+    titles.update(version=F('version') + 1, updated=timezone.now())
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_version_genres(sender, instance, action, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, Title):
+        bump_title_versions(Title.objects.filter(pk=instance.pk))
+        instance.refresh_from_db(fields=['version'])
+    else:
+        bump_title_versions(Title.objects.filter(pk__in=pk_set or []))
+
+
+@receiver([post_save, pre_delete], sender=Genre)
+def title_version_genre(sender, instance, created=False, **kwargs):
+    if not created:
+        bump_title_versions(Title.objects.filter(genre=instance))
+
+
+@receiver([post_save, pre_delete], sender=Category)
+def title_version_category(sender, instance, created=False, **kwargs):
+    if not created:
+        bump_title_versions(Title.objects.filter(category=instance))
+
+
+@receiver([post_save, post_delete], sender=Title)
+def purge_title(sender, instance, **kwargs):
+    purge_surrogate_keys([TITLES_KEY, title_key(instance.id)])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def purge_title_genres(sender, instance, action, **kwargs):
+    if action.startswith('post_') and isinstance(instance, Title):
+        purge_surrogate_keys([TITLES_KEY, title_key(instance.id)])
+    elif action.startswith('post_'):
+        purge_surrogate_keys([TITLES_KEY, GENRES_KEY])
+
+
+@receiver([post_save, post_delete], sender=Genre)
+def purge_genre(sender, instance, **kwargs):
+    purge_surrogate_keys([GENRES_KEY])
+
+
+@receiver([post_save, post_delete], sender=Category)
+def purge_category(sender, instance, **kwargs):
+    purge_surrogate_keys([CATEGORIES_KEY])
+
+
+@receiver([post_save, post_delete], sender=Review)
+def purge_review(sender, instance, **kwargs):
+    purge_surrogate_keys([
+        TITLES_KEY,
+        title_key(instance.title_id),
+        title_reviews_key(instance.title_id),
+    ])
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def purge_comment(sender, instance, **kwargs):
+    purge_surrogate_keys([review_comments_key(instance.review_id)])
+
+
+@receiver(post_delete, sender=Review)
+def delete_archived_comments(sender, instance, **kwargs):
+    ArchivedComment.objects.filter(review_id=instance.id).delete()
+
+
+@receiver(post_delete, sender=Title)
+def delete_archived_reviews(sender, instance, **kwargs):
+    reviews = ArchivedReview.objects.filter(title_id=instance.id)
+    ArchivedComment.objects.filter(
+        review_id__in=reviews.values('id')
+    ).delete()
+    reviews.delete()
+
+
+@receiver(post_delete, sender=User)
+def delete_archived_by_author(sender, instance, **kwargs):
+    reviews = ArchivedReview.objects.filter(author_id=instance.id)
+    ArchivedComment.objects.filter(
+        review_id__in=reviews.values('id')
+    ).delete()
+    ArchivedComment.objects.filter(author_id=instance.id).delete()
+    # Счётчики учитывают архивные оценки, вычитаем их вместе со строками
+    subtract_score_counts(reviews.values_list('title_id', 'score'))
+    reviews.delete()
+
+
+@receiver(post_save, sender=Title)
+def title_facets_saved(sender, instance, created, **kwargs):
+    current = (instance.category_id, instance.year)
+    previous = None if created else getattr(instance, '_loaded_facets', None)
+    if created:
+        change_facet_counts(added=title_facets(*current))
+    elif previous is not None and previous != current:
+        genre_ids = list(instance.genre.values_list('id', flat=True))
+        change_facet_counts(
+            added=title_facets(*current, genre_ids),
+            removed=title_facets(*previous, genre_ids),
+        )
+    instance._loaded_facets = current
+
+
+@receiver(pre_delete, sender=Title)
+def title_facets_deleted(sender, instance, **kwargs):
+    change_facet_counts(removed=title_facets(
+        instance.category_id, instance.year,
+        instance.genre.values_list('id', flat=True),
+    ))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_facets_genres(sender, instance, action, pk_set, **kwargs):
+    if action == 'post_add':
+        change_facet_counts(added=genre_facets(instance, pk_set))
+    elif action in ('pre_remove', 'pre_clear'):
+        instance._removed_facets = genre_facets(
+            instance, pk_set if action == 'pre_remove' else None
+        )
+    elif action in ('post_remove', 'post_clear'):
+        change_facet_counts(
+            removed=instance.__dict__.pop('_removed_facets', ())
+        )
+
+
+@receiver(post_delete, sender=Genre)
+def genre_facets_deleted(sender, instance, **kwargs):
+    FacetCount.objects.filter(facet=Facets.GENRE, value=instance.id).delete()
+
+
+@receiver(post_delete, sender=Category)
+def category_facets_deleted(sender, instance, **kwargs):
+    move_category_facets(instance.id)
@@ -0,0 +1,183 @@
+"""Пакетный расчёт похожих произведений
+
+Сходство двух произведений складывается из косинусной близости по жанрам,
+косинусной близости по пользователям, высоко оценившим оба произведения,
+и бонуса за общую категорию. Бонус начисляется только парам, у которых
+уже есть общий жанр или общие зрители, поэтому матрицы остаются
+разреженными. Для каждого произведения сохраняются top-K соседей.
+
+Сходство симметрично, поэтому частичный пересчёт кроме самих изменённых
+произведений захватывает всех, у кого с ними ненулевое сходство сейчас
+или кто держал их в соседях раньше: иначе их списки остались бы
+устаревшими до полного расчёта.
+"""
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from .models import (
+    ChangeEvent,
+    EventObjects,
+    Review,
+    SimilarTitle,
+    Title,
+)
+
+SIMILARITY_CHUNK = 512
+
+
+def _normalize_rows(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    norms[norms == 0] = 1
+    return (sparse.diags(1 / norms) @ matrix).tocsr()
+
+
+def _incidence(title_index, pairs, size):
+    """Бинарная матрица произведения × объекты по списку пар (title, obj)"""
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    rows = np.searchsorted(title_index, pairs[:, 0])
+    _, cols = np.unique(pairs[:, 1], return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs)), (rows, cols)),
+        shape=(size, cols.max() + 1 if len(cols) else 0),
+    )
+    matrix.data[:] = 1
+    return _normalize_rows(matrix)
+
+
+class SimilarityModel:
+    def __init__(self, top_k=None, weights=None, min_score=None):
+        self.top_k = top_k or settings.SIMILAR_TITLES_TOP_K
+        self.weights = weights or settings.SIMILAR_TITLES_WEIGHTS
+        self.min_score = (
+            settings.SIMILAR_TITLES_MIN_REVIEW_SCORE
+            if min_score is None else min_score
+        )
+
+    def load(self):
+        rows = list(Title.objects.order_by('id').values_list(
+            'id', 'category_id'
+        ))
+        self.title_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.categories = np.array(
+            [row[1] or 0 for row in rows], dtype=np.int64
+        )
+        size = len(self.title_ids)
+        self.genres = _incidence(
+            self.title_ids,
+            list(Title.genre.through.objects.values_list(
+                'title_id', 'genre_id'
+            )),
+            size,
+        )
+        self.viewers = _incidence(
+            self.title_ids,
+            list(Review.objects.filter(
+                score__gte=self.min_score, is_hidden=False
+            ).values_list('title_id', 'author_id')),
+            size,
+        )
+        return self
+
+    def _chunk_scores(self, rows):
+        scores = (
+            self.weights['genre'] * (self.genres[rows] @ self.genres.T)
+            + self.weights['reviews'] * (self.viewers[rows] @ self.viewers.T)
+        ).tocsr()
+        scores.eliminate_zeros()
+        for offset, row in enumerate(rows):
+            start, end = scores.indptr[offset], scores.indptr[offset + 1]
+            columns = scores.indices[start:end]
+            same = (
+                (self.categories[columns] == self.categories[row])
+                & (self.categories[row] != 0)
+            )
+            scores.data[start:end] += self.weights['category'] * same
+            scores.data[start:end][columns == row] = 0
+        scores.eliminate_zeros()
+        return scores
+
+    def _rows(self, title_ids):
+        return np.flatnonzero(np.isin(self.title_ids, list(title_ids)))
+
+    def related(self, title_ids):
+        """Произведения с ненулевым сходством с title_ids"""
+        rows = self._rows(title_ids)
+        related = set()
+        for start in range(0, len(rows), SIMILARITY_CHUNK):
+            scores = self._chunk_scores(rows[start:start + SIMILARITY_CHUNK])
+            related.update(
+                int(title_id) for title_id in self.title_ids[scores.indices]
+            )
+        return related
+
+    def neighbours(self, title_ids=None):
+        """Пары (title_id, similar_id, score) для указанных произведений"""
+        if title_ids is None:
+            rows = np.arange(len(self.title_ids))
+        else:
+            rows = self._rows(title_ids)
+        for start in range(0, len(rows), SIMILARITY_CHUNK):
+            chunk = rows[start:start + SIMILARITY_CHUNK]
+            scores = self._chunk_scores(chunk)
+            for offset, row in enumerate(chunk):
+                begin, end = scores.indptr[offset], scores.indptr[offset + 1]
+                data = scores.data[begin:end]
+                columns = scores.indices[begin:end]
+                if len(data) > self.top_k:
+                    best = np.argpartition(-data, self.top_k)[:self.top_k]
+                    data, columns = data[best], columns[best]
+                for column, score in zip(columns, data):
+                    yield (
+                        int(self.title_ids[row]),
+                        int(self.title_ids[column]),
+                        float(score),
+                    )
+
+
+def changed_title_ids():
+    """Произведения, изменённые после последнего расчёта: отзывы, сами
+    произведения, их жанры и категории (Title.updated)"""
+    last_build = (
+        SimilarTitle.objects.order_by('-updated')
+        .values_list('updated', flat=True).first()
+    )
+    if last_build is None:
+        return None
+    return set(ChangeEvent.objects.filter(
+        object_type=EventObjects.REVIEW, created__gt=last_build,
+    ).values_list('title_id', flat=True)) | set(Title.objects.filter(
+        updated__gt=last_build,
+    ).values_list('id', flat=True))
+
+
+def build_similar_titles(title_ids=None, batch_size=5000, **options):
+    """Пересчитывает соседей для title_ids (None — для всех произведений)"""
+    if title_ids is not None and not title_ids:
+        return 0
+    model = SimilarityModel(**options).load()
+    if title_ids is not None:
+        title_ids = set(title_ids) | model.related(title_ids) | set(
+            SimilarTitle.objects.filter(
+                similar_id__in=title_ids
+            ).values_list('title_id', flat=True)
+        )
+    created = 0
+    with transaction.atomic():
+        stale = SimilarTitle.objects.all()
+        if title_ids is not None:
+            stale = stale.filter(title_id__in=title_ids)
+        stale.delete()
+        batch = []
+        for title_id, similar_id, score in model.neighbours(title_ids):
+            batch.append(SimilarTitle(
+                title_id=title_id, similar_id=similar_id, score=score,
+            ))
+            if len(batch) >= batch_size:
+                SimilarTitle.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        SimilarTitle.objects.bulk_create(batch)
+        created += len(batch)
+    return created
@@ -0,0 +1,212 @@
+"""Профилирование SQL-запросов по представлениям
+
+Запросы приводятся к отпечатку (литералы заменены на ?, списки IN свёрнуты),
+по каждой паре (представление, отпечаток) копятся количество, суммарное
+время и выборка длительностей для p95. Для запросов дольше порога один раз
+сохраняется план EXPLAIN: он выполняется в точке сохранения, чтобы ошибка
+не прерывала транзакцию запроса на PostgreSQL. Каждый процесс периодически
+сбрасывает свою статистику в JSON-файл в каталоге SQL_PROFILER['DIR'],
+команда sql_report объединяет файлы и печатает рейтинг.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+PLACEHOLDER_RE = re.compile(r'%s')
+SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = PLACEHOLDER_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    normalized = normalize_sql(sql)
+    return hashlib.md5(normalized.encode()).hexdigest()[:12], normalized
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class QueryStats:
+    def __init__(self, sql, max_samples):
+        self.sql = sql
+        self.max_samples = max_samples
+        self.count = 0
+        self.total = 0.0
+        self.samples = []
+        self.explain = None
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        if len(self.samples) < self.max_samples:
+            self.samples.append(duration)
+        else:
+            position = random.randrange(self.count)
+            if position < self.max_samples:
+                self.samples[position] = duration
+
+    def as_dict(self):
+        return {
+            'sql': self.sql,
+            'count': self.count,
+            'total_ms': self.total,
+            'samples': self.samples,
+            'explain': self.explain,
+        }
+
+
+class SqlProfiler:
+    def __init__(self, options):
+        self.options = options
+        self.stats = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def wrapper(self, request):
+        def execute(run, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return run(sql, params, many, context)
+            finally:
+                duration = (time.perf_counter() - started) * 1000
+                self.record(request, sql, params, many, context, duration)
+        return execute
+
+    def record(self, request, sql, params, many, context, duration):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else request.path_info
+        key, normalized = fingerprint(sql)
+        with self._lock:
+            stats = self.stats.get((view, key))
+            if stats is None:
+                stats = self.stats[(view, key)] = QueryStats(
+                    normalized, self.options['SAMPLES']
+                )
+            stats.add(duration)
+            needs_explain = (
+                duration >= self.options['SLOW_MS']
+                and stats.explain is None
+                and not many
+                and sql.lstrip().upper().startswith('SELECT')
+            )
+            if needs_explain:
+                stats.explain = ''
+        if needs_explain:
+            stats.explain = self.explain(context['connection'], sql, params)
+
+    def explain(self, connection, sql, params):
+        if connection.vendor == 'postgresql':
+            prefix = (
+                'EXPLAIN (ANALYZE, BUFFERS) '
+                if self.options['EXPLAIN_ANALYZE'] else 'EXPLAIN '
+            )
+        elif connection.vendor == 'sqlite':
+            prefix = 'EXPLAIN QUERY PLAN '
+        else:
+            prefix = 'EXPLAIN '
+        # Служебные запросы не видят ни профилировщик, ни бюджет запросов
+        wrappers = connection.execute_wrappers
+        connection.execute_wrappers = []
+        try:
+            # Точка сохранения: упавший EXPLAIN на PostgreSQL иначе прервал
+            # бы транзакцию, и следующие запросы представления не прошли бы
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute(prefix + sql, params)
+                    return '\n'.join(
+                        ' '.join(str(column) for column in row)
+                        for row in cursor.fetchall()
+                    )
+        except Exception as error:
+            logger.warning('EXPLAIN не выполнен для %s: %s', sql, error)
+            return f'EXPLAIN не выполнен: {error}'
+        finally:
+            connection.execute_wrappers = wrappers
+
+    def request_finished(self):
+        with self._lock:
+            self.requests += 1
+            due = self.requests % self.options['DUMP_EVERY'] == 0
+        if due:
+            self.dump()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                f'{view}|{key}': {'view': view, **stats.as_dict()}
+                for (view, key), stats in self.stats.items()
+            }
+
+    def dump(self):
+        directory = self.options['DIR']
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'sql-profile-{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(path + '.tmp', path)
+        return path
+
+
+_profiler = None
+
+
+def get_profiler():
+    global _profiler
+    if _profiler is None:
+        _profiler = SqlProfiler(settings.SQL_PROFILER)
+        atexit.register(_profiler.dump)
+    return _profiler
+
+
+def load_report(directory):
+    """Объединяет файлы всех процессов в список строк отчёта"""
+    merged = {}
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith('sql-profile-') and name.endswith('.json')):
+            continue
+        with open(os.path.join(directory, name)) as file:
+            for key, entry in json.load(file).items():
+                row = merged.setdefault(key, {
+                    'view': entry['view'],
+                    'fingerprint': key.split('|')[-1],
+                    'sql': entry['sql'],
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'samples': [],
+                    'explain': None,
+                })
+                row['count'] += entry['count']
+                row['total_ms'] += entry['total_ms']
+                row['samples'].extend(entry['samples'])
+                row['explain'] = row['explain'] or entry['explain']
+    rows = []
+    for row in merged.values():
+        samples = row.pop('samples')
+        row['p95_ms'] = percentile(samples, 0.95)
+        row['mean_ms'] = row['total_ms'] / row['count']
+        rows.append(row)
+    return rows
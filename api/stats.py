@@ -0,0 +1,179 @@
+"""Поддержка распределения оценок произведений (TitleStats)"""
+import itertools
+import time
+from collections import Counter, defaultdict, namedtuple
+
+import numpy as np
+
+from django.db import connection, transaction
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.db.models.functions import Cast, NullIf
+
+from .models import (
+    SCORE_FIELDS,
+    SCORES,
+    ArchivedReview,
+    Review,
+    Title,
+    TitleStats,
+)
+
+
+def title_rating():
+    """Средняя оценка по счётчикам TitleStats для annotate() произведений
+
+    Счётчики учитывают и архивные отзывы, которых нет в таблице Review.
+    """
+    total = sum(
+        F(f'stats__{field}') * score
+        for score, field in zip(SCORES, SCORE_FIELDS)
+    )
+    count = sum(F(f'stats__{field}') for field in SCORE_FIELDS)
+    return ExpressionWrapper(
+        Cast(total, FloatField()) / NullIf(count, 0),
+        output_field=FloatField(),
+    )
+
+
+def change_score_counts(title_id, added=None, removed=None):
+    """Сдвигает счётчики оценок произведения одним UPDATE"""
+    changes = {}
+    if added is not None:
+        changes[f'score_{added}'] = F(f'score_{added}') + 1
+    if removed is not None:
+        changes[f'score_{removed}'] = F(f'score_{removed}') - 1
+    if added == removed or not changes:
+        return
+    updated = TitleStats.objects.filter(title_id=title_id).update(**changes)
+    # Без строки счётчиков пересчитываем только при добавлении: при
+    # каскадном удалении произведения счётчики удаляются раньше отзывов,
+    # и вычитания после пересчёта по очищенной таблице ушли бы в минус
+    if not updated and added is not None:
+        rebuild_title_stats([title_id])
+
+
+def subtract_score_counts(scores):
+    """Вычитает оценки [(title_id, score)], по одному UPDATE на произведение"""
+    by_title = defaultdict(Counter)
+    for title_id, score in scores:
+        by_title[title_id][score] += 1
+    for title_id, counts in by_title.items():
+        TitleStats.objects.filter(title_id=title_id).update(**{
+            f'score_{score}': F(f'score_{score}') - amount
+            for score, amount in counts.items()
+        })
+
+
+class RebuildReport(namedtuple(
+    'RebuildReport', ['rows', 'titles', 'changed', 'seconds']
+)):
+    """Итог пересчёта: прочитано строк, произведений, изменено счётчиков"""
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def score_chunks(queryset, chunk_size):
+    """Пары (title_id, score) массивами по chunk_size строк
+
+    iterator() читает через серверный курсор (на PostgreSQL), в памяти
+    одновременно только один кусок.
+    """
+    rows = queryset.values_list('title_id', 'score').order_by().iterator(
+        chunk_size=chunk_size
+    )
+    while True:
+        chunk = np.array(
+            list(itertools.islice(rows, chunk_size)), dtype=np.int64
+        )
+        if not len(chunk):
+            return
+        yield chunk[:, 0], chunk[:, 1]
+
+
+def score_histograms(title_ids, sources, chunk_size):
+    """Гистограммы оценок (len(title_ids) x 10) и число прочитанных строк
+
+    title_ids — отсортированный массив; строка произведения — его позиция
+    в массиве, ячейка гистограммы — позиция * 10 + оценка - 1, и кусок
+    складывается одним bincount. Число и сумма оценок — свёртки
+    гистограммы, отдельно их не копим.
+    """
+    size = len(title_ids) * len(SCORES)
+    histograms = np.zeros(size, dtype=np.int64)
+    rows = 0
+    for source in sources:
+        for titles, scores in score_chunks(source, chunk_size):
+            rows += len(titles)
+            if not len(title_ids):
+                continue
+            index = np.minimum(
+                np.searchsorted(title_ids, titles), len(title_ids) - 1
+            )
+            known = title_ids[index] == titles
+            histograms += np.bincount(
+                index[known] * len(SCORES) + scores[known] - 1,
+                minlength=size,
+            )
+    return histograms.reshape(-1, len(SCORES)), rows
+
+
+def rebuild_title_stats(title_ids=None, batch_size=1000, chunk_size=100000):
+    """Пересчитывает распределения за один проход по таблицам отзывов
+
+    Без title_ids — все произведения. Записываются только изменившиеся
+    счётчики: bulk_update существующих, bulk_create недостающих.
+    """
+    started = time.perf_counter()
+    titles = Title.objects.all()
+    sources = [
+        Review.objects.filter(is_hidden=False), ArchivedReview.objects.all(),
+    ]
+    existing = TitleStats.objects.all()
+    if title_ids is not None:
+        titles = titles.filter(id__in=title_ids)
+        sources = [
+            source.filter(title_id__in=title_ids) for source in sources
+        ]
+        existing = existing.filter(title_id__in=title_ids)
+    ids = np.array(
+        sorted(titles.values_list('id', flat=True)), dtype=np.int64
+    )
+    histograms, rows = score_histograms(ids, sources, chunk_size)
+
+    current = np.zeros_like(histograms)
+    present = np.zeros(len(ids), dtype=bool)
+    stored = np.array(
+        list(existing.values_list('title_id', *SCORE_FIELDS)),
+        dtype=np.int64,
+    ).reshape(-1, len(SCORE_FIELDS) + 1)
+    if len(ids) and len(stored):
+        index = np.minimum(np.searchsorted(ids, stored[:, 0]), len(ids) - 1)
+        known = ids[index] == stored[:, 0]
+        current[index[known]] = stored[known, 1:]
+        present[index[known]] = True
+    changed = np.flatnonzero(
+        (current != histograms).any(axis=1) | ~present
+    )
+
+    def make_stats(position):
+        return TitleStats(title_id=int(ids[position]), **dict(zip(
+            SCORE_FIELDS, histograms[position].tolist()
+        )))
+
+    created = [make_stats(i) for i in changed if not present[i]]
+    # bulk_create в Django 3.0 сам не ограничивает пачку числом параметров
+    create_batch = min(batch_size, max(connection.ops.bulk_batch_size(
+        ['title_id'] + SCORE_FIELDS, created
+    ), 1))
+    with transaction.atomic():
+        TitleStats.objects.bulk_update(
+            [make_stats(i) for i in changed if present[i]],
+            SCORE_FIELDS,
+            batch_size=batch_size,
+        )
+        TitleStats.objects.bulk_create(created, batch_size=create_batch)
+    return RebuildReport(
+        rows, len(ids), len(changed), time.perf_counter() - started
+    )
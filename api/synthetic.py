@@ -0,0 +1,421 @@
+"""Детерминированный синтетический набор данных для нагрузочных прогонов
+
+Распределения приближены к боевым: число отзывов на произведение следует
+закону Ципфа, активность пользователей — степенному закону, у
+произведений по нескольку жанров, часть отзывов собирает длинные ветки
+комментариев. Все случайные величины берутся из numpy.random.Generator с
+заданным seed, даты отсчитываются от заданного дня, поэтому одинаковые
+параметры на пустой базе дают одинаковый набор.
+
+Пользователи, произведения, отзывы и комментарии пишутся в обход ORM и
+сигналов (COPY на PostgreSQL, executemany на остальных базах) с заранее
+выданными id, поэтому комментарии ссылаются на отзывы без обратного
+чтения. Производные данные (TitleStats, FacetCount) пересчитываются в
+конце, как после любого массового импорта. Вместе с набором можно
+записать смесь GET-запросов к API для воспроизведения нагрузки.
+"""
+import csv
+import io
+import json
+import time
+from collections import namedtuple
+from datetime import datetime, time as day_start, timezone as dt_timezone
+
+import numpy as np
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from .facets import rebuild_facet_counts
+from .models import (
+    ArchivedComment,
+    ArchivedReview,
+    Category,
+    Comment,
+    Genre,
+    Review,
+    Title,
+    User,
+    UserRoles,
+)
+from .stats import rebuild_title_stats
+
+SECONDS_PER_DAY = 24 * 60 * 60
+# Доли видов запросов в смеси для воспроизведения
+REQUEST_MIX = (
+    ('titles', 25),
+    ('filtered_titles', 15),
+    ('title', 20),
+    ('title_page', 5),
+    ('reviews', 15),
+    ('comments', 10),
+    ('facets', 5),
+    ('genres', 3),
+    ('categories', 2),
+)
+WORDS = (
+    'сюжет', 'герои', 'финал', 'атмосфера', 'темп', 'диалоги', 'музыка',
+    'перевод', 'идея', 'мир', 'стиль', 'концовка', 'начало', 'автор',
+    'сильный', 'слабый', 'неожиданный', 'затянутый', 'живой', 'честный',
+    'смешной', 'мрачный', 'красивый', 'скучный', 'точный', 'лишний',
+)
+
+DatasetReport = namedtuple('DatasetReport', [
+    'categories', 'genres', 'users', 'titles', 'reviews', 'comments',
+    'seconds',
+])
+
+
+def zipf_weights(count, exponent):
+    """Вероятности рангов 1..count по закону Ципфа"""
+    weights = 1.0 / np.arange(1, count + 1, dtype=np.float64) ** exponent
+    return weights / weights.sum()
+
+
+def insert_rows(model, columns, rows):
+    """Вставка кортежей в таблицу модели в обход ORM"""
+    table = connection.ops.quote_name(model._meta.db_table)
+    names = ', '.join(connection.ops.quote_name(column) for column in columns)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            buffer.seek(0)
+            cursor.copy_expert(
+                f'COPY {table} ({names}) FROM STDIN WITH (FORMAT csv)',
+                buffer,
+            )
+        else:
+            placeholders = ', '.join(['%s'] * len(columns))
+            cursor.executemany(
+                f'INSERT INTO {table} ({names}) VALUES ({placeholders})',
+                rows,
+            )
+
+
+def next_id(*models):
+    return max(
+        model.objects.aggregate(last=Max('id'))['last'] or 0
+        for model in models
+    ) + 1
+
+
+class DatasetGenerator:
+    """Набор заданного объёма; generate() пишет его в базу"""
+
+    def __init__(self, seed=0, categories=10, genres=30, users=1000,
+                 titles=2000, reviews=20000, comments=20000,
+                 title_exponent=1.1, user_exponent=1.2, thread_exponent=1.0,
+                 days=3 * 365, end=None, batch_size=50000):
+        self.rng = np.random.default_rng(seed)
+        self.counts = {
+            'categories': categories, 'genres': genres, 'users': users,
+            'titles': titles, 'reviews': reviews, 'comments': comments,
+        }
+        self.title_exponent = title_exponent
+        self.user_exponent = user_exponent
+        self.thread_exponent = thread_exponent
+        end = end or datetime.now(dt_timezone.utc).date()
+        self.end = int(datetime.combine(
+            end, day_start(), tzinfo=dt_timezone.utc
+        ).timestamp())
+        self.span = days * SECONDS_PER_DAY
+        self.batch_size = batch_size
+        self.texts = [
+            ' '.join(self.rng.choice(WORDS, size=size)).capitalize() + '.'
+            for size in 3 + self.rng.poisson(12, size=256)
+        ]
+
+    def generate(self):
+        started = time.perf_counter()
+        with transaction.atomic():
+            self._taxonomy()
+            self._users()
+            self._titles()
+            self._reviews()
+            self._comments()
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [User, Title, Review, Comment]
+                ):
+                    cursor.execute(sql)
+        rebuild_title_stats()
+        rebuild_facet_counts()
+        return DatasetReport(
+            *(len(getattr(self, name)) for name in (
+                'category_ids', 'genre_ids', 'user_ids', 'title_ids',
+                'review_titles',
+            )),
+            int(self.thread_counts.sum()),
+            time.perf_counter() - started,
+        )
+
+    def _timestamps(self, seconds):
+        """Строки дат UTC, которые принимают и sqlite, и COPY"""
+        stamps = np.char.replace(np.datetime_as_string(
+            seconds.astype('datetime64[s]')
+        ), 'T', ' ')
+        if connection.vendor == 'postgresql':
+            stamps = np.char.add(stamps, '+00:00')
+        return stamps.tolist()
+
+    def _sample(self, cdf, size):
+        """Позиции по накопленным весам cdf, с повторами"""
+        return np.minimum(
+            np.searchsorted(cdf, self.rng.random(size) * cdf[-1], 'right'),
+            len(cdf) - 1,
+        )
+
+    def _distinct(self, weights, cdf, size):
+        """size различных позиций с весами weights
+
+        Небольшие выборки — выборка с повторами и отбрасывание дублей,
+        крупные — ключи Гумбеля (точная выборка без возвращения за O(n)).
+        """
+        if size * 8 > len(cdf):
+            keys = np.log(weights) + self.rng.gumbel(size=len(weights))
+            return np.argpartition(-keys, size - 1)[:size]
+        picked = np.empty(0, dtype=np.int64)
+        while len(picked) < size:
+            picked = np.concatenate([
+                picked, self._sample(cdf, (size - len(picked)) * 2 + 4),
+            ])
+            _, first = np.unique(picked, return_index=True)
+            picked = picked[np.sort(first)]
+        return picked[:size]
+
+    def _taxonomy(self):
+        categories = Category.objects.bulk_create(
+            Category(name=f'Категория {i}', slug=f'category-{i}')
+            for i in range(self.counts['categories'])
+        )
+        genres = Genre.objects.bulk_create(
+            Genre(name=f'Жанр {i}', slug=f'genre-{i}')
+            for i in range(self.counts['genres'])
+        )
+        # bulk_create на sqlite не возвращает id, читаем их по slug
+        self.category_slugs = [category.slug for category in categories]
+        self.genre_slugs = [genre.slug for genre in genres]
+        by_slug = dict(Category.objects.filter(
+            slug__in=self.category_slugs
+        ).values_list('slug', 'id'))
+        self.category_ids = [by_slug[slug] for slug in self.category_slugs]
+        by_slug = dict(Genre.objects.filter(
+            slug__in=self.genre_slugs
+        ).values_list('slug', 'id'))
+        self.genre_ids = [by_slug[slug] for slug in self.genre_slugs]
+
+    def _users(self):
+        count = self.counts['users']
+        first = next_id(User)
+        self.user_ids = np.arange(first, first + count, dtype=np.int64)
+        # Активность — по рангу, ранги перемешаны относительно id
+        self.user_weights = zipf_weights(count, self.user_exponent)[
+            self.rng.permutation(count)
+        ]
+        self.user_cdf = np.cumsum(self.user_weights)
+        joined = self._timestamps(
+            self.end - self.rng.integers(self.span, size=count)
+        )
+        columns = [
+            'id', 'password', 'username', 'email', 'role', 'bio',
+            'is_superuser', 'is_staff', 'is_active', 'date_joined',
+        ]
+        for start in range(0, count, self.batch_size):
+            insert_rows(User, columns, [
+                (
+                    int(self.user_ids[i]), UNUSABLE_PASSWORD_PREFIX,
+                    f'reader{i}', f'reader{i}@yamdb.fake', UserRoles.USER,
+                    '', False, False, True, joined[i],
+                )
+                for i in range(start, min(start + self.batch_size, count))
+            ])
+
+    def _titles(self):
+        count = self.counts['titles']
+        year = datetime.utcfromtimestamp(self.end).year
+        first = next_id(Title)
+        self.title_ids = np.arange(first, first + count, dtype=np.int64)
+        self.title_weights = zipf_weights(count, self.title_exponent)[
+            self.rng.permutation(count)
+        ]
+        years = np.maximum(year + 1 - self.rng.geometric(0.03, count), 1900)
+        categories = self.rng.choice(
+            len(self.category_ids), size=count,
+            p=zipf_weights(len(self.category_ids), 1.0),
+        )
+        genre_weights = np.log(zipf_weights(len(self.genre_ids), 1.0))
+        genre_counts = np.minimum(
+            1 + self.rng.binomial(3, 0.4, count), len(self.genre_ids)
+        )
+        columns = [
+            'id', 'name', 'year', 'description', 'category_id', 'version',
+            'updated',
+        ]
+        updated = self._timestamps(np.array([self.end]))[0]
+        for start in range(0, count, self.batch_size):
+            stop = min(start + self.batch_size, count)
+            insert_rows(Title, columns, [
+                (
+                    int(self.title_ids[i]), f'Произведение {i}',
+                    int(years[i]), self.texts[i % len(self.texts)],
+                    self.category_ids[categories[i]], 1, updated,
+                )
+                for i in range(start, stop)
+            ])
+            # Жанры без повторов: ключи Гумбеля по весам Ципфа
+            keys = genre_weights + self.rng.gumbel(
+                size=(stop - start, len(self.genre_ids))
+            )
+            order = np.argsort(-keys, axis=1)
+            insert_rows(Title.genre.through, ['title_id', 'genre_id'], [
+                (int(self.title_ids[start + row]), self.genre_ids[genre])
+                for row in range(stop - start)
+                for genre in order[row, :genre_counts[start + row]]
+            ])
+
+    def _reviews(self):
+        counts = np.minimum(
+            self.rng.multinomial(self.counts['reviews'], self.title_weights),
+            len(self.user_ids),
+        )
+        total = int(counts.sum())
+        first = next_id(Review, ArchivedReview)
+        self.review_ids = np.arange(first, first + total, dtype=np.int64)
+        self.review_titles = np.repeat(np.arange(len(counts)), counts)
+        self.review_dates = self.end - self.rng.integers(
+            self.span, size=total
+        )
+        quality = self.rng.normal(7, 1.5, len(counts))
+        columns = [
+            'id', 'title_id', 'author_id', 'text', 'score', 'pub_date',
+            'is_hidden',
+        ]
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        start = 0
+        while start < total:
+            stop = min(start + self.batch_size, total)
+            titles = self.review_titles[start:stop]
+            # Отзывы произведения целиком в одной пачке: авторы различны
+            stop = int(offsets[titles[-1] + 1]) if len(titles) else stop
+            titles = self.review_titles[start:stop]
+            authors = np.concatenate([
+                self._distinct(self.user_weights, self.user_cdf, int(size))
+                for size in counts[titles[0]:titles[-1] + 1] if size
+            ])
+            scores = np.clip(np.rint(
+                self.rng.normal(quality[titles], 2.0)
+            ), 1, 10).astype(np.int64)
+            texts = self.rng.integers(len(self.texts), size=stop - start)
+            insert_rows(Review, columns, list(zip(
+                self.review_ids[start:stop].tolist(),
+                self.title_ids[titles].tolist(),
+                self.user_ids[authors].tolist(),
+                [self.texts[i] for i in texts],
+                scores.tolist(),
+                self._timestamps(self.review_dates[start:stop]),
+                [False] * (stop - start),
+            )))
+            start = stop
+
+    def _comments(self):
+        reviews = len(self.review_ids)
+        if not reviews:
+            self.thread_counts = np.zeros(0, dtype=np.int64)
+            return
+        # Длина ветки — по рангу отзыва, самые обсуждаемые — случайные
+        self.thread_counts = self.rng.multinomial(
+            self.counts['comments'],
+            zipf_weights(reviews, self.thread_exponent)[
+                self.rng.permutation(reviews)
+            ],
+        )
+        offsets = np.concatenate([[0], np.cumsum(self.thread_counts)])
+        first = next_id(Comment, ArchivedComment)
+        columns = ['id', 'review_id', 'author_id', 'text', 'pub_date',
+                   'is_hidden']
+        start = 0
+        while start < reviews:
+            stop = int(np.searchsorted(
+                offsets, offsets[start] + self.batch_size, 'right'
+            )) - 1
+            stop = min(max(stop, start + 1), reviews)
+            owners = np.repeat(
+                np.arange(start, stop), self.thread_counts[start:stop]
+            )
+            size = len(owners)
+            dates = np.minimum(
+                self.review_dates[owners] + self.rng.exponential(
+                    3 * SECONDS_PER_DAY, size
+                ).astype(np.int64),
+                self.end,
+            )
+            ids = first + offsets[start] + np.arange(size)
+            texts = self.rng.integers(len(self.texts), size=size)
+            insert_rows(Comment, columns, list(zip(
+                ids.tolist(),
+                self.review_ids[owners].tolist(),
+                self.user_ids[self._sample(self.user_cdf, size)].tolist(),
+                [self.texts[i] for i in texts],
+                self._timestamps(dates),
+                [False] * size,
+            )))
+            start = stop
+
+    def request_mix(self, count):
+        """Строки смеси запросов: {'method': 'GET', 'path': ...}
+
+        Произведения выбираются по популярности (весам отзывов), ветки
+        комментариев — по числу комментариев.
+        """
+        kinds, shares = zip(*REQUEST_MIX)
+        chosen = self.rng.choice(
+            len(kinds), size=count, p=np.array(shares) / sum(shares)
+        )
+        title_cdf = np.cumsum(self.title_weights)
+        thread_cdf = np.cumsum(self.thread_counts)
+        genre_p = zipf_weights(len(self.genre_slugs), 1.0)
+        for kind in chosen:
+            yield {'method': 'GET', 'path': self._path(
+                kinds[kind], title_cdf, thread_cdf, genre_p
+            )}
+
+    def _path(self, kind, title_cdf, thread_cdf, genre_p):
+        base = '/api/v1'
+        title = int(self.title_ids[self._sample(title_cdf, 1)[0]])
+        if kind == 'titles':
+            page = int(self.rng.geometric(0.5))
+            return f'{base}/titles/' + (f'?page={page}' if page > 1 else '')
+        if kind == 'filtered_titles':
+            genre = self.genre_slugs[self.rng.choice(len(genre_p), p=genre_p)]
+            category = self.category_slugs[
+                self.rng.integers(len(self.category_slugs))
+            ]
+            return f'{base}/titles/?genre={genre}&category={category}'
+        if kind == 'title':
+            return f'{base}/titles/{title}/'
+        if kind == 'title_page':
+            return f'{base}/titles/{title}/?include=reviews,comments'
+        if kind == 'reviews':
+            return f'{base}/titles/{title}/reviews/'
+        if kind == 'comments' and len(thread_cdf) and thread_cdf[-1]:
+            review = int(self._sample(thread_cdf, 1)[0])
+            title = int(self.title_ids[self.review_titles[review]])
+            return (
+                f'{base}/titles/{title}/reviews/'
+                f'{int(self.review_ids[review])}/comments/'
+            )
+        if kind == 'facets':
+            return f'{base}/titles/facets/'
+        if kind == 'genres':
+            return f'{base}/genres/'
+        if kind == 'categories':
+            return f'{base}/categories/'
+        return f'{base}/titles/{title}/reviews/'
+
+    def write_request_mix(self, path, count):
+        with open(path, 'w', encoding='utf-8') as output:
+            for line in self.request_mix(count):
+                output.write(json.dumps(line, ensure_ascii=False) + '\n')
@@ -0,0 +1,193 @@
+"""Ограничение частоты запросов по алгоритму token bucket
+
+Состояние корзин хранится в общем хранилище из настройки THROTTLE_STORE,
+чтобы лимиты действовали сразу для всех воркеров и узлов. RedisBucketStore
+списывает токен атомарно одним Lua-скриптом; LocalBucketStore держит
+корзины в памяти процесса и подходит для разработки и тестов.
+Лимиты задаются по областям в REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].
+"""
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .metrics import THROTTLE_STORE_ERRORS
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+BucketState = namedtuple(
+    'BucketState', ['allowed', 'limit', 'remaining', 'retry_after', 'reset']
+)
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'100/min' -> (100, 60), формат как у DRF"""
+    amount, period = rate.split('/')
+    return int(amount), PERIODS[period[0]]
+
+
+def _bucket_state(allowed, tokens, capacity, refill_rate):
+    return BucketState(
+        allowed=allowed,
+        limit=capacity,
+        remaining=int(tokens),
+        retry_after=0 if allowed else (1 - tokens) / refill_rate,
+        reset=(capacity - tokens) / refill_rate,
+    )
+
+
+class LocalBucketStore:
+    """Корзины в памяти процесса"""
+
+    def __init__(self, clock=time.monotonic, **options):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def consume(self, key, capacity, refill_rate):
+        now = self.clock()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+        return _bucket_state(allowed, tokens, capacity, refill_rate)
+
+    def clear(self):
+        with self._lock:
+            self._buckets = {}
+
+
+class RedisBucketStore:
+    """Корзины в Redis, списание токена — один атомарный вызов скрипта"""
+
+    SCRIPT = '''
+        local capacity = tonumber(ARGV[1])
+        local rate = tonumber(ARGV[2])
+        local now = tonumber(ARGV[3])
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+        local tokens = tonumber(state[1]) or capacity
+        local updated = tonumber(state[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+        local allowed = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+            allowed = 1
+        end
+        redis.call('HMSET', KEYS[1], 'tokens', tokens, 'updated', now)
+        redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+        return {allowed, tostring(tokens)}
+    '''
+
+    def __init__(self, **options):
+        if redis is None:
+            raise ImproperlyConfigured(
+                'Для RedisBucketStore установите пакет redis.'
+            )
+        self.client = redis.Redis.from_url(
+            options['URL'],
+            socket_timeout=options.get('TIMEOUT', 0.05),
+        )
+        self.prefix = options.get('KEY_PREFIX', 'throttle')
+        self.script = self.client.register_script(self.SCRIPT)
+
+    def consume(self, key, capacity, refill_rate):
+        # Недоступный Redis не должен останавливать API: запрос
+        # пропускается без списания, сбой пишется в лог и в метрику
+        try:
+            allowed, tokens = self.script(
+                keys=[f'{self.prefix}:{key}'],
+                args=[capacity, refill_rate, time.time()],
+            )
+        except redis.RedisError as error:
+            THROTTLE_STORE_ERRORS.inc()
+            logger.warning('Хранилище лимитов недоступно: %s', error)
+            return _bucket_state(True, capacity, capacity, refill_rate)
+        return _bucket_state(
+            bool(allowed), float(tokens), capacity, refill_rate
+        )
+
+
+@lru_cache(maxsize=None)
+def get_bucket_store():
+    backend = import_string(settings.THROTTLE_STORE['BACKEND'])
+    return backend(**settings.THROTTLE_STORE.get('OPTIONS', {}))
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Базовый класс: область scope, ключ — пользователь или IP"""
+    scope = None
+
+    def applies(self, request):
+        return True
+
+    def get_cache_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'{self.scope}:user:{request.user.pk}'
+        return f'{self.scope}:ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        if not self.applies(request):
+            return True
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if rate is None:
+            return True
+        capacity, duration = parse_rate(rate)
+        state = get_bucket_store().consume(
+            self.get_cache_key(request), capacity, capacity / duration,
+        )
+        self.state = state
+        current = getattr(request._request, 'ratelimit', None)
+        if current is None or state.remaining < current.remaining:
+            request._request.ratelimit = state
+        return state.allowed
+
+    def wait(self):
+        return math.ceil(self.state.retry_after)
+
+
+class AnonReadThrottle(TokenBucketThrottle):
+    scope = 'anon_read'
+
+    def applies(self, request):
+        return (
+            request.method in SAFE_METHODS
+            and not request.user.is_authenticated
+        )
+
+
+class UserWriteThrottle(TokenBucketThrottle):
+    scope = 'user_write'
+
+    def applies(self, request):
+        return (
+            request.method not in SAFE_METHODS
+            and request.user.is_authenticated
+        )
+
+
+class AuthThrottle(TokenBucketThrottle):
+    """Регистрация и получение токена, ключ — всегда IP"""
+    scope = 'auth'
+
+    def get_cache_key(self, request):
+        return f'{self.scope}:ip:{self.get_ident(request)}'
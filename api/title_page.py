@@ -0,0 +1,74 @@
+"""Страница произведения одним запросом: ?include=reviews,comments
+
+К детальному ответу добавляются последние TITLE_PAGE['REVIEWS'] отзывов
+и для каждого — последние TITLE_PAGE['COMMENTS'] комментариев. Комментарии
+всех отзывов выбираются одним запросом: ROW_NUMBER() OVER (PARTITION BY
+review_id ORDER BY pub_date DESC, id DESC) нумерует их внутри отзыва, и
+внешний запрос оставляет первые M. Архив дочитывается тем же способом
+только для отзывов, которым не хватило живых строк, поэтому число
+запросов не зависит ни от N, ни от M.
+"""
+from django.db.models import F, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+
+from .archive import load_comments, load_reviews
+from .models import ArchivedComment, ArchivedReview, Comment, Review
+
+ORDERING = ('-pub_date', '-id')
+
+
+def recent_reviews(title_id, limit):
+    reviews = list(
+        Review.objects.filter(title_id=title_id, is_hidden=False)
+        .select_related('author', 'title')
+        .order_by(*ORDERING)[:limit]
+    )
+    if len(reviews) < limit:
+        # Архивные отзывы всегда старше живых
+        reviews.extend(load_reviews(
+            ArchivedReview.objects.filter(title_id=title_id)
+            .order_by(*ORDERING)[:limit - len(reviews)]
+        ))
+    return reviews
+
+
+def top_per_review(queryset, review_ids, limit):
+    """Первые limit строк queryset в каждом отзыве, одним запросом"""
+    ranked = queryset.filter(review_id__in=review_ids).annotate(
+        position=Window(
+            expression=RowNumber(),
+            partition_by=[F('review_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        )
+    ).order_by().values('id', 'position')
+    sql, params = ranked.query.sql_with_params()
+    return queryset.filter(id__in=RawSQL(
+        f'SELECT ranked.id FROM ({sql}) ranked WHERE ranked.position <= %s',
+        (*params, limit),
+    )).order_by('review_id', *ORDERING)
+
+
+def recent_comments(review_ids, limit):
+    """Словарь review_id -> последние limit комментариев"""
+    grouped = {review_id: [] for review_id in review_ids}
+    if not review_ids:
+        return grouped
+    comments = top_per_review(
+        Comment.objects.filter(is_hidden=False).select_related('author'),
+        review_ids,
+        limit,
+    )
+    for comment in comments:
+        grouped[comment.review_id].append(comment)
+    short = [
+        review_id for review_id, items in grouped.items()
+        if len(items) < limit
+    ]
+    if short:
+        rows = top_per_review(ArchivedComment.objects.all(), short, limit)
+        for comment in load_comments(rows):
+            items = grouped[comment.review_id]
+            if len(items) < limit:
+                items.append(comment)
+    return grouped
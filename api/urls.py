@@ -2,6 +2,7 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 
+from .events import event_stream
 from .views import (
     UserViewSet,
     TitleViewSet,
@@ -11,6 +12,9 @@ from .views import (
     CommentViewSet,
     registration,
     get_token,
+    ChangeEventViewSet,
+    MemoryDiagnosticsViewSet,
+    ModerationViewSet,
 )
 
 router = DefaultRouter()
@@ -19,6 +23,11 @@ router.register('users', UserViewSet, basename='users')
 router.register('titles', TitleViewSet, basename='title')
 router.register('categories', CategoryViewSet, basename='categories')
 router.register('genres', GenreViewSet, basename='genres')
+router.register('events', ChangeEventViewSet, basename='events')
+router.register('moderation', ModerationViewSet, basename='moderation')
+router.register(
+    'diagnostics/memory', MemoryDiagnosticsViewSet, basename='memory'
+)
 router.register(
     r'titles/(?P<title_id>\d+)/reviews',
     ReviewViewSet,
@@ -31,6 +40,7 @@ router.register(
 )
 
 urlpatterns = [
+    path('v1/events/stream/', event_stream, name='event_stream'),
     path('v1/', include(router.urls)),
     path(
         'v1/auth/token/refresh/',
@@ -1,13 +1,17 @@
 from django.conf import settings
-from django.contrib.auth import get_user_model
-from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, permission_classes, action
-from rest_framework.exceptions import ValidationError
+from rest_framework.decorators import (
+    api_view,
+    permission_classes,
+    throttle_classes,
+    action,
+)
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.generics import get_object_or_404
 from rest_framework.mixins import (
@@ -15,42 +19,102 @@ from rest_framework.mixins import (
     ListModelMixin,
     DestroyModelMixin,
 )
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import (
+    SAFE_METHODS,
+    IsAuthenticated,
+    AllowAny,
+)
 from rest_framework.response import Response
+from rest_framework.validators import UniqueValidator
 from rest_framework_simplejwt.tokens import RefreshToken
-from urllib.error import HTTPError
 
-from .filters import TitleFilter
-from .models import Review, Title, Category, Genre, User
+from .activity import ActivityPagination, comment_sources, review_sources
+from .archive import (
+    ArchiveMixin,
+    load_comments,
+    load_reviews,
+    restore_comments,
+    restore_reviews,
+)
+from .confirmation import consume_confirmation_code, issue_confirmation_code
+from .edge_cache import (
+    CATEGORIES_KEY,
+    GENRES_KEY,
+    TITLES_KEY,
+    EdgeCacheMixin,
+    review_comments_key,
+    title_key,
+    title_reviews_key,
+)
+from .facets import (
+    STORED_FILTERS,
+    query_facet_counts,
+    represent_facets,
+    stored_facet_counts,
+)
+from .filters import ChangeEventFilter, TitleFilter
+from .fragments import key_rows, render_titles
+from .memory import KEY_TYPES, get_memory_profiler
+from .metrics import MAIL_SENT
+from .moderation import BulkModeration
+from .mixins import MultiGetMixin
+from .models import (
+    ArchivedComment,
+    ArchivedReview,
+    Review,
+    Title,
+    TitleStats,
+    Category,
+    Genre,
+    User,
+    ChangeEvent,
+    EventObjects,
+    ModerationLog,
+)
 from .permissions import (
     IsAdminOrModeratorOrOwnerOrReadOnly,
     IsAdmin,
     IsAdminOrReadOnly,
+    IsModerator,
 )
+from .query_budget import QueryBudget, QueryBudgetMixin
+from .response_cache import ResponseCacheMixin
 from .serializers import (
     ReviewSerializer,
     CategorySerializer,
     CommentSerializer,
     TitleMasterSerializer,
     TitleListSerializer,
+    TitleStatsSerializer,
     GenreSerializer,
     UserSerializer,
+    UserReviewSerializer,
+    UserCommentSerializer,
     GetTokenSerializer,
     RegistrationSerializer,
+    ChangeEventSerializer,
+    ModerationLogSerializer,
+    ModerationSerializer,
 )
+from .stats import title_rating
+from .title_page import recent_comments, recent_reviews
+from .throttling import AuthThrottle
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AuthThrottle])
 def get_token(request):
     """Получение JWT-токена"""
     serializer = GetTokenSerializer(data=request.data)
     if not serializer.is_valid():
         raise ValidationError(serializer.errors)
-    user = get_object_or_404(
-        User,
-        email=serializer.validated_data['email'],
-        confirmation_code=serializer.validated_data['confirmation_code'])
+    user = consume_confirmation_code(
+        serializer.validated_data['email'],
+        serializer.validated_data['confirmation_code'],
+    )
+    if user is None:
+        raise NotFound('Неверный или просроченный код подтверждения.')
     refresh_tokens = RefreshToken.for_user(user)
     tokens = {
         'refresh': str(refresh_tokens),
@@ -59,10 +123,33 @@ def get_token(request):
     return Response({'message': tokens.items()})
 
 
+def _registration_conflict(email, username):
+    """Пользователь для повторной выдачи кода или ошибки уникальности"""
+    existing = list(User.objects.filter(
+        Q(email=email) | Q(username=username)
+    ))
+    for user in existing:
+        if user.email == email and user.username == username:
+            return user, {}
+    errors = {}
+    for user in existing:
+        if user.email == email:
+            errors['email'] = [UniqueValidator.message]
+        if user.username == username:
+            errors['username'] = [UniqueValidator.message]
+    return None, errors
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AuthThrottle])
 def registration(request):
-    """Регистрация пользователя и получение confirmation_code"""
+    """Регистрация пользователя и получение confirmation_code
+
+    Пользователь создаётся одной вставкой, конфликт по email или username
+    разбирается уже после неё. Повторный запрос с теми же email и
+    username высылает новый код.
+    """
     serializer = RegistrationSerializer(data=request.data)
     if not serializer.is_valid():
         raise ValidationError(serializer.errors)
@@ -78,41 +165,24 @@ def registration(request):
             },
             status=status.HTTP_403_FORBIDDEN
         )
-    token = PasswordResetTokenGenerator()
-    user = get_user_model()
-    user.email = email
-    user.last_login = timezone.now()
-    user.password = ''
-    confirmation_code = token.make_token(user)
+    user = User(email=email, username=username, last_login=timezone.now())
+    confirmation_code = issue_confirmation_code(user)
     try:
-        query_get, flag = get_user_model().objects.get_or_create(
-            email=email,
-            defaults={
-                'username': username,
-                'confirmation_code': confirmation_code,
-                'last_login': timezone.now()})
-        if not flag:
-            return Response(
-                {
-                    'message':
-                        {
-                            'Ошибка': ('Пользователь с таким email '
-                                       'уже существует.')
-                        }
-                },
-                status=status.HTTP_403_FORBIDDEN
+        with transaction.atomic():
+            user.save(force_insert=True)
+    except IntegrityError:
+        user, errors = _registration_conflict(email, username)
+        if errors:
+            raise ValidationError(errors)
+        if user is None:
+            raise ValidationError(
+                {'message': 'Не удалось зарегистрировать пользователя'}
             )
-    except HTTPError:
-        return Response(
-            {
-                'message':
-                    {
-                        'Ошибка': 'Ошибка запроса'
-                    }
-            },
-            status=status.HTTP_403_FORBIDDEN
-        )
-    send_mail(
+        confirmation_code = issue_confirmation_code(user)
+        user.save(update_fields=[
+            'confirmation_code', 'confirmation_code_expires'
+        ])
+    sent = send_mail(
         'Подтверждение адреса электронной почты yamdb',
         f'Вы получили это письмо, потому что регистрируетесь на ресурсе '
         f'yamdb Код подтверждения confirmation_code = '
@@ -121,6 +191,7 @@ def registration(request):
         [email, ],
         fail_silently=False,
     )
+    MAIL_SENT.inc(sent)
     return Response(
         {
             'message':
@@ -132,11 +203,25 @@ def registration(request):
     )
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(QueryBudgetMixin, MultiGetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all().order_by('-id', 'role')
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated, IsAdmin]
     lookup_field = 'username'
+    query_budgets = {
+        'my_reviews': QueryBudget(max_queries=5, timeout_ms=1000),
+        'my_comments': QueryBudget(max_queries=8, timeout_ms=1000),
+        'reviews': QueryBudget(max_queries=6, timeout_ms=1000),
+        'comments': QueryBudget(max_queries=9, timeout_ms=1000),
+    }
+
+    def activity(self, sources, serializer_class):
+        """Страница ленты пользователя (api/activity.py)"""
+        paginator = ActivityPagination()
+        page = paginator.paginate_sources(self.request, sources)
+        return paginator.get_paginated_response(
+            serializer_class(page, many=True).data
+        )
 
     @action(
         methods=['get', 'patch'],
@@ -157,14 +242,69 @@ class UserViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
 
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path='me/reviews',
+    )
+    def my_reviews(self, request):
+        """Отзывы текущего пользователя по всем произведениям"""
+        return self.activity(
+            review_sources(request.user), UserReviewSerializer
+        )
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path='me/comments',
+    )
+    def my_comments(self, request):
+        """Комментарии текущего пользователя по всем произведениям"""
+        return self.activity(
+            comment_sources(request.user), UserCommentSerializer
+        )
 
-class TitleViewSet(viewsets.ModelViewSet):
+    @action(detail=True)
+    def reviews(self, request, username=None):
+        return self.activity(
+            review_sources(self.get_object()), UserReviewSerializer
+        )
+
+    @action(detail=True)
+    def comments(self, request, username=None):
+        return self.activity(
+            comment_sources(self.get_object()), UserCommentSerializer
+        )
+
+
+class TitleViewSet(QueryBudgetMixin,
+                   ResponseCacheMixin,
+                   EdgeCacheMixin,
+                   MultiGetMixin,
+                   viewsets.ModelViewSet):
     queryset = (
-        Title.objects.annotate(rating=Avg('reviews__score')).order_by('-id')
+        Title.objects.annotate(rating=title_rating())
+        .select_related('category')
+        .prefetch_related('genre')
+        .order_by('-id')
     )
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = (DjangoFilterBackend, SearchFilter)
     filterset_class = TitleFilter
+    query_budgets = {
+        'list': QueryBudget(max_queries=5, timeout_ms=2000),
+        'retrieve': QueryBudget(max_queries=5, timeout_ms=1000),
+        'stats': QueryBudget(max_queries=3, timeout_ms=1000),
+        'similar': QueryBudget(max_queries=5, timeout_ms=1000),
+        'facets': QueryBudget(max_queries=4, timeout_ms=2000),
+    }
+    include_query_budget = QueryBudget(max_queries=12, timeout_ms=1000)
+
+    def get_query_budget(self, action):
+        """Детальный ответ с ?include= получает отдельный бюджет"""
+        if action == 'retrieve' and self.get_includes():
+            return self.include_query_budget
+        return super().get_query_budget(action)
 
     def get_serializer_class(self):
         if self.action in (
@@ -175,8 +315,135 @@ class TitleViewSet(viewsets.ModelViewSet):
             return TitleMasterSerializer
         return TitleListSerializer
 
+    def get_surrogate_keys(self):
+        keys = [GENRES_KEY, CATEGORIES_KEY]
+        if 'pk' not in self.kwargs:
+            return [TITLES_KEY] + keys
+        keys.append(title_key(self.kwargs['pk']))
+        includes = self.get_includes()
+        if self.action == 'stats' or includes & {'stats', 'reviews'}:
+            keys.append(title_reviews_key(self.kwargs['pk']))
+        keys.extend(
+            review_comments_key(review_id)
+            for review_id in getattr(self, 'page_review_ids', ())
+        )
+        if self.action == 'similar':
+            keys.append(TITLES_KEY)
+        return keys
+
+    def get_includes(self):
+        """Дополнительные блоки детального ответа: ?include=stats,reviews"""
+        # GET, а не query_params: бюджет выбирается ещё до initialize_request
+        include = self.request.GET.get('include', '')
+        includes = {
+            part.strip() for part in include.split(',') if part.strip()
+        }
+        if 'comments' in includes:
+            includes.add('reviews')
+        return includes
+
+    def get_representations(self, rows):
+        """Представления произведений из кеша фрагментов (api/fragments.py)"""
+        return render_titles(
+            rows,
+            lambda ids: self.get_queryset().filter(id__in=ids),
+            lambda titles: TitleListSerializer(
+                titles, many=True, context=self.get_serializer_context()
+            ).data,
+        )
+
+    def list(self, request, *args, **kwargs):
+        if self.multi_get_param in request.query_params:
+            return self.multi_get(request)
+        rows = key_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                self.get_representations(page)
+            )
+        return Response(self.get_representations(rows))
+
+    def get_multi_get_representations(self, ids):
+        rows = key_rows(self.get_queryset().filter(id__in=ids))
+        return {item['id']: item for item in self.get_representations(rows)}
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = self.kwargs['pk']
+        rows = self.get_representations(key_rows(
+            self.get_queryset().filter(pk=pk)
+        )) if pk.isdigit() else []
+        if not rows:
+            raise NotFound()
+        data = dict(rows[0])
+        includes = self.get_includes()
+        if 'stats' in includes:
+            data['stats'] = TitleStatsSerializer(
+                TitleStats.for_title(Title(id=data['id']))
+            ).data
+        if 'reviews' in includes:
+            data['reviews'] = self.get_page_reviews(
+                data['id'], 'comments' in includes
+            )
+        return Response(data)
+
+    def get_page_reviews(self, title_id, with_comments):
+        """Последние отзывы и их комментарии (api/title_page.py)"""
+        limits = settings.TITLE_PAGE
+        reviews = recent_reviews(title_id, limits['REVIEWS'])
+        context = self.get_serializer_context()
+        data = ReviewSerializer(reviews, many=True, context=context).data
+        if not with_comments:
+            return data
+        self.page_review_ids = [review.id for review in reviews]
+        comments = recent_comments(self.page_review_ids, limits['COMMENTS'])
+        for review, item in zip(reviews, data):
+            item['comments'] = CommentSerializer(
+                comments[review.id], many=True, context=context
+            ).data
+        return data
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Число произведений по жанрам, категориям и десятилетиям
 
-class CrudToCategoryGenreViewSet(CreateModelMixin,
+        Принимает те же параметры, что и список произведений.
+        """
+        filters = set(TitleFilter.base_filters) | {SearchFilter.search_param}
+        active = {
+            name for name, value in request.query_params.items()
+            if value and name in filters
+        }
+        if active <= STORED_FILTERS:
+            slugs = request.query_params.get('category', '').split(',')
+            rows = stored_facet_counts([slug for slug in slugs if slug])
+        else:
+            rows = query_facet_counts(
+                self.filter_queryset(self.get_queryset())
+            )
+        return Response(represent_facets(rows))
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """Распределение оценок, медиана и число отзывов"""
+        title = get_object_or_404(Title, pk=pk)
+        serializer = TitleStatsSerializer(TitleStats.for_title(title))
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Похожие произведения из предрассчитанной таблицы"""
+        title = get_object_or_404(Title, pk=pk)
+        rows = key_rows(
+            self.get_queryset()
+            .filter(similar_to__title=title)
+            .order_by('-similar_to__score')
+        )
+        return Response(self.get_representations(rows))
+
+
+class CrudToCategoryGenreViewSet(ResponseCacheMixin,
+                                 EdgeCacheMixin,
+                                 CreateModelMixin,
                                  ListModelMixin,
                                  DestroyModelMixin,
                                  viewsets.GenericViewSet):
@@ -191,6 +458,9 @@ class CategoryViewSet(CrudToCategoryGenreViewSet):
     search_fields = ['name', ]
     lookup_field = 'slug'
 
+    def get_surrogate_keys(self):
+        return [CATEGORIES_KEY]
+
 
 class GenreViewSet(CrudToCategoryGenreViewSet):
     queryset = Genre.objects.all().order_by('-id')
@@ -200,16 +470,54 @@ class GenreViewSet(CrudToCategoryGenreViewSet):
     search_fields = ['name', ]
     lookup_field = 'slug'
 
+    def get_surrogate_keys(self):
+        return [GENRES_KEY]
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(QueryBudgetMixin,
+                    EdgeCacheMixin,
+                    MultiGetMixin,
+                    ArchiveMixin,
+                    viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [IsAdminOrModeratorOrOwnerOrReadOnly]
+    query_budgets = {
+        'list': QueryBudget(max_queries=8, timeout_ms=1000),
+        'retrieve': QueryBudget(max_queries=6, timeout_ms=1000),
+    }
+
+    def get_surrogate_keys(self):
+        return [title_reviews_key(self.kwargs.get('title_id'))]
 
     def get_queryset(self):
         title = get_object_or_404(
             Title, id=self.kwargs.get('title_id')
         )
-        return title.reviews.all()
+        return title.reviews.filter(is_hidden=False).select_related(
+            'author', 'title'
+        )
+
+    def get_archived_queryset(self):
+        return ArchivedReview.objects.filter(
+            title_id=self.kwargs.get('title_id')
+        )
+
+    def load_archived(self, rows):
+        return load_reviews(rows)
+
+    def restore_archived(self, ids):
+        restore_reviews(ids)
+
+    def get_multi_get_objects(self, ids):
+        found = super().get_multi_get_objects(ids)
+        missing = [value for value in ids if value not in found]
+        if missing:
+            found.update(
+                (review.id, review) for review in load_reviews(
+                    self.get_archived_queryset().filter(id__in=missing)
+                )
+            )
+        return found
 
     def perform_create(self, serializer):
         title = get_object_or_404(
@@ -218,22 +526,172 @@ class ReviewViewSet(viewsets.ModelViewSet):
         serializer.save(title=title, author=self.request.user)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(QueryBudgetMixin,
+                     EdgeCacheMixin,
+                     ArchiveMixin,
+                     viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [IsAdminOrModeratorOrOwnerOrReadOnly]
+    query_budgets = {
+        'list': QueryBudget(max_queries=9, timeout_ms=1000),
+        'retrieve': QueryBudget(max_queries=8, timeout_ms=1000),
+    }
+
+    def get_surrogate_keys(self):
+        return [review_comments_key(self.kwargs.get('review_id'))]
+
+    def get_review(self):
+        """Отзыв из URL; архивный восстанавливается перед записью"""
+        if getattr(self, '_review', None) is None:
+            self._review = self._find_review()
+        return self._review
+
+    def _find_review(self):
+        lookup = {
+            'id': self.kwargs.get('review_id'),
+            'title_id': self.kwargs.get('title_id'),
+        }
+        review = Review.objects.filter(**lookup, is_hidden=False).first()
+        if review is not None:
+            return review
+        row = get_object_or_404(ArchivedReview, **lookup)
+        if self.request.method in SAFE_METHODS:
+            return load_reviews([row])[0]
+        restore_reviews([row.id])
+        return Review.objects.get(id=row.id)
 
     def get_queryset(self):
-        review = get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id'),
-            title__id=self.kwargs.get('title_id'),
+        return self.get_review().comments.filter(
+            is_hidden=False
+        ).select_related('author')
+
+    def get_archived_queryset(self):
+        return ArchivedComment.objects.filter(
+            review_id=self.kwargs.get('review_id')
         )
-        return review.comments.all()
+
+    def load_archived(self, rows):
+        return load_comments(rows)
+
+    def restore_archived(self, ids):
+        restore_comments(ids)
 
     def perform_create(self, serializer):
-        review = get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id'),
-            title__id=self.kwargs.get('title_id'),
+        serializer.save(review=self.get_review(), author=self.request.user)
+
+
+class ChangeEventViewSet(ListModelMixin, viewsets.GenericViewSet):
+    """Опрос ленты изменений отзывов и комментариев по курсору ?after="""
+    queryset = ChangeEvent.objects.all()
+    serializer_class = ChangeEventSerializer
+    permission_classes = [AllowAny]
+    filterset_class = ChangeEventFilter
+
+
+class ModerationViewSet(ListModelMixin, viewsets.GenericViewSet):
+    """Массовое удаление и скрытие (api/moderation.py) и журнал действий"""
+    queryset = ModerationLog.objects.select_related('moderator')
+    serializer_class = ModerationLogSerializer
+    permission_classes = [IsAuthenticated, IsModerator]
+
+    def moderate(self, object_type):
+        serializer = ModerationSerializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        log = BulkModeration(
+            object_type,
+            serializer.validated_data['action'],
+            serializer.get_criteria(),
+            moderator=self.request.user,
+        ).run()
+        return Response(ModerationLogSerializer(log).data)
+
+    @action(detail=False, methods=['post'])
+    def reviews(self, request):
+        return self.moderate(EventObjects.REVIEW)
+
+    @action(detail=False, methods=['post'])
+    def comments(self, request):
+        return self.moderate(EventObjects.COMMENT)
+
+
+def _int_param(request, name, default=None):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: ['Ожидается целое число.']})
+
+
+class MemoryDiagnosticsViewSet(viewsets.ViewSet):
+    """Трассировка памяти процесса, принявшего запрос (api/memory.py)"""
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def list(self, request):
+        return Response(get_memory_profiler().status())
+
+    @action(detail=False, methods=['post'])
+    def start(self, request):
+        profiler = get_memory_profiler()
+        profiler.start()
+        return Response(profiler.status())
+
+    @action(detail=False, methods=['post'])
+    def stop(self, request):
+        profiler = get_memory_profiler()
+        profiler.stop()
+        return Response(profiler.status())
+
+    @action(detail=False, methods=['post'])
+    def snapshot(self, request):
+        profiler = get_memory_profiler()
+        try:
+            snapshot_id = profiler.take_snapshot()
+        except RuntimeError as error:
+            raise ValidationError({'tracing': [str(error)]})
+        return Response(
+            {'id': snapshot_id, **profiler.status()},
+            status=status.HTTP_201_CREATED,
         )
-        serializer.save(review=review, author=self.request.user)
+
+    def _key_type(self):
+        key_type = self.request.query_params.get('key_type', 'lineno')
+        if key_type not in KEY_TYPES:
+            raise ValidationError(
+                {'key_type': [f'Допустимо: {", ".join(KEY_TYPES)}.']}
+            )
+        return key_type
+
+    @action(detail=False, methods=['get'])
+    def top(self, request):
+        """Крупнейшие места выделения памяти в снимке (?snapshot=)"""
+        try:
+            rows = get_memory_profiler().top(
+                _int_param(request, 'snapshot'),
+                _int_param(request, 'limit', 20),
+                self._key_type(),
+            )
+        except KeyError:
+            raise NotFound('Снимок не найден.')
+        return Response(rows)
+
+    @action(detail=False, methods=['get'])
+    def diff(self, request):
+        """Разница двух снимков: ?from=1&to=2"""
+        first, second = (
+            _int_param(request, 'from'), _int_param(request, 'to')
+        )
+        if first is None or second is None:
+            raise ValidationError(
+                {'from': ['Укажите номера снимков from и to.']}
+            )
+        try:
+            rows = get_memory_profiler().diff(
+                first, second,
+                _int_param(request, 'limit', 20),
+                self._key_type(),
+            )
+        except KeyError:
+            raise NotFound('Снимок не найден.')
+        return Response(rows)
@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.events import event_stream_app  # noqa: E402
+
+EVENT_STREAM_PATH = '/api/v1/events/stream/'
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == EVENT_STREAM_PATH:
+        await event_stream_app(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+
+class MiddlewareChain:
+    """Цепочка middleware, собранная так же, как BaseHandler.load_middleware"""
+
+    def __init__(self, paths, get_response):
+        self.view_middleware = []
+        self.template_response_middleware = []
+        self.exception_middleware = []
+        handler = get_response
+        for path in reversed(paths):
+            try:
+                instance = import_string(path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(instance, 'process_view'):
+                self.view_middleware.insert(0, instance.process_view)
+            if hasattr(instance, 'process_template_response'):
+                self.template_response_middleware.append(
+                    instance.process_template_response
+                )
+            if hasattr(instance, 'process_exception'):
+                self.exception_middleware.append(instance.process_exception)
+            handler = convert_exception_to_response(instance)
+        self.handler = handler
+
+
+class PathScopedMiddleware:
+    """Выбирает набор middleware по префиксу пути запроса
+
+    Наборы задаются настройкой SCOPED_MIDDLEWARE: {префикс: [пути]}.
+    Побеждает самый длинный совпавший префикс, пустой префикс — набор
+    по умолчанию. API с JWT-аутентификацией обходится без сессий, CSRF и
+    сообщений, админка и документация получают полный набор.
+    """
+
+    def __init__(self, get_response):
+        self.scopes = [
+            (prefix, MiddlewareChain(paths, get_response))
+            for prefix, paths in sorted(
+                settings.SCOPED_MIDDLEWARE.items(),
+                key=lambda item: len(item[0]),
+                reverse=True,
+            )
+        ]
+
+    def get_chain(self, request):
+        for prefix, chain in self.scopes:
+            if request.path_info.startswith(prefix):
+                return chain
+        raise LookupError(f'Нет набора middleware для {request.path_info}')
+
+    def __call__(self, request):
+        return self.get_chain(request).handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for method in self.get_chain(request).view_middleware:
+            response = method(request, view_func, view_args, view_kwargs)
+            if response:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        chain = self.get_chain(request)
+        for method in chain.template_response_middleware:
+            response = method(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        for method in self.get_chain(request).exception_middleware:
+            response = method(request, exception)
+            if response:
+                return response
+        return None
@@ -46,14 +46,32 @@ INSTALLED_APPS = [
 IMPORT_EXPORT_USE_TRANSACTIONS = True
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'api.middleware.SqlProfilerMiddleware',
+    'api_yamdb.middleware.PathScopedMiddleware',
+]
+
+# Наборы middleware по префиксу пути (api_yamdb/middleware.py): API
+# аутентифицируется только JWT, сессии, CSRF и сообщения нужны админке
+FULL_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+SCOPED_MIDDLEWARE = {
+    '/api/v1/': [
+        'api.middleware.RateLimitHeadersMiddleware',
+    ],
+    '': FULL_MIDDLEWARE,
+}
+
+# Проверки админки ищут эти middleware только в MIDDLEWARE, а они
+# подключаются через SCOPED_MIDDLEWARE
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
 
 ROOT_URLCONF = 'api_yamdb.urls'
 
@@ -144,6 +162,30 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.AnonReadThrottle',
+        'api.throttling.UserWriteThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon_read': os.environ.get('THROTTLE_ANON_READ', '120/min'),
+        'user_write': os.environ.get('THROTTLE_USER_WRITE', '60/min'),
+        'auth': os.environ.get('THROTTLE_AUTH', '5/min'),
+    },
+    # Перед приложением стоит nginx: адрес клиента — последняя запись
+    # X-Forwarded-For, подставленные клиентом записи не учитываются
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 1)),
+}
+
+# Хранилище корзин ограничения частоты (api/throttling.py): Redis общий
+# для всех воркеров, без REDIS_URL корзины живут в памяти процесса
+THROTTLE_STORE = {
+    'BACKEND': (
+        'api.throttling.RedisBucketStore' if os.environ.get('REDIS_URL')
+        else 'api.throttling.LocalBucketStore'
+    ),
+    'OPTIONS': {
+        'URL': os.environ.get('REDIS_URL', ''),
+    },
 }
 
 SIMPLE_JWT = {
@@ -155,3 +197,144 @@ SIMPLE_JWT = {
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 DEFAULT_FROM_EMAIL = 'info@yambd.11'
+
+# Лента изменений отзывов и комментариев (api/events.py), секунды
+EVENT_STREAM_POLL_INTERVAL = 1
+EVENT_STREAM_KEEPALIVE = 15
+EVENT_STREAM_QUEUE_SIZE = 1000
+
+# Похожие произведения (api/similarity.py)
+SIMILAR_TITLES_TOP_K = 20
+SIMILAR_TITLES_MIN_REVIEW_SCORE = 8
+SIMILAR_TITLES_WEIGHTS = {
+    'genre': 1.0,
+    'reviews': 2.0,
+    'category': 0.5,
+}
+
+# Кеширующий шлюз (api/edge_cache.py): max-age для анонимных GET и бэкенд
+# адресной очистки по суррогатным ключам. nginx из nginx/default.conf по
+# ключам не очищается, поэтому по умолчанию очистки нет и max-age короткий:
+# увеличивать его стоит только вместе с HttpPurgeEdgeCache и шлюзом с PURGE
+EDGE_CACHE = {
+    'BACKEND': os.environ.get(
+        'EDGE_CACHE_BACKEND', 'api.edge_cache.DummyEdgeCache'
+    ),
+    'MAX_AGE': int(os.environ.get('EDGE_CACHE_MAX_AGE', 5)),
+    'OPTIONS': {
+        'URL': os.environ.get('EDGE_CACHE_PURGE_URL', ''),
+    },
+}
+
+# Кеш готовых и сжатых тел ответов (api/response_cache.py). Очистка по
+# суррогатным ключам доходит до всех воркеров только при общем бэкенде кеша
+# responses (RESPONSE_CACHE_BACKEND, например memcached); с LocMemCache
+# каждого воркера устаревание ограничено TIMEOUT, как max-age шлюза
+RESPONSE_CACHE = {
+    'ENABLED': os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1',
+    'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 5)),
+    'MIN_SIZE': 512,
+    'GZIP_LEVEL': int(os.environ.get('RESPONSE_CACHE_GZIP_LEVEL', 9)),
+    'BROTLI_QUALITY': int(os.environ.get('RESPONSE_CACHE_BROTLI_QUALITY', 5)),
+}
+
+# Профилирование SQL по представлениям (api/sql_profiler.py), отчёт —
+# manage.py sql_report. EXPLAIN_ANALYZE выполняет запрос повторно, только
+# для стендов
+SQL_PROFILER = {
+    'ENABLED': os.environ.get('SQL_PROFILER_ENABLED', '') == '1',
+    'SLOW_MS': float(os.environ.get('SQL_PROFILER_SLOW_MS', 100)),
+    'EXPLAIN_ANALYZE': os.environ.get('SQL_PROFILER_ANALYZE', '') == '1',
+    'DIR': os.environ.get(
+        'SQL_PROFILER_DIR', os.path.join(BASE_DIR, 'sql_profile')
+    ),
+    'DUMP_EVERY': 100,
+    'SAMPLES': 1000,
+}
+
+# Число хеш-секций таблиц отзывов и комментариев в PostgreSQL
+# (api/partitioning.py), 0 — без секционирования. Новую базу секционирует
+# миграция, существующую — команда partition_reviews в окно обслуживания
+REVIEW_PARTITIONS = int(os.environ.get('REVIEW_PARTITIONS', 0))
+
+# Холодное хранение (api/archive.py): отзывы и комментарии старше AFTER_DAYS
+# переносит команда archive_old_rows
+ARCHIVE = {
+    'AFTER_DAYS': int(os.environ.get('ARCHIVE_AFTER_DAYS', 365)),
+    'BATCH_SIZE': 1000,
+    'COMPRESSION_LEVEL': 6,
+}
+
+# Страница произведения (api/title_page.py): сколько последних отзывов и
+# комментариев к каждому из них отдаёт ?include=reviews,comments
+TITLE_PAGE = {
+    'REVIEWS': int(os.environ.get('TITLE_PAGE_REVIEWS', 5)),
+    'COMMENTS': int(os.environ.get('TITLE_PAGE_COMMENTS', 3)),
+}
+
+# Массовая модерация (api/moderation.py): строк в одной транзакции и
+# предельная длина списка ids в запросе
+MODERATION = {
+    'BATCH_SIZE': int(os.environ.get('MODERATION_BATCH_SIZE', 500)),
+    'MAX_IDS': 1000,
+}
+
+# Бюджеты SQL для вьюсетов (api/query_budget.py): по умолчанию для действий
+# без собственного бюджета. STRICT поднимает исключение вместо ответа 503
+QUERY_BUDGET = {
+    'ENABLED': os.environ.get('QUERY_BUDGET_ENABLED', '1') == '1',
+    'STRICT': os.environ.get('QUERY_BUDGET_STRICT', '') == '1',
+    'DEFAULT': {
+        'MAX_QUERIES': int(os.environ.get('QUERY_BUDGET_MAX_QUERIES', 50)),
+        'TIMEOUT_MS': int(os.environ.get('QUERY_BUDGET_TIMEOUT_MS', 5000)),
+    },
+}
+
+# Трассировка памяти воркеров (api/memory.py): глубина стека, число
+# хранимых снимков, строк в отчёте и сигнал для включения и снимков
+MEMORY_PROFILER = {
+    'FRAMES': int(os.environ.get('MEMORY_PROFILER_FRAMES', 10)),
+    'MAX_SNAPSHOTS': 5,
+    'LIMIT': 20,
+    'SIGNAL': 'SIGUSR2',
+}
+
+# Коды подтверждения email (api/confirmation.py): срок действия и длина
+CONFIRMATION_CODE_TTL = timedelta(
+    hours=int(os.environ.get('CONFIRMATION_CODE_TTL_HOURS', 24))
+)
+CONFIRMATION_CODE_BYTES = 24
+
+# Кеши: titles — фрагменты представлений произведений (api/fragments.py),
+# responses — готовые тела ответов (api/response_cache.py); LocMemCache
+# вытесняет давно не читанные записи сверх MAX_ENTRIES
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'titles': {
+        'BACKEND': os.environ.get(
+            'TITLE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('TITLE_CACHE_LOCATION', 'titles'),
+        'TIMEOUT': 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('TITLE_CACHE_MAX_ENTRIES', 20000)),
+            'CULL_FREQUENCY': 10,
+        },
+    },
+    'responses': {
+        'BACKEND': os.environ.get(
+            'RESPONSE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('RESPONSE_CACHE_LOCATION', 'responses'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 5000)
+            ),
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
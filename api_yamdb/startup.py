@@ -0,0 +1,100 @@
+"""Замер времени импорта модулей и прогрев приложения при старте
+
+ImportTimer встаёт первым в sys.meta_path и засекает выполнение каждого
+загружаемого модуля: полное время (вместе с вложенными импортами) и
+собственное. Используется в gunicorn.conf.py (GUNICORN_PROFILE_STARTUP=1)
+и в benchmarks/startup.py.
+"""
+import sys
+import time
+from collections import defaultdict
+from importlib.abc import Loader, MetaPathFinder
+
+
+class TimedLoader(Loader):
+    def __init__(self, loader, name, timer):
+        self.loader = loader
+        self.name = name
+        self.timer = timer
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        module.__loader__ = self.loader
+        self.timer.started(self.name)
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.timer.finished(self.name)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+
+class ImportTimer(MetaPathFinder):
+    def __init__(self):
+        self.timings = {}
+        self._stack = []
+        self._finding = False
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path, target=None):
+        if self._finding:
+            return None
+        self._finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding = False
+        if spec.loader is None or not hasattr(spec.loader, 'exec_module'):
+            return spec
+        spec.loader = TimedLoader(spec.loader, name, self)
+        return spec
+
+    def started(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def finished(self, name):
+        name, started, children = self._stack.pop()
+        total = time.perf_counter() - started
+        self.timings[name] = (total, total - children)
+        if self._stack:
+            self._stack[-1][2] += total
+
+    def by_package(self):
+        """Собственное время импорта по пакетам верхнего уровня, секунды"""
+        packages = defaultdict(float)
+        for name, (total, own) in self.timings.items():
+            packages[name.partition('.')[0]] += own
+        return sorted(packages.items(), key=lambda item: -item[1])
+
+    def slowest(self, limit=20):
+        return sorted(
+            self.timings.items(), key=lambda item: -item[1][1]
+        )[:limit]
+
+
+def warm_up():
+    """Загружает URLconf, а с ним представления, DRF и simplejwt
+
+    Без этого они импортируются при первом запросе в каждом воркере
+    отдельно и не попадают в общую после fork память.
+    """
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
@@ -17,6 +17,8 @@ from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import TemplateView
 
+from api.metrics import metrics_view
+
 urlpatterns = [
     path(
         'admin/',
@@ -31,4 +33,9 @@ urlpatterns = [
         'api/',
         include('api.urls')
     ),
+    path(
+        'metrics',
+        metrics_view,
+        name='metrics'
+    ),
 ]
@@ -0,0 +1,110 @@
+"""Микробенчмарки YaMDb
+
+Запуск из корня проекта: python -m benchmarks.<имя>. Бенчмарки работают
+на тестовых настройках (tests.settings_qa) и временной базе, которая
+создаётся и удаляется автоматически.
+"""
+import os
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+@contextmanager
+def benchmark_database(settings_module='tests.settings_qa'):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+
+    django.setup()
+    from django.db import connection
+    from django.test.utils import (
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed_titles(count=100, reviews_per_title=3):
+    """Небольшой набор произведений, жанров, категорий и отзывов"""
+    from api.models import Category, Genre, Review, Title, User
+
+    categories = [
+        Category.objects.create(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(5)
+    ]
+    genres = [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(10)
+    ]
+    users = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@yamdb.fake')
+        for i in range(reviews_per_title)
+    ]
+    for i in range(count):
+        title = Title.objects.create(
+            name=f'Произведение {i}', year=1900 + i % 120,
+            category=categories[i % len(categories)],
+        )
+        title.genre.set([genres[i % len(genres)], genres[(i * 7) % 10]])
+        for author in users:
+            Review.objects.create(
+                title=title, author=author, text='Отзыв', score=1 + i % 10,
+            )
+
+
+def measure(func, repeat=200, warmup=20):
+    """Время вызова func в миллисекундах: среднее, медиана и p95"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'mean': statistics.mean(timings),
+        'median': statistics.median(timings),
+        'p95': timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def measure_memory(func, repeat=3):
+    """Пиковая и оставшаяся после вызова func память Python, КиБ
+
+    Берётся наибольшее значение из repeat прогонов; первый прогон
+    отдельно не отбрасывается, поэтому заранее прогрейте кеши.
+    """
+    peaks, retained = [], []
+    for _ in range(repeat):
+        tracemalloc.start()
+        try:
+            func()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peaks.append(peak / 1024)
+        retained.append(current / 1024)
+    return {'peak': max(peaks), 'retained': max(retained)}
+
+
+def report_memory(name, result):
+    print(
+        f'{name:<40} peak {result["peak"]:10.1f} KiB  '
+        f'retained {result["retained"]:10.1f} KiB'
+    )
+
+
+def report(name, result):
+    print(
+        f'{name:<40} mean {result["mean"]:8.3f} ms  '
+        f'median {result["median"]:8.3f} ms  p95 {result["p95"]:8.3f} ms'
+    )
@@ -0,0 +1,92 @@
+"""Сжатие ответов каталога: экономия байтов и цена CPU
+
+Для типичных ответов (страница списка произведений, страница
+произведения с отзывами и комментариями, список жанров) печатает размер
+тела без сжатия, размер и время сжатия gzip и brotli (если установлен) на
+разных уровнях. Затем сравнивает время ответа без кеша, со сжатием на
+каждом запросе и из кеша ответов (api/response_cache.py).
+"""
+import gzip
+import time
+
+from benchmarks import benchmark_database, measure, report, seed_titles
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+URLS = {
+    'titles list': '/api/v1/titles/',
+    'title page': '/api/v1/titles/{title}/?include=reviews,comments',
+    'genres list': '/api/v1/genres/',
+}
+LEVELS = [('gzip', level) for level in (1, 6, 9)]
+if brotli is not None:
+    LEVELS += [('br', quality) for quality in (1, 5, 9, 11)]
+
+
+def compress(body, encoding, level):
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    return brotli.compress(body, quality=level)
+
+
+def compression_table(name, body, repeat=50):
+    print(f'{name}: {len(body)} байт без сжатия')
+    for encoding, level in LEVELS:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            compressed = compress(body, encoding, level)
+        seconds = (time.perf_counter() - started) / repeat
+        print(
+            f'  {encoding:<5}{level:>3}  {len(compressed):8} байт  '
+            f'сэкономлено {1 - len(compressed) / len(body):6.1%}  '
+            f'{seconds * 1000:8.3f} ms  '
+            f'{len(body) / seconds / 2 ** 20:8.1f} МиБ/с'
+        )
+
+
+def main():
+    with benchmark_database():
+        from django.conf import settings
+        from django.core.cache import caches
+        from django.test import Client, override_settings
+
+        from api.models import Title
+
+        seed_titles(count=100, reviews_per_title=10)
+        title = Title.objects.order_by('id').first()
+        urls = {
+            name: url.format(title=title.id) for name, url in URLS.items()
+        }
+        client = Client()
+        for name, url in urls.items():
+            with override_settings(RESPONSE_CACHE={
+                **settings.RESPONSE_CACHE, 'ENABLED': False,
+            }):
+                compression_table(name, client.get(url).content)
+        print()
+
+        enabled = {**settings.RESPONSE_CACHE, 'ENABLED': True, 'TIMEOUT': 60}
+        for name, url in urls.items():
+            with override_settings(RESPONSE_CACHE={
+                **enabled, 'ENABLED': False,
+            }):
+                report(f'{name}, без кеша', measure(
+                    lambda: client.get(url), repeat=100,
+                ))
+                report(f'{name}, gzip на каждый запрос', measure(
+                    lambda: gzip.compress(client.get(url).content, 6),
+                    repeat=100,
+                ))
+            with override_settings(RESPONSE_CACHE=enabled):
+                caches['responses'].clear()
+                report(f'{name}, из кеша ответов', measure(
+                    lambda: client.get(url, HTTP_ACCEPT_ENCODING='gzip, br'),
+                    repeat=100,
+                ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Пиковая память Python на тяжёлых запросах к API
+
+Страница и multi-get на 500 произведений (TitleViewSet), страница и
+multi-get на 500 пользователей (UserViewSet) от имени администратора.
+"""
+from benchmarks import (
+    benchmark_database,
+    measure_memory,
+    report_memory,
+    seed_titles,
+)
+
+
+def main():
+    with benchmark_database():
+        from rest_framework.test import APIClient
+
+        from api.models import Title, User
+
+        seed_titles(count=500)
+        User.objects.bulk_create([
+            User(username=f'reader{i}', email=f'reader{i}@yamdb.fake')
+            for i in range(1000)
+        ])
+        admin = User.objects.create(
+            username='bench-admin', email='admin@yamdb.fake', role='admin',
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+        title_ids = ','.join(
+            str(pk) for pk in Title.objects.values_list('id', flat=True)
+        )
+        user_names = ','.join(
+            User.objects.values_list('username', flat=True)[:500]
+        )
+        requests = {
+            'TitleViewSet.list': ('/api/v1/titles/', {}),
+            'TitleViewSet multi-get 500': (
+                '/api/v1/titles/', {'ids': title_ids}
+            ),
+            'UserViewSet.list': ('/api/v1/users/', {}),
+            'UserViewSet multi-get 500': (
+                '/api/v1/users/', {'ids': user_names}
+            ),
+        }
+        for name, (path, params) in requests.items():
+            client.get(path, params)
+            report_memory(
+                name, measure_memory(lambda: client.get(path, params))
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Стоимость набора middleware на TitleViewSet.list
+
+Сравнивает облегчённый набор для /api/v1/ с полным набором, который
+раньше проходил каждый запрос к API.
+"""
+from benchmarks import benchmark_database, measure, report, seed_titles
+
+
+def main():
+    with benchmark_database():
+        from django.conf import settings
+        from django.test import Client, override_settings
+
+        seed_titles()
+        results = {}
+        stacks = {
+            'lean /api/v1/ stack': settings.SCOPED_MIDDLEWARE,
+            'full stack': {'': settings.FULL_MIDDLEWARE},
+        }
+        clients = {}
+        for name, scoped in stacks.items():
+            with override_settings(SCOPED_MIDDLEWARE=scoped):
+                clients[name] = Client()
+                clients[name].get('/api/v1/titles/')
+        for round_ in range(3):
+            for name, client in clients.items():
+                result = measure(lambda: client.get('/api/v1/titles/'))
+                if round_ == 0 or result['mean'] < results[name]['mean']:
+                    results[name] = result
+        for name, result in results.items():
+            report(f'TitleViewSet.list, {name}', result)
+        saved = (
+            results['full stack']['mean']
+            - results['lean /api/v1/ stack']['mean']
+        )
+        print(f'Экономия на запрос: {saved:.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
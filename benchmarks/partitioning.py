@@ -0,0 +1,130 @@
+"""Размер индексов и задержка запросов отзывов до и после секционирования
+
+Только для PostgreSQL: подключение берётся из api_yamdb.settings
+(переменные DB_*). Данные генерируются generate_series в отдельной схеме,
+которая удаляется после замера. Целевой объём — 100M строк:
+
+    python -m benchmarks.partitioning --rows 100000000 --titles 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+SCHEMA = 'bench_partitioning'
+
+CREATE_PLAIN = f'''
+    CREATE TABLE {SCHEMA}.review_plain (
+        id bigint PRIMARY KEY,
+        title_id integer NOT NULL,
+        author_id integer NOT NULL,
+        score integer NOT NULL,
+        pub_date timestamptz NOT NULL,
+        text text NOT NULL,
+        CONSTRAINT plain_unique_review UNIQUE (title_id, author_id)
+    )
+'''
+CREATE_PARTITIONED = f'''
+    CREATE TABLE {SCHEMA}.review_part (
+        id bigint NOT NULL,
+        title_id integer NOT NULL,
+        author_id integer NOT NULL,
+        score integer NOT NULL,
+        pub_date timestamptz NOT NULL,
+        text text NOT NULL,
+        PRIMARY KEY (id, title_id),
+        CONSTRAINT part_unique_review UNIQUE (title_id, author_id)
+    ) PARTITION BY HASH (title_id)
+'''
+FILL = '''
+    INSERT INTO {table}
+    SELECT n, n % %(titles)s + 1, n / %(titles)s + 1, n % 10 + 1,
+           now() - (n % 100000) * interval '1 minute', 'review'
+    FROM generate_series(1, %(rows)s) AS n
+'''
+INDEX = 'CREATE INDEX {name} ON {table} (title_id, pub_date DESC)'
+INDEX_SIZE = '''
+    SELECT coalesce(sum(pg_indexes_size(relid)), 0)
+    FROM pg_partition_tree(%s::regclass)
+'''
+QUERIES = {
+    'title page': (
+        'SELECT id, score FROM {table} WHERE title_id = %s '
+        'ORDER BY pub_date DESC LIMIT 10'
+    ),
+    'title count': 'SELECT count(*) FROM {table} WHERE title_id = %s',
+    'unique lookup': (
+        'SELECT 1 FROM {table} WHERE title_id = %s AND author_id = 1'
+    ),
+}
+
+
+def measure(cursor, sql, titles, repeat):
+    timings = []
+    for _ in range(repeat):
+        title_id = random.randint(1, titles)
+        started = time.perf_counter()
+        cursor.execute(sql, [title_id])
+        cursor.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--titles', type=int, default=10000)
+    parser.add_argument('--partitions', type=int, default=16)
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+    import django
+
+    django.setup()
+    from django.db import connection
+
+    random.seed(1)
+    params = {'rows': args.rows, 'titles': args.titles}
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+        cursor.execute(f'CREATE SCHEMA {SCHEMA}')
+        try:
+            cursor.execute(CREATE_PLAIN)
+            cursor.execute(CREATE_PARTITIONED)
+            for remainder in range(args.partitions):
+                cursor.execute(
+                    f'CREATE TABLE {SCHEMA}.review_part_{remainder} '
+                    f'PARTITION OF {SCHEMA}.review_part FOR VALUES WITH '
+                    f'(MODULUS {args.partitions}, REMAINDER {remainder})'
+                )
+            for name in ('plain', 'part'):
+                table = f'{SCHEMA}.review_{name}'
+                started = time.perf_counter()
+                cursor.execute(FILL.format(table=table), params)
+                cursor.execute(INDEX.format(name=f'{name}_idx', table=table))
+                cursor.execute(f'ANALYZE {table}')
+                load = time.perf_counter() - started
+                cursor.execute(INDEX_SIZE, [table])
+                size = cursor.fetchone()[0]
+                print(
+                    f'{name:<6} load {load:8.1f} s  '
+                    f'indexes {size / 2 ** 20:10.1f} MiB'
+                )
+                for query, sql in QUERIES.items():
+                    median, p95 = measure(
+                        cursor, sql.format(table=table),
+                        args.titles, args.repeat,
+                    )
+                    print(
+                        f'       {query:<14} median {median:7.3f} ms  '
+                        f'p95 {p95:7.3f} ms'
+                    )
+        finally:
+            cursor.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Время от запуска процесса до первого ответа WSGI-приложения
+
+Каждый прогон — новый интерпретатор: импорт api_yamdb.wsgi (setup Django
+и прогрев URLconf), затем первый и второй запрос к /api/v1/. С --imports
+печатаются пакеты с наибольшим временем импорта.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PATH = '/api/v1/'
+
+
+def child(profile_imports):
+    started = time.perf_counter()
+    timer = None
+    if profile_imports:
+        from api_yamdb.startup import ImportTimer
+
+        timer = ImportTimer().install()
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings_qa')
+    from api_yamdb.wsgi import application
+
+    loaded = time.perf_counter()
+    timings = {'load': loaded - started}
+    for name in ('first', 'second'):
+        before = time.perf_counter()
+        application({
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': PATH,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': sys.stdin.buffer,
+        }, lambda status, headers: None)
+        timings[name] = time.perf_counter() - before
+    if timer is not None:
+        timings['imports'] = timer.by_package()[:15]
+    print(json.dumps(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--imports', action='store_true')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.imports)
+        return
+
+    command = [sys.executable, '-m', 'benchmarks.startup', '--child']
+    results = []
+    for _ in range(args.runs):
+        spawned = time.perf_counter()
+        output = subprocess.run(
+            command, capture_output=True, check=True, text=True,
+        ).stdout
+        total = time.perf_counter() - spawned
+        results.append({**json.loads(output), 'total': total})
+    for key, label in (
+        ('load', 'загрузка приложения'),
+        ('first', 'первый запрос'),
+        ('second', 'второй запрос'),
+        ('total', 'запуск процесса до первого ответа'),
+    ):
+        values = sorted(result[key] * 1000 for result in results)
+        print(
+            f'{label:<40} median {statistics.median(values):8.1f} ms  '
+            f'max {values[-1]:8.1f} ms'
+        )
+    if args.imports:
+        result = subprocess.run(
+            command + ['--imports'], capture_output=True, check=True,
+            text=True,
+        ).stdout
+        for package, seconds in json.loads(result)['imports']:
+            print(f'  импорт {package:<32} {seconds * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
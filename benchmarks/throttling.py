@@ -0,0 +1,33 @@
+"""Стоимость проверки лимита запросов
+
+Замеряет TokenBucketThrottle.allow_request на хранилище из THROTTLE_STORE
+(с REDIS_URL — RedisBucketStore). Цель — в среднем меньше миллисекунды.
+"""
+import os
+
+from benchmarks import measure, report
+
+
+def main():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings_qa')
+    import django
+
+    django.setup()
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+    from rest_framework.request import Request
+
+    from api.throttling import AnonReadThrottle, get_bucket_store
+
+    request = Request(RequestFactory().get('/api/v1/titles/'))
+    request.user = AnonymousUser()
+    throttle = AnonReadThrottle()
+    name = type(get_bucket_store()).__name__
+    report(
+        f'AnonReadThrottle, {name}',
+        measure(lambda: throttle.allow_request(request, None), repeat=5000),
+    )
+
+
+if __name__ == '__main__':
+    main()
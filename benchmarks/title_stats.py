@@ -0,0 +1,81 @@
+"""Пересчёт распределений оценок после массовой загрузки
+
+Сравнивает три способа получить оценки всех произведений: агрегат по
+каждому произведению через ORM, общий GROUP BY с Avg и rebuild_title_stats
+(серверный курсор, bincount в NumPy, запись только изменившихся строк).
+Отзывы загружаются bulk_create в обход сигналов, как при импорте.
+"""
+import random
+import time
+
+from benchmarks import benchmark_database
+
+TITLES = 2000
+AUTHORS = 50
+
+
+def seed():
+    from api.models import Review, Title, User
+
+    User.objects.bulk_create(
+        User(username=f'user{i}', email=f'user{i}@yamdb.fake')
+        for i in range(AUTHORS)
+    )
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {i}', year=1900 + i % 120)
+        for i in range(TITLES)
+    )
+    random.seed(0)
+    titles = list(Title.objects.values_list('id', flat=True))
+    authors = list(User.objects.values_list('id', flat=True))
+    Review.objects.bulk_create(
+        (
+            Review(
+                title_id=title_id, author_id=author_id, text='Отзыв',
+                score=random.randint(1, 10),
+            )
+            for title_id in titles for author_id in authors
+        ),
+        batch_size=100,
+    )
+    return len(titles) * len(authors)
+
+
+def timed(name, rows, func):
+    started = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - started
+    print(
+        f'{name:<40} {seconds * 1000:10.1f} ms  '
+        f'{rows / seconds:12.0f} строк/с'
+    )
+
+
+def main():
+    with benchmark_database():
+        from django.db.models import Avg
+
+        from api.models import Title
+        from api.stats import rebuild_title_stats
+
+        rows = seed()
+        timed('ORM, по произведению', rows, lambda: [
+            title.reviews.aggregate(Avg('score'))
+            for title in Title.objects.all()
+        ])
+        timed('ORM, GROUP BY Avg', rows, lambda: list(
+            Title.objects.annotate(rating=Avg('reviews__score'))
+            .values_list('id', 'rating')
+        ))
+        for label in ('первый', 'повторный'):
+            report = rebuild_title_stats()
+            print(
+                f'{"rebuild_title_stats, " + label:<40} '
+                f'{report.seconds * 1000:10.1f} ms  '
+                f'{report.rows_per_second:12.0f} строк/с  '
+                f'изменено {report.changed}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Настройки gunicorn для продакшена: gunicorn -c gunicorn.conf.py
+
+Число воркеров считается по доступным контейнеру ядрам (с учётом квоты
+cgroup), приложение загружается до fork, чтобы код Django и DRF был общим
+для воркеров. Воркер перезапускается после max_requests запросов или
+когда его RSS превышает GUNICORN_MAX_RSS_MB. С GUNICORN_PROFILE_STARTUP=1
+в лог пишется время старта и время импорта по пакетам. Сигнал SIGUSR2
+воркеру включает трассировку памяти и делает снимки (api/memory.py).
+"""
+import math
+import os
+import time
+
+STARTED = time.perf_counter()
+
+if os.environ.get('GUNICORN_PROFILE_STARTUP') == '1':
+    from api_yamdb.startup import ImportTimer
+
+    import_timer = ImportTimer().install()
+else:
+    import_timer = None
+
+
+def cgroup_cpu_quota():
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as cpu_max:
+            quota, period = cpu_max.read().split()
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as quota_file:
+                quota = quota_file.read().strip()
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as period_file:
+                period = period_file.read().strip()
+        except OSError:
+            return None
+    if quota in ('max', '-1'):
+        return None
+    return int(quota) / int(period)
+
+
+def available_cpus():
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    quota = cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+CPUS = available_cpus()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', CPUS * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = True
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+accesslog = '-'
+
+MAX_RSS = int(os.environ.get('GUNICORN_MAX_RSS_MB', 300)) * 2 ** 20
+
+
+def when_ready(server):
+    server.log.info(
+        'Приложение загружено за %.2f с, воркеров %s по %s потоков',
+        time.perf_counter() - STARTED, workers, threads,
+    )
+    if import_timer is None:
+        return
+    import_timer.uninstall()
+    for package, seconds in import_timer.by_package()[:15]:
+        server.log.info('импорт %-30s %8.1f мс', package, seconds * 1000)
+
+
+def post_worker_init(worker):
+    from api.memory import install_signal_handler
+
+    install_signal_handler()
+
+
+def post_request(worker, req, environ, resp):
+    from api.metrics import current_rss
+
+    rss = current_rss()
+    if rss > MAX_RSS and worker.alive:
+        worker.log.info(
+            'Воркер %s занял %d МБ, перезапуск', worker.pid, rss // 2 ** 20
+        )
+        worker.alive = False
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,69 @@
+import pytest
+
+
+@pytest.fixture
+def categories():
+    from api.models import Category
+
+    return [
+        Category.objects.create(name='Фильм', slug='movie'),
+        Category.objects.create(name='Книга', slug='book'),
+    ]
+
+
+@pytest.fixture
+def genres():
+    from api.models import Genre
+
+    return [
+        Genre.objects.create(name='Драма', slug='drama'),
+        Genre.objects.create(name='Комедия', slug='comedy'),
+        Genre.objects.create(name='Фантастика', slug='sci-fi'),
+    ]
+
+
+@pytest.fixture
+def titles(categories, genres):
+    from api.models import Title
+
+    first = Title.objects.create(
+        name='Побег из Шоушенка', year=1994, category=categories[0],
+    )
+    first.genre.set([genres[0]])
+    second = Title.objects.create(
+        name='Война и мир', year=1865, category=categories[1],
+    )
+    second.genre.set([genres[0], genres[1]])
+    third = Title.objects.create(
+        name='Солярис', year=1972, category=categories[0],
+    )
+    third.genre.set([genres[2]])
+    return [first, second, third]
+
+
+@pytest.fixture
+def reviews(titles, admin, moderator, user):
+    from api.models import Review
+
+    return [
+        Review.objects.create(
+            title=titles[0], author=admin, text='Отлично', score=10,
+        ),
+        Review.objects.create(
+            title=titles[0], author=user, text='Хорошо', score=8,
+        ),
+        Review.objects.create(
+            title=titles[1], author=moderator, text='Скучно', score=4,
+        ),
+    ]
+
+
+@pytest.fixture
+def comments(reviews, admin, user):
+    from api.models import Comment
+
+    return [
+        Comment.objects.create(review=reviews[0], author=user, text='Да'),
+        Comment.objects.create(review=reviews[0], author=admin, text='Нет'),
+        Comment.objects.create(review=reviews[1], author=admin, text='Ок'),
+    ]
@@ -0,0 +1,2 @@
+"""Модуль для проверки ImportTimer в tests/test_server_config.py"""
+import json  # noqa: F401
@@ -6,3 +6,29 @@ DATABASES = {
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
+
+EDGE_CACHE = {
+    'BACKEND': 'api.edge_cache.LocalEdgeCache',
+    'MAX_AGE': 5,
+}
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {
+        'anon_read': '100000/min',
+        'user_write': '100000/min',
+        'auth': '100000/min',
+    },
+}
+
+QUERY_BUDGET = {
+    **QUERY_BUDGET,
+    'STRICT': True,
+}
+
+# Кеш ответов проверяется отдельно (tests/test_response_cache.py), в
+# остальных тестах повторные запросы должны доходить до представлений
+RESPONSE_CACHE = {
+    **RESPONSE_CACHE,
+    'ENABLED': False,
+}
@@ -0,0 +1,130 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from api.metrics import ARCHIVE_READS
+from api.models import (
+    ArchivedComment,
+    ArchivedReview,
+    ChangeEvent,
+    Comment,
+    Review,
+    TitleStats,
+)
+from api.stats import rebuild_title_stats
+
+
+def make_old(queryset, days=400):
+    queryset.update(pub_date=timezone.now() - timedelta(days=days))
+
+
+class TestArchive:
+
+    @pytest.mark.django_db
+    def test_archive_keeps_rows_readable(self, client, titles, comments):
+        make_old(Review.objects.all())
+        make_old(Comment.objects.all())
+        events = ChangeEvent.objects.count()
+        reads = ARCHIVE_READS.labels('review')._value.get()
+        call_command('archive_old_rows')
+
+        assert not Review.objects.exists() and not Comment.objects.exists()
+        assert ArchivedReview.objects.count() == 3
+        assert ArchivedComment.objects.count() == 3
+        assert ChangeEvent.objects.count() == events, (
+            'Проверьте, что перенос в архив не пишет события в ленту'
+        )
+
+        url = f'/api/v1/titles/{titles[0].id}/reviews/'
+        data = client.get(url).json()
+        assert data['count'] == 2
+        assert {item['text'] for item in data['results']} == {
+            'Отлично', 'Хорошо'
+        }
+        assert ARCHIVE_READS.labels('review')._value.get() == reads + 2
+
+        review_id = comments[0].review_id
+        response = client.get(f'{url}{review_id}/comments/')
+        assert response.json()['count'] == 2
+        response = client.get(f'{url}{review_id}/comments/{comments[0].id}/')
+        assert response.json()['text'] == 'Да'
+
+        title = client.get(f'/api/v1/titles/{titles[0].id}/').json()
+        assert title['rating'] == 9, (
+            'Проверьте, что рейтинг учитывает архивные отзывы'
+        )
+        assert TitleStats.objects.get(title=titles[0]).count == 2
+
+    @pytest.mark.django_db
+    def test_author_delete_subtracts_archived_scores(self, titles, reviews):
+        make_old(Review.objects.all())
+        call_command('archive_old_rows')
+        reviews[0].author.delete()
+        stats = TitleStats.objects.get(title=titles[0])
+        assert stats.count == 1 and stats.histogram[8] == 1, (
+            'Проверьте, что удаление автора вычитает его архивные оценки'
+        )
+        rebuild_title_stats()
+        stats.refresh_from_db()
+        assert stats.count == 1
+
+    @pytest.mark.django_db
+    def test_live_rows_come_first(self, client, titles, reviews):
+        make_old(Review.objects.filter(pk=reviews[0].pk))
+        call_command('archive_old_rows')
+        assert list(ArchivedReview.objects.values_list('id', flat=True)) == [
+            reviews[0].id
+        ]
+        data = client.get(
+            f'/api/v1/titles/{titles[0].id}/reviews/'
+        ).json()
+        assert [item['id'] for item in data['results']] == [
+            reviews[1].id, reviews[0].id
+        ]
+
+    @pytest.mark.django_db
+    def test_write_restores_archived_row(self, user_client, titles, comments):
+        make_old(Review.objects.all())
+        make_old(Comment.objects.all())
+        call_command('archive_old_rows')
+
+        comment = comments[0]
+        url = (
+            f'/api/v1/titles/{titles[0].id}/reviews/{comment.review_id}'
+            f'/comments/{comment.id}/'
+        )
+        response = user_client.patch(url, {'text': 'Да!'})
+        assert response.status_code == 200
+        restored = Comment.objects.get(pk=comment.id)
+        assert restored.text == 'Да!'
+        assert restored.pub_date < timezone.now() - timedelta(days=300), (
+            'Проверьте, что восстановление сохраняет дату публикации'
+        )
+        assert Review.objects.filter(pk=comment.review_id).exists(), (
+            'Проверьте, что вместе с комментарием восстанавливается отзыв'
+        )
+
+        response = user_client.post(
+            f'/api/v1/titles/{titles[0].id}/reviews/',
+            {'text': 'Ещё раз', 'score': 5},
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что архивный отзыв учитывается в проверке '
+            'уникальности'
+        )
+
+    @pytest.mark.django_db
+    def test_restore_command(self, titles, comments):
+        make_old(Review.objects.all())
+        make_old(Comment.objects.all())
+        call_command('archive_old_rows', '--batch-size', '1')
+        call_command('restore_archived_rows', '--titles', str(titles[0].id))
+        assert Review.objects.count() == 2
+        assert Comment.objects.count() == 3
+        assert ArchivedReview.objects.count() == 1
+
+        call_command('restore_archived_rows', '--all')
+        assert not ArchivedReview.objects.exists()
+        assert TitleStats.objects.get(title=titles[0]).count == 2
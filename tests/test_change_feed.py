@@ -0,0 +1,141 @@
+import socket
+import threading
+from types import SimpleNamespace
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from api.events import EventHub, event_stream_app
+from api.models import ChangeEvent
+
+
+def _collect_asgi(query_string=b'', headers=()):
+    sent = []
+    received = []
+
+    async def receive():
+        received.append(True)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        'type': 'http',
+        'path': '/api/v1/events/stream/',
+        'query_string': query_string,
+        'headers': list(headers),
+    }
+    async_to_sync(event_stream_app)(scope, receive, send)
+    return sent
+
+
+class TestChangeFeed:
+
+    @pytest.mark.django_db
+    def test_events_recorded(self, titles, reviews, comments):
+        review = reviews[0]
+        review_id = review.id
+        review.text = 'Изменено'
+        review.save()
+        review.delete()
+        events = list(
+            ChangeEvent.objects.filter(title_id=titles[0].id)
+            .values_list('object_type', 'action', 'object_id')
+        )
+        assert ('review', 'created', review_id) in events
+        assert ('review', 'updated', review_id) in events
+        assert ('review', 'deleted', review_id) in events
+        assert ('comment', 'deleted', comments[0].id) in events
+
+    @pytest.mark.django_db
+    def test_polling_endpoint(self, client, titles, reviews, comments):
+        response = client.get(
+            '/api/v1/events/', {'review': reviews[0].id}
+        )
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert [item['object_type'] for item in results] == [
+            'review', 'comment', 'comment'
+        ]
+        cursor = results[0]['id']
+        response = client.get(
+            '/api/v1/events/', {'review': reviews[0].id, 'after': cursor}
+        )
+        assert len(response.json()['results']) == 2
+
+    @pytest.mark.django_db
+    def test_wsgi_stream_points_to_polling(self, client, titles, reviews):
+        first = ChangeEvent.objects.order_by('id').first()
+        response = client.get(
+            '/api/v1/events/stream/', {'title': titles[0].id},
+            HTTP_LAST_EVENT_ID=str(first.id),
+        )
+        assert response.status_code == 503, (
+            'Проверьте, что WSGI-воркер не держит поток событий'
+        )
+        poll = response.json()['poll']
+        assert poll.startswith('/api/v1/events/?')
+        results = client.get(poll).json()['results']
+        assert [item['id'] for item in results] == list(
+            ChangeEvent.objects.filter(
+                title_id=titles[0].id, id__gt=first.id
+            ).order_by('id').values_list('id', flat=True)
+        )
+        assert len(results) == 1
+
+    @pytest.mark.django_db
+    def test_stream_rejects_bad_params(self, client):
+        response = client.get('/api/v1/events/stream/', {'title': 'x'})
+        assert response.status_code == 400
+
+    @pytest.mark.django_db
+    def test_asgi_stream_replays_backlog(self, titles, reviews):
+        sent = _collect_asgi(f'title={titles[1].id}&after=0'.encode())
+        assert sent[0]['status'] == 200
+        bodies = b''.join(message.get('body', b'') for message in sent[1:])
+        assert bodies.count(b'event: review.created') == 1
+        assert f'"object_id":{reviews[2].id}'.encode() in bodies
+
+    @pytest.mark.django_db
+    def test_stream_without_cursor_starts_at_latest(self, client, titles,
+                                                   reviews):
+        sent = _collect_asgi(f'title={titles[1].id}'.encode())
+        bodies = b''.join(message.get('body', b'') for message in sent[1:])
+        assert b'event:' not in bodies, (
+            'Проверьте, что без курсора история событий не пересылается'
+        )
+        poll = client.get('/api/v1/events/stream/').json()['poll']
+        assert client.get(poll).json()['results'] == []
+
+    def test_listener_connects_off_the_event_loop(self, monkeypatch):
+        threads = []
+        reader, writer = socket.socketpair()
+
+        class Listener:
+            def fileno(self):
+                return reader.fileno()
+
+            def close(self):
+                reader.close()
+                writer.close()
+
+        def connect(params):
+            threads.append(threading.get_ident())
+            return Listener()
+
+        monkeypatch.setattr('api.events.connection', SimpleNamespace(
+            vendor='postgresql', get_connection_params=dict,
+        ))
+        monkeypatch.setattr(EventHub, '_connect', staticmethod(connect))
+
+        async def listen():
+            hub = EventHub(poll_interval=1, queue_size=1)
+            await hub._listen()
+            hub._unlisten()
+            return threading.get_ident()
+
+        loop_thread = async_to_sync(listen)()
+        assert threads and threads[0] != loop_thread, (
+            'Проверьте, что подключение LISTEN не блокирует цикл событий'
+        )
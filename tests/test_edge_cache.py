@@ -0,0 +1,79 @@
+import pytest
+
+from api.edge_cache import (
+    BaseEdgeCache,
+    DummyEdgeCache,
+    HttpPurgeEdgeCache,
+    get_edge_cache,
+)
+from api_yamdb import settings as project_settings
+
+
+@pytest.fixture
+def edge_cache():
+    cache = get_edge_cache()
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+class TestEdgeCache:
+
+    @pytest.mark.django_db
+    def test_anonymous_get_headers(self, client, titles):
+        response = client.get('/api/v1/titles/')
+        assert 'public' in response['Cache-Control']
+        assert 's-maxage=5' in response['Cache-Control']
+        assert response['Surrogate-Key'].split() == [
+            'titles', 'genres', 'categories'
+        ]
+        response = client.get(f'/api/v1/titles/{titles[0].id}/reviews/')
+        assert response['Surrogate-Key'] == f'title-{titles[0].id}-reviews'
+
+    @pytest.mark.django_db
+    def test_authenticated_get_is_private(self, user_client, titles):
+        response = user_client.get('/api/v1/titles/')
+        assert 'private' in response['Cache-Control']
+        assert not response.has_header('Surrogate-Key')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_review_write_purges_title_keys(
+            self, user_client, titles, edge_cache):
+        title = titles[0]
+        edge_cache.store('/api/v1/genres/', _tagged('genres'))
+        edge_cache.store('/reviews/', _tagged(f'title-{title.id}-reviews'))
+        response = user_client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            {'text': 'Неплохо', 'score': 7},
+        )
+        assert response.status_code == 201
+        assert set(edge_cache.purged_keys) == {
+            'titles', f'title-{title.id}', f'title-{title.id}-reviews'
+        }
+        assert edge_cache.get('/reviews/') is None
+        assert edge_cache.get('/api/v1/genres/') is not None
+
+    def test_unreachable_gateway_does_not_fail_purge(self, caplog):
+        edge_cache = HttpPurgeEdgeCache(URL='http://127.0.0.1:9/', TIMEOUT=1)
+        edge_cache.purge({'titles'})
+        assert 'titles' in caplog.text, (
+            'Проверьте, что ошибка очистки шлюза пишется в лог'
+        )
+
+    def test_shipped_gateway_keeps_short_max_age(self):
+        with pytest.raises(TypeError):
+            BaseEdgeCache()
+        edge_cache = project_settings.EDGE_CACHE
+        if edge_cache['BACKEND'] == 'api.edge_cache.DummyEdgeCache':
+            assert edge_cache['MAX_AGE'] <= 5, (
+                'Проверьте, что без очистки шлюза ответы кешируются коротко'
+            )
+        DummyEdgeCache().purge(['titles'])
+
+
+def _tagged(keys):
+    from django.http import HttpResponse
+
+    response = HttpResponse()
+    response['Surrogate-Key'] = keys
+    return response
@@ -0,0 +1,86 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.facets import query_facet_counts, stored_facet_counts
+from api.models import FacetCount, Title
+
+FACETS_URL = '/api/v1/titles/facets/'
+
+
+def counts(items, key='slug'):
+    return {item[key]: item['count'] for item in items}
+
+
+def assert_stored_counts_match():
+    assert sorted(stored_facet_counts()) == sorted(
+        query_facet_counts(Title.objects.all())
+    ), 'Проверьте, что счётчики фасетов следуют за изменениями'
+
+
+class TestFacets:
+
+    @pytest.mark.django_db
+    def test_unfiltered_facets_use_stored_counts(self, client, titles):
+        with CaptureQueriesContext(connection) as queries:
+            data = client.get(FACETS_URL).json()
+        assert counts(data['genre']) == {'drama': 2, 'comedy': 1, 'sci-fi': 1}
+        assert counts(data['category']) == {'movie': 2, 'book': 1}
+        assert counts(data['decade'], 'decade') == {
+            1860: 1, 1970: 1, 1990: 1,
+        }
+        assert 'api_facetcount' in queries[0]['sql']
+
+        data = client.get(FACETS_URL, {'category': 'movie'}).json()
+        assert counts(data['genre']) == {'drama': 1, 'sci-fi': 1}
+        assert counts(data['category']) == {'movie': 2}
+
+    @pytest.mark.django_db
+    def test_filtered_facets_use_one_grouped_query(self, client, titles):
+        with CaptureQueriesContext(connection) as queries:
+            data = client.get(FACETS_URL, {'genre': 'drama'}).json()
+        assert counts(data['category']) == {'movie': 1, 'book': 1}
+        assert counts(data['genre']) == {'drama': 2, 'comedy': 1}
+        grouped = [
+            query['sql'] for query in queries
+            if 'GROUP BY' in query['sql']
+        ]
+        assert len(grouped) == 1 and 'UNION ALL' in grouped[0]
+        assert 'api_facetcount' not in grouped[0]
+
+        data = client.get(
+            FACETS_URL, {'category': 'movie', 'year_min': 1980}
+        ).json()
+        assert counts(data['decade'], 'decade') == {1990: 1}
+
+    @pytest.mark.django_db
+    def test_counts_follow_changes(self, admin_client, titles, genres,
+                                   categories):
+        url = f'/api/v1/titles/{titles[0].id}/'
+        admin_client.patch(url, {'category': 'book', 'year': 2001})
+        assert_stored_counts_match()
+        admin_client.patch(url, {'genre': ['comedy', 'sci-fi']})
+        assert_stored_counts_match()
+        titles[1].genre.remove(genres[1], genres[2])
+        genres[2].titles.add(titles[1])
+        assert_stored_counts_match()
+        titles[2].genre.clear()
+        assert_stored_counts_match()
+        admin_client.post('/api/v1/titles/', {
+            'name': 'Сталкер', 'year': 1979,
+            'category': 'movie', 'genre': ['drama'],
+        })
+        assert_stored_counts_match()
+        genres[0].delete()
+        categories[1].delete()
+        assert_stored_counts_match()
+        titles[2].delete()
+        assert_stored_counts_match()
+
+    @pytest.mark.django_db
+    def test_rebuild_command(self, titles):
+        expected = sorted(stored_facet_counts())
+        FacetCount.objects.all().delete()
+        call_command('rebuild_facet_counts')
+        assert sorted(stored_facet_counts()) == expected
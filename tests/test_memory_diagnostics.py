@@ -0,0 +1,73 @@
+import os
+import time
+
+import pytest
+
+from api.memory import get_memory_profiler
+
+URL = '/api/v1/diagnostics/memory/'
+
+
+@pytest.fixture
+def profiler():
+    profiler = get_memory_profiler()
+    yield profiler
+    profiler.stop()
+
+
+class TestMemoryDiagnostics:
+
+    @pytest.mark.django_db
+    def test_admin_only(self, client, user_client, moderator_client):
+        assert client.get(URL).status_code == 401
+        assert user_client.get(URL).status_code == 403
+        assert moderator_client.post(f'{URL}start/').status_code == 403
+
+    @pytest.mark.django_db
+    def test_snapshots_top_and_diff(self, admin_client, profiler):
+        response = admin_client.post(f'{URL}snapshot/')
+        assert response.status_code == 400, (
+            'Проверьте, что снимок без трассировки даёт ошибку 400'
+        )
+
+        data = admin_client.post(f'{URL}start/').json()
+        assert data['tracing'] is True and data['pid'] == os.getpid()
+        first = admin_client.post(f'{URL}snapshot/').json()['id']
+        garbage = [bytearray(1024) for _ in range(1000)]  # noqa: F841
+        second = admin_client.post(f'{URL}snapshot/').json()['id']
+
+        top = admin_client.get(f'{URL}top/', {'limit': 5}).json()
+        assert len(top) == 5
+        assert {'file', 'line', 'size', 'count'} <= set(top[0])
+
+        diff = admin_client.get(
+            f'{URL}diff/', {'from': first, 'to': second}
+        ).json()
+        assert diff[0]['size_diff'] >= 1000 * 1024, (
+            'Проверьте, что разница снимков показывает новые выделения'
+        )
+        assert admin_client.get(
+            f'{URL}diff/', {'from': first, 'to': 999}
+        ).status_code == 404
+
+        data = admin_client.post(f'{URL}stop/').json()
+        assert data['tracing'] is False and data['snapshots'] == []
+
+    def test_signal_report(self, profiler, caplog):
+        profiler.report()
+        assert profiler.tracing
+        profiler.report()
+        profiler.report()
+        assert len(profiler.snapshots) == 2
+        assert caplog.text.count('снимок памяти') == 2
+
+    def test_signal_handler_does_not_take_lock(self, profiler):
+        profiler.start_signal_worker()
+        with profiler._lock:
+            profiler.handle_signal(None, None)
+        deadline = time.monotonic() + 5
+        while not profiler.tracing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert profiler.tracing, (
+            'Проверьте, что сигнал обрабатывается отдельным потоком'
+        )
@@ -0,0 +1,26 @@
+import pytest
+
+
+class TestMetrics:
+
+    @pytest.mark.django_db
+    def test_metrics_endpoint(self, client, titles, settings, tmp_path):
+        settings.EMAIL_FILE_PATH = str(tmp_path)
+        client.post('/api/v1/auth/email/', {
+            'email': 'metrics@yamdb.fake', 'username': 'metrics',
+        })
+        client.get('/api/v1/titles/')
+        client.get('/api/v1/nowhere/')
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        body = response.content.decode()
+        assert (
+            'yamdb_http_requests_total{method="GET",route="title-list",'
+            'status="200"}'
+        ) in body
+        assert 'route="unmatched"' in body
+        assert 'yamdb_http_request_duration_seconds_bucket' in body
+        assert 'yamdb_db_queries_total{route="title-list"}' in body
+        assert 'yamdb_mail_sent_total' in body
+        assert 'yamdb_mail_outbox_messages' not in body
+        assert 'yamdb_worker_rss_bytes' in body
@@ -0,0 +1,34 @@
+import pytest
+
+
+class TestPathScopedMiddleware:
+
+    @pytest.mark.django_db
+    def test_api_uses_lean_stack(self, client):
+        response = client.get('/api/v1/genres/')
+        assert response.status_code == 200
+        assert not response.has_header('X-Frame-Options'), (
+            'Проверьте, что запросы к API не проходят XFrameOptionsMiddleware'
+        )
+        assert 'sessionid' not in response.cookies
+
+    @pytest.mark.django_db
+    def test_admin_uses_full_stack(self, client, admin):
+        admin.is_staff = True
+        admin.save()
+        client.force_login(admin)
+        response = client.get('/admin/')
+        assert response.status_code == 200
+        assert response['X-Frame-Options'] == 'DENY'
+        response = client.get('/redoc/')
+        assert response.has_header('X-Frame-Options')
+
+    @pytest.mark.django_db
+    def test_admin_login_keeps_csrf(self, admin):
+        from django.test import Client
+
+        strict = Client(enforce_csrf_checks=True)
+        response = strict.post(
+            '/admin/login/', {'username': admin.username, 'password': 'x'}
+        )
+        assert response.status_code == 403
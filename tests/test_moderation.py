@@ -0,0 +1,147 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from api.archive import archive_reviews
+from api.models import (
+    ArchivedReview,
+    ChangeEvent,
+    Comment,
+    ModerationLog,
+    Review,
+    TitleStats,
+)
+from api.stats import rebuild_title_stats
+
+REVIEWS_URL = '/api/v1/moderation/reviews/'
+COMMENTS_URL = '/api/v1/moderation/comments/'
+
+
+def histograms():
+    return {
+        stats.title_id: stats.histogram
+        for stats in TitleStats.objects.all()
+    }
+
+
+def assert_stats_consistent():
+    current = histograms()
+    rebuild_title_stats()
+    assert histograms() == current, (
+        'Проверьте, что модерация сдвигает счётчики оценок'
+    )
+
+
+class TestModeration:
+
+    @pytest.mark.django_db
+    def test_only_moderators(self, user_client, moderator_client, reviews):
+        data = {'action': 'hide', 'ids': [reviews[0].id]}
+        assert user_client.post(
+            REVIEWS_URL, data, format='json'
+        ).status_code == 403
+        assert moderator_client.post(
+            REVIEWS_URL, data, format='json'
+        ).status_code == 200
+        assert moderator_client.get('/api/v1/moderation/').status_code == 200
+
+    @pytest.mark.django_db
+    def test_validation(self, moderator_client, reviews):
+        response = moderator_client.post(
+            REVIEWS_URL, {'action': 'delete'}, format='json'
+        )
+        assert response.status_code == 400
+        response = moderator_client.post(REVIEWS_URL, {
+            'action': 'delete', 'author': reviews[0].author.username,
+            'since': timezone.now().isoformat(),
+        }, format='json')
+        assert response.status_code == 400
+        assert 'title' in response.json()
+        assert Review.objects.count() == 3
+
+    @pytest.mark.django_db
+    def test_delete_by_author(self, moderator_client, settings, titles,
+                              reviews, comments, user):
+        settings.MODERATION = {**settings.MODERATION, 'BATCH_SIZE': 1}
+        spam = Review.objects.create(
+            title=titles[2], author=user, text='Спам', score=1,
+        )
+        Review.objects.filter(id=spam.id).update(
+            pub_date=timezone.now() - timedelta(days=800)
+        )
+        archive_reviews(timezone.now() - timedelta(days=400))
+        assert ArchivedReview.objects.filter(id=spam.id).exists()
+        events = ChangeEvent.objects.count()
+
+        response = moderator_client.post(REVIEWS_URL, {
+            'action': 'delete', 'author': user.username,
+        }, format='json')
+        assert response.status_code == 200
+        summary = response.json()
+        assert (summary['reviews'], summary['comments']) == (2, 1), (
+            'Проверьте, что удаляются и архивные отзывы, и комментарии '
+            'удалённых отзывов'
+        )
+        assert not Review.objects.filter(author=user).exists()
+        assert not ArchivedReview.objects.exists()
+        assert not Comment.objects.filter(review=reviews[1]).exists()
+        assert ChangeEvent.objects.count() == events + 3
+        assert_stats_consistent()
+
+        log = ModerationLog.objects.get(id=summary['id'])
+        items = list(log.items.all())
+        assert sorted(
+            (item.object_type, item.object_id) for item in items
+        ) == sorted(
+            [('review', reviews[1].id), ('review', spam.id),
+             ('comment', comments[2].id)]
+        ), 'Проверьте, что каждый объект записан строкой журнала'
+        assert any('Спам' in item.data for item in items)
+
+    @pytest.mark.django_db
+    def test_hide_reviews_in_time_window(self, client, moderator_client,
+                                         titles, reviews, comments):
+        Review.objects.filter(id=reviews[0].id).update(
+            pub_date=timezone.now() - timedelta(days=3)
+        )
+        response = moderator_client.post(REVIEWS_URL, {
+            'action': 'hide',
+            'title': titles[0].id,
+            'since': (timezone.now() - timedelta(days=1)).isoformat(),
+        }, format='json')
+        assert response.json()['reviews'] == 1
+        assert Review.objects.get(id=reviews[1].id).is_hidden
+        assert_stats_consistent()
+
+        url = f'/api/v1/titles/{titles[0].id}/reviews/'
+        data = client.get(url).json()
+        assert [item['id'] for item in data['results']] == [reviews[0].id]
+        assert client.get(f'{url}{reviews[1].id}/').status_code == 404
+        assert client.get(
+            f'{url}{reviews[1].id}/comments/'
+        ).status_code == 404
+        title = client.get(f'/api/v1/titles/{titles[0].id}/').json()
+        assert title['rating'] == 10
+
+        Review.objects.get(id=reviews[1].id).delete()
+        assert_stats_consistent()
+
+    @pytest.mark.django_db
+    def test_hide_comments_by_ids(self, client, moderator_client, titles,
+                                  comments):
+        events = ChangeEvent.objects.count()
+        response = moderator_client.post(COMMENTS_URL, {
+            'action': 'hide', 'ids': [comments[0].id, comments[2].id],
+        }, format='json')
+        assert response.json()['comments'] == 2
+        review = comments[0].review
+        data = client.get(
+            f'/api/v1/titles/{review.title_id}/reviews/{review.id}/comments/'
+        ).json()
+        assert [item['id'] for item in data['results']] == [comments[1].id]
+        assert ChangeEvent.objects.count() == events + 2
+        repeated = moderator_client.post(COMMENTS_URL, {
+            'action': 'hide', 'ids': [comments[0].id],
+        }, format='json')
+        assert repeated.json()['comments'] == 0
@@ -0,0 +1,73 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class TestMultiGet:
+
+    @pytest.mark.django_db
+    def test_titles_multi_get(self, client, titles):
+        ids = [titles[2].id, 999999, titles[0].id]
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(
+                '/api/v1/titles/', {'ids': ','.join(map(str, ids))}
+            )
+        assert response.status_code == 200
+        data = response.json()
+        assert [item['id'] for item in data['results']] == [
+            titles[2].id, titles[0].id
+        ], 'Проверьте, что порядок ответа совпадает с порядком ids'
+        assert data['missing'] == [999999]
+        assert len(queries) == 3, (
+            'Проверьте, что ключи, произведения и жанры выбираются одним '
+            'запросом каждые'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            repeated = client.get(
+                '/api/v1/titles/', {'ids': ','.join(map(str, ids))}
+            )
+        assert repeated.json() == data
+        assert len(queries) == 1, (
+            'Проверьте, что повторный запрос собирается из кеша фрагментов'
+        )
+
+    @pytest.mark.django_db
+    def test_titles_multi_get_validation(self, client, titles):
+        assert client.get('/api/v1/titles/', {'ids': 'a,b'}).status_code == 400
+        assert client.get('/api/v1/titles/', {'ids': ''}).status_code == 400
+        too_many = ','.join(str(i) for i in range(1, 502))
+        assert client.get(
+            '/api/v1/titles/', {'ids': too_many}
+        ).status_code == 400
+
+    @pytest.mark.django_db
+    def test_reviews_multi_get(self, client, titles, reviews):
+        ids = f'{reviews[1].id},{reviews[2].id},{reviews[0].id}'
+        response = client.get(
+            f'/api/v1/titles/{titles[0].id}/reviews/', {'ids': ids}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [item['id'] for item in data['results']] == [
+            reviews[1].id, reviews[0].id
+        ]
+        assert data['missing'] == [reviews[2].id], (
+            'Проверьте, что отзывы другого произведения не попадают в ответ'
+        )
+
+    @pytest.mark.django_db
+    def test_users_multi_get(self, admin_client, admin, user):
+        response = admin_client.get(
+            '/api/v1/users/', {'ids': f'{user.username},nobody,{admin.username}'}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [item['username'] for item in data['results']] == [
+            user.username, admin.username
+        ]
+        assert data['missing'] == ['nobody']
+
+    @pytest.mark.django_db
+    def test_users_multi_get_requires_admin(self, user_client, user):
+        response = user_client.get('/api/v1/users/', {'ids': user.username})
+        assert response.status_code == 403
@@ -0,0 +1,17 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from api.models import Comment
+
+
+class TestPartitioning:
+
+    def test_comment_keeps_review_constraint(self):
+        assert Comment._meta.get_field('review').db_constraint, (
+            'Проверьте, что внешний ключ снимается только при секционировании'
+        )
+
+    @pytest.mark.django_db
+    def test_command_requires_postgresql(self):
+        with pytest.raises(CommandError):
+            call_command('partition_reviews', partitions=4)
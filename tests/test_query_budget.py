@@ -0,0 +1,86 @@
+import pytest
+from django.db import OperationalError
+
+from api.metrics import QUERY_BUDGET_VIOLATIONS
+from api.models import Comment, Review, User
+from api.query_budget import QueryBudget, QueryBudgetError
+from api.views import TitleViewSet
+
+
+class QueryCanceled(Exception):
+    pgcode = '57014'
+
+
+class TestQueryBudget:
+
+    @pytest.mark.django_db
+    def test_strict_mode_fails_loudly(self, client, titles, monkeypatch):
+        monkeypatch.setattr(TitleViewSet, 'query_budgets', {
+            'list': QueryBudget(max_queries=1, timeout_ms=1000),
+        })
+        with pytest.raises(QueryBudgetError):
+            client.get('/api/v1/titles/')
+
+    @pytest.mark.django_db
+    def test_production_mode_returns_503(self, client, titles, settings,
+                                         monkeypatch):
+        settings.QUERY_BUDGET = {**settings.QUERY_BUDGET, 'STRICT': False}
+        monkeypatch.setattr(TitleViewSet, 'query_budgets', {
+            'list': QueryBudget(max_queries=1, timeout_ms=1000),
+        })
+        violations = QUERY_BUDGET_VIOLATIONS.labels('title-list', 'queries')
+        before = violations._value.get()
+        response = client.get('/api/v1/titles/')
+        assert response.status_code == 503
+        assert violations._value.get() == before + 1
+
+    @pytest.mark.django_db
+    def test_statement_timeout_returns_503(self, client, titles, settings,
+                                           monkeypatch):
+        settings.QUERY_BUDGET = {**settings.QUERY_BUDGET, 'STRICT': False}
+
+        def list_view(self, request, *args, **kwargs):
+            raise OperationalError('canceling statement') from QueryCanceled()
+
+        monkeypatch.setattr(TitleViewSet, 'list', list_view)
+        response = client.get('/api/v1/titles/')
+        assert response.status_code == 503, (
+            'Проверьте, что отмена запроса по statement_timeout даёт 503'
+        )
+
+    @pytest.mark.django_db
+    def test_list_budgets_do_not_grow_with_rows(self, client, titles,
+                                                reviews):
+        for i in range(20):
+            author = User.objects.create(
+                username=f'reader{i}', email=f'reader{i}@yamdb.fake'
+            )
+            review = Review.objects.create(
+                title=titles[2], author=author, text='Текст', score=7,
+            )
+            Comment.objects.create(review=reviews[0], author=author, text='!')
+        for url in (
+            '/api/v1/titles/',
+            f'/api/v1/titles/{titles[2].id}/reviews/',
+            f'/api/v1/titles/{titles[2].id}/reviews/{review.id}/',
+            f'/api/v1/titles/{titles[0].id}/reviews/{reviews[0].id}'
+            '/comments/',
+        ):
+            assert client.get(url).status_code == 200, (
+                f'Проверьте бюджет запросов {url}'
+            )
+
+    @pytest.mark.django_db
+    def test_include_budget_only_with_includes(self, client, titles,
+                                               reviews, monkeypatch):
+        monkeypatch.setattr(
+            TitleViewSet, 'include_query_budget',
+            QueryBudget(max_queries=1, timeout_ms=1000),
+        )
+        url = f'/api/v1/titles/{titles[0].id}/'
+        assert client.get(url).status_code == 200, (
+            'Проверьте, что обычный детальный ответ укладывается в бюджет '
+            'retrieve'
+        )
+        with pytest.raises(QueryBudgetError):
+            client.get(url, {'include': 'reviews'})
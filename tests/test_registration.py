@@ -0,0 +1,104 @@
+import re
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import User
+
+REGISTER_URL = '/api/v1/auth/email/'
+TOKEN_URL = '/api/v1/auth/token/'
+
+
+def sent_code(mailoutbox):
+    return re.search(r'confirmation_code = (\S+)', mailoutbox[-1].body)[1]
+
+
+class TestRegistration:
+
+    @pytest.mark.django_db
+    def test_registration_is_single_insert(self, client, mailoutbox):
+        data = {'email': 'new@yamdb.fake', 'username': 'newbie'}
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(REGISTER_URL, data)
+        assert response.status_code == 200
+        selects = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT')
+        ]
+        assert not selects, (
+            'Проверьте, что регистрация не проверяет уникальность '
+            'отдельными запросами'
+        )
+        user = User.objects.get(email='new@yamdb.fake')
+        code = sent_code(mailoutbox)
+        assert len(user.confirmation_code) == 64
+        assert user.confirmation_code != code, (
+            'Проверьте, что в базе хранится хеш кода, а не сам код'
+        )
+        assert user.confirmation_code_expires is not None
+
+    @pytest.mark.django_db
+    def test_conflicts_report_unique_errors(self, client, user, mailoutbox):
+        response = client.post(
+            REGISTER_URL, {'email': user.email, 'username': 'other'}
+        )
+        assert response.status_code == 400
+        assert list(response.json()) == ['email']
+
+        response = client.post(REGISTER_URL, {
+            'email': 'other@yamdb.fake', 'username': user.username,
+        })
+        assert response.status_code == 400
+        assert list(response.json()) == ['username']
+
+        response = client.post(
+            REGISTER_URL, {'email': user.email, 'username': user.username}
+        )
+        assert response.status_code == 200, (
+            'Проверьте, что повторная регистрация высылает новый код'
+        )
+        assert len(mailoutbox) == 1
+
+    @pytest.mark.django_db
+    def test_username_is_required(self, client, mailoutbox):
+        response = client.post(REGISTER_URL, {'email': 'ab@yamdb.fake'})
+        assert response.status_code == 400, (
+            'Проверьте, что регистрация без username возвращает 400'
+        )
+        assert list(response.json()) == ['username']
+        assert not User.objects.filter(email='ab@yamdb.fake').exists()
+        assert not mailoutbox
+
+    @pytest.mark.django_db
+    def test_code_is_single_use(self, client, mailoutbox):
+        client.post(REGISTER_URL, {'email': 'a@yamdb.fake', 'username': 'a'})
+        data = {'email': 'a@yamdb.fake', 'confirmation_code': 'wrong'}
+        assert client.post(TOKEN_URL, data).status_code == 404
+
+        data['confirmation_code'] = sent_code(mailoutbox)
+        response = client.post(TOKEN_URL, data)
+        assert response.status_code == 200
+        assert User.objects.get(username='a').confirmation_code is None
+        assert client.post(TOKEN_URL, data).status_code == 404, (
+            'Проверьте, что код гасится после использования'
+        )
+
+    @pytest.mark.django_db
+    def test_expired_codes(self, client, mailoutbox, settings):
+        client.post(REGISTER_URL, {'email': 'b@yamdb.fake', 'username': 'b'})
+        user = User.objects.get(username='b')
+        user.confirmation_code_expires -= timedelta(days=2)
+        user.save()
+        data = {
+            'email': 'b@yamdb.fake',
+            'confirmation_code': sent_code(mailoutbox),
+        }
+        assert client.post(TOKEN_URL, data).status_code == 404
+
+        call_command('prune_confirmation_codes', '--batch-size', '1')
+        user.refresh_from_db()
+        assert user.confirmation_code is None
+        assert user.confirmation_code_expires is None
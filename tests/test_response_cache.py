@@ -0,0 +1,104 @@
+import gzip
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Genre
+from api.response_cache import choose_encoding
+
+
+@pytest.fixture
+def response_cache(settings):
+    settings.RESPONSE_CACHE = {
+        **settings.RESPONSE_CACHE, 'ENABLED': True, 'MIN_SIZE': 0,
+        'TIMEOUT': 60,
+    }
+
+
+def decoded(response):
+    encoding = response.get('Content-Encoding')
+    if encoding == 'gzip':
+        return json.loads(gzip.decompress(response.content))
+    if encoding == 'br':
+        import brotli
+
+        return json.loads(brotli.decompress(response.content))
+    return json.loads(response.content)
+
+
+class TestResponseCache:
+
+    def test_choose_encoding(self):
+        variants = {'identity': b'', 'gzip': b''}
+        assert choose_encoding('gzip, deflate', variants) == 'gzip'
+        assert choose_encoding('gzip;q=0, deflate', variants) == 'identity'
+        assert choose_encoding('*', variants) == 'gzip'
+        assert choose_encoding('', variants) == 'identity'
+
+    @pytest.mark.django_db
+    def test_variants_are_served_from_cache(self, client, response_cache,
+                                            titles):
+        url = f'/api/v1/titles/{titles[0].id}/'
+        identity = client.get(url, {'include': 'reviews,comments'})
+        assert 'Content-Encoding' not in identity
+        assert 'Accept-Encoding' in identity['Vary']
+        with CaptureQueriesContext(connection) as queries:
+            compressed = client.get(
+                url, {'include': 'reviews,comments'},
+                HTTP_ACCEPT_ENCODING='gzip',
+            )
+        assert not queries, (
+            'Проверьте, что повторный ответ берётся из кеша без запросов'
+        )
+        assert compressed['Content-Encoding'] in ('gzip', 'br')
+        assert len(compressed.content) < len(identity.content)
+        assert decoded(compressed) == decoded(identity)
+        assert compressed['Surrogate-Key'] == identity['Surrogate-Key']
+
+    @pytest.mark.django_db
+    def test_brotli_when_installed(self, client, response_cache, titles):
+        pytest.importorskip('brotli')
+        response = client.get('/api/v1/titles/', HTTP_ACCEPT_ENCODING='br')
+        assert response['Content-Encoding'] == 'br'
+        assert decoded(response)['count'] == 3
+
+    @pytest.mark.django_db
+    def test_authenticated_requests_bypass_cache(
+            self, client, user_client, response_cache, genres):
+        client.get('/api/v1/genres/')
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.get(
+                '/api/v1/genres/', HTTP_ACCEPT_ENCODING='gzip'
+            )
+        assert queries
+        assert 'Content-Encoding' not in response
+
+    @pytest.mark.django_db(transaction=True)
+    def test_purge_invalidates_cached_response(
+            self, client, admin_client, response_cache, genres):
+        before = client.get('/api/v1/genres/').json()
+        response = admin_client.post(
+            '/api/v1/genres/', {'name': 'Вестерн', 'slug': 'western'}
+        )
+        assert response.status_code == 201
+        after = client.get('/api/v1/genres/').json()
+        assert after['count'] == before['count'] + 1, (
+            'Проверьте, что очистка ключа genres сбрасывает кеш ответов'
+        )
+
+    @pytest.mark.django_db
+    def test_key_includes_scheme_and_host(self, client, response_cache):
+        Genre.objects.bulk_create(
+            Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(11)
+        )
+        for host in ('a.yamdb.fake', 'b.yamdb.fake'):
+            response = client.get('/api/v1/genres/', HTTP_HOST=host)
+            assert response.json()['next'].startswith(f'http://{host}/'), (
+                'Проверьте, что кеш ответов различает хосты'
+            )
+        response = client.get(
+            '/api/v1/genres/', HTTP_HOST='a.yamdb.fake', secure=True
+        )
+        assert response.json()['next'].startswith('https://a.yamdb.fake/')
@@ -0,0 +1,37 @@
+import os
+import runpy
+
+from django.conf import settings
+
+from api_yamdb.startup import ImportTimer
+
+
+class TestServerConfig:
+
+    def test_gunicorn_config(self, monkeypatch):
+        monkeypatch.delenv('GUNICORN_WORKERS', raising=False)
+        config = runpy.run_path(
+            os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+        )
+        assert config['preload_app'] is True
+        assert config['workers'] == config['CPUS'] * 2 + 1
+        assert config['max_requests'] > 0 and config['timeout'] > 0
+        for hook in (
+            'post_request', 'post_worker_init', 'child_exit', 'when_ready',
+        ):
+            assert callable(config[hook]), f'Проверьте хук gunicorn {hook}'
+
+        with open(os.path.join(settings.BASE_DIR, 'Dockerfile')) as file:
+            assert 'gunicorn.conf.py' in file.read(), (
+                'Проверьте, что Dockerfile запускает gunicorn с конфигом'
+            )
+
+    def test_import_timer(self):
+        timer = ImportTimer().install()
+        try:
+            import tests.fixtures.startup_probe  # noqa: F401
+        finally:
+            timer.uninstall()
+        total, own = timer.timings['tests.fixtures.startup_probe']
+        assert total >= own > 0
+        assert 'tests' in dict(timer.by_package())
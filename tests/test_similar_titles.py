@@ -0,0 +1,71 @@
+import pytest
+from django.core.management import call_command
+
+from api.models import Review, SimilarTitle
+
+
+@pytest.fixture
+def shared_viewers(titles, admin, moderator, user):
+    for author in (admin, moderator):
+        Review.objects.create(
+            title=titles[2], author=author, text='Шедевр', score=9,
+        )
+    Review.objects.create(
+        title=titles[0], author=moderator, text='Шедевр', score=9,
+    )
+    Review.objects.create(
+        title=titles[0], author=admin, text='Шедевр', score=10,
+    )
+
+
+class TestSimilarTitles:
+
+    @pytest.mark.django_db
+    def test_build_and_lookup(self, client, titles, shared_viewers):
+        call_command('build_similar_titles')
+        pairs = set(SimilarTitle.objects.values_list(
+            'title_id', 'similar_id'
+        ))
+        assert (titles[0].id, titles[2].id) in pairs, (
+            'Проверьте, что общие высокие оценки делают произведения похожими'
+        )
+        assert (titles[0].id, titles[1].id) in pairs, (
+            'Проверьте, что общий жанр делает произведения похожими'
+        )
+        assert all(title != similar for title, similar in pairs)
+
+        response = client.get(f'/api/v1/titles/{titles[0].id}/similar/')
+        assert response.status_code == 200
+        data = response.json()
+        assert data[0]['id'] == titles[2].id
+        assert {item['id'] for item in data} == {titles[1].id, titles[2].id}
+
+    @pytest.mark.django_db
+    def test_partial_rebuild(self, titles, shared_viewers):
+        call_command('build_similar_titles')
+        total = SimilarTitle.objects.count()
+        call_command('build_similar_titles', titles=str(titles[1].id))
+        assert SimilarTitle.objects.count() == total
+
+    @pytest.mark.django_db
+    def test_similar_for_missing_title(self, client):
+        response = client.get('/api/v1/titles/999/similar/')
+        assert response.status_code == 404
+
+    @pytest.mark.django_db
+    def test_incremental_follows_genre_changes(self, titles, genres,
+                                               shared_viewers):
+        call_command('build_similar_titles')
+        assert not SimilarTitle.objects.filter(
+            title=titles[1], similar=titles[2]
+        ).exists()
+        titles[2].genre.set([genres[1]])
+        call_command('build_similar_titles', incremental=True)
+        assert SimilarTitle.objects.filter(
+            title=titles[1], similar=titles[2]
+        ).exists(), (
+            'Проверьте, что пересчитываются и соседи изменённого произведения'
+        )
+        assert SimilarTitle.objects.filter(
+            title=titles[2], similar=titles[1]
+        ).exists()
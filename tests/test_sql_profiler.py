@@ -0,0 +1,60 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Title
+from api.sql_profiler import fingerprint, get_profiler
+
+
+class TestSqlProfiler:
+
+    def test_fingerprint_ignores_literals(self):
+        first = fingerprint(
+            "SELECT * FROM api_title WHERE id IN (1, 2, 3) AND name = 'a'"
+        )
+        second = fingerprint(
+            "SELECT * FROM api_title WHERE id IN (7) AND name = 'b''c'"
+        )
+        assert first == second
+        assert first[1] == (
+            'SELECT * FROM api_title WHERE id IN (...) AND name = ?'
+        )
+
+    @pytest.mark.django_db
+    def test_profiles_views_and_reports(
+            self, settings, tmp_path, titles, reviews, capsys):
+        settings.SQL_PROFILER = {
+            **settings.SQL_PROFILER,
+            'ENABLED': True,
+            'SLOW_MS': 0,
+            'DIR': str(tmp_path),
+        }
+        profiler = get_profiler()
+        profiler.options = settings.SQL_PROFILER
+        profiler.stats.clear()
+        Client().get(f'/api/v1/titles/{titles[0].id}/reviews/')
+        profiler.dump()
+        call_command('sql_report', dir=str(tmp_path), explain=True)
+        output = capsys.readouterr().out
+        assert 'review-list' in output
+        assert 'api_review' in output
+        assert 'SCAN' in output or 'SEARCH' in output, (
+            'Проверьте, что для медленных запросов сохраняется EXPLAIN'
+        )
+
+    @pytest.mark.django_db
+    def test_failed_explain_keeps_transaction(self, caplog, titles):
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                plan = get_profiler().explain(
+                    connection, 'SELECT missing FROM api_title', []
+                )
+            assert plan.startswith('EXPLAIN не выполнен')
+            assert any(
+                query['sql'].startswith('ROLLBACK TO SAVEPOINT')
+                for query in queries
+            ), 'Проверьте, что EXPLAIN выполняется в точке сохранения'
+            assert Title.objects.count() == len(titles)
+        assert 'EXPLAIN не выполнен' in caplog.text
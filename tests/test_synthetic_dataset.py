@@ -0,0 +1,107 @@
+import json
+from datetime import date
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+
+from api.facets import query_facet_counts, stored_facet_counts
+from api.models import (
+    Category,
+    Comment,
+    Genre,
+    Review,
+    Title,
+    TitleStats,
+    User,
+)
+from api.stats import rebuild_title_stats
+
+OPTIONS = {
+    'seed': 7, 'categories': 3, 'genres': 6, 'users': 40, 'titles': 30,
+    'reviews': 300, 'comments': 200, 'batch_size': 50, 'end': None,
+}
+
+
+def fingerprint():
+    return (
+        sorted(Title.objects.annotate(
+            reviews_count=Count('reviews'), genres_count=Count('genre'),
+        ).values_list('name', 'year', 'category__slug', 'reviews_count',
+                      'genres_count')),
+        sorted(Review.objects.values_list(
+            'title__name', 'author__username', 'score', 'pub_date',
+        )),
+        sorted(Comment.objects.values_list(
+            'review__title__name', 'author__username', 'pub_date',
+        )),
+    )
+
+
+def clear():
+    for model in (Title, Category, Genre):
+        model.objects.all().delete()
+    User.objects.filter(username__startswith='reader').delete()
+
+
+def generate(tmp_path, **options):
+    path = tmp_path / 'mix.jsonl'
+    call_command(
+        'generate_dataset', requests_file=str(path), requests=50,
+        **{**OPTIONS, **options},
+    )
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestSyntheticDataset:
+
+    @pytest.mark.django_db
+    def test_same_seed_same_dataset(self, tmp_path):
+        end = date(2020, 6, 1)
+        mix = generate(tmp_path, end=end)
+        first = fingerprint()
+        assert len(first[1]) > 0 and len(first[2]) == 200
+        assert len(mix) == 50
+
+        clear()
+        assert generate(tmp_path, end=end) == mix
+        assert fingerprint() == first, (
+            'Проверьте, что одинаковый seed даёт одинаковый набор'
+        )
+        clear()
+        generate(tmp_path, end=end, seed=8)
+        assert fingerprint() != first
+
+    @pytest.mark.django_db
+    def test_distributions_and_derived_data(self, tmp_path):
+        generate(tmp_path)
+        per_title = sorted(
+            Title.objects.annotate(total=Count('reviews'))
+            .values_list('total', flat=True),
+            reverse=True,
+        )
+        assert per_title[0] > 5 * per_title[len(per_title) // 2], (
+            'Проверьте, что отзывы распределены по закону Ципфа'
+        )
+        assert Title.genre.through.objects.count() > Title.objects.count()
+        stats = {s.title_id: s.count for s in TitleStats.objects.all()}
+        rebuild_title_stats()
+        assert stats == {
+            s.title_id: s.count for s in TitleStats.objects.all()
+        }
+        assert sorted(stored_facet_counts()) == sorted(
+            query_facet_counts(Title.objects.all())
+        )
+
+    @pytest.mark.django_db
+    def test_request_mix_replays(self, client, tmp_path):
+        mix = generate(tmp_path)
+        for line in mix:
+            assert line['method'] == 'GET'
+            response = client.get(line['path'])
+            assert response.status_code == 200, line['path']
+
+    @pytest.mark.django_db
+    def test_refuses_non_empty_catalog(self, titles):
+        with pytest.raises(CommandError):
+            call_command('generate_dataset', titles=1)
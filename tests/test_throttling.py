@@ -0,0 +1,85 @@
+import pytest
+from rest_framework.settings import api_settings
+
+from api.throttling import (
+    LocalBucketStore,
+    RedisBucketStore,
+    get_bucket_store,
+)
+
+
+@pytest.fixture
+def strict_rates(settings):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            'anon_read': '3/min',
+            'user_write': '2/min',
+            'auth': '1/min',
+        },
+    }
+    get_bucket_store().clear()
+    yield api_settings
+    get_bucket_store().clear()
+
+
+class TestThrottling:
+
+    def test_local_bucket_refills(self):
+        now = [0.0]
+        store = LocalBucketStore(clock=lambda: now[0])
+        states = [store.consume('key', 2, 1) for _ in range(3)]
+        assert [state.allowed for state in states] == [True, True, False]
+        assert states[2].retry_after == pytest.approx(1)
+        now[0] += 0.5
+        assert not store.consume('key', 2, 1).allowed
+        now[0] += 0.5
+        assert store.consume('key', 2, 1).allowed, (
+            'Проверьте, что корзина пополняется со временем'
+        )
+        assert not store.consume('key', 2, 1).allowed
+
+    def test_redis_outage_fails_open(self):
+        store = RedisBucketStore(URL='redis://127.0.0.1:9/0', TIMEOUT=0.05)
+        state = store.consume('key', 2, 1)
+        assert state.allowed, (
+            'Проверьте, что при недоступном Redis запрос пропускается'
+        )
+
+    @pytest.mark.django_db
+    def test_anonymous_reads_limited(self, client, strict_rates):
+        responses = [client.get('/api/v1/genres/') for _ in range(4)]
+        assert [r.status_code for r in responses] == [200, 200, 200, 429]
+        assert responses[0]['X-RateLimit-Limit'] == '3'
+        assert responses[0]['X-RateLimit-Remaining'] == '2'
+        assert responses[3].has_header('Retry-After')
+
+    @pytest.mark.django_db
+    def test_auth_endpoints_limited(self, client, strict_rates):
+        data = {'email': 'new@yamdb.fake', 'confirmation_code': 'x'}
+        first = client.post('/api/v1/auth/token/', data)
+        second = client.post('/api/v1/auth/token/', data)
+        assert first.status_code != 429
+        assert second.status_code == 429
+
+    @pytest.mark.django_db
+    def test_authenticated_reads_not_limited(self, user_client, strict_rates):
+        for _ in range(5):
+            assert user_client.get('/api/v1/genres/').status_code == 200
+
+    @pytest.mark.django_db
+    def test_forwarded_clients_have_own_buckets(self, client, strict_rates):
+        def status(forwarded):
+            return client.get(
+                '/api/v1/genres/', HTTP_X_FORWARDED_FOR=forwarded
+            ).status_code
+
+        assert [status('10.0.0.1') for _ in range(4)] == [
+            200, 200, 200, 429
+        ]
+        assert status('10.0.0.2') == 200, (
+            'Проверьте, что клиенты за прокси получают разные корзины'
+        )
+        assert status('10.0.0.2, 10.0.0.1') == 429, (
+            'Проверьте, что клиент не выбирает корзину подменой заголовка'
+        )
@@ -0,0 +1,67 @@
+import pytest
+from django.db import connection
+
+from api.filters import TitleFilter
+
+
+@pytest.fixture
+def seeded_titles(categories, genres):
+    from api.models import Title
+
+    through = Title.genre.through
+    Title.objects.bulk_create(
+        Title(
+            name=f'Произведение {i}',
+            year=1900 + i % 120,
+            category=categories[i % len(categories)],
+        )
+        for i in range(600)
+    )
+    through.objects.bulk_create(
+        through(title_id=title_id, genre_id=genres[title_id % 3].id)
+        for title_id in Title.objects.values_list('id', flat=True)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def _filtered(params):
+    from api.views import TitleViewSet
+
+    return TitleFilter(params, queryset=TitleViewSet.queryset).qs
+
+
+class TestTitleFilters:
+
+    @pytest.mark.django_db
+    def test_year_range_and_categories(self, titles):
+        result = _filtered({'year_min': 1900, 'year_max': 1980})
+        assert [title.name for title in result] == ['Солярис']
+        result = _filtered({'category': 'movie,book'})
+        assert result.count() == 3
+
+    @pytest.mark.django_db
+    def test_genres_any_and_all(self, titles):
+        any_result = _filtered({'genre': 'drama,sci-fi'})
+        assert any_result.count() == 3
+        all_result = _filtered({'genre_all': 'drama,comedy'})
+        assert [title.name for title in all_result] == ['Война и мир']
+
+    @pytest.mark.django_db
+    def test_rating_min(self, titles, reviews):
+        result = _filtered({'rating_min': 5})
+        assert [title.name for title in result] == ['Побег из Шоушенка']
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('params, index', [
+        ({'category': 'movie', 'year_min': 1950},
+         'title_category_year_idx'),
+        ({'year_min': 1950, 'year_max': 1960}, 'title_year_idx'),
+        ({'genre': 'drama,comedy'}, 'title_genre_genre_title_idx'),
+    ])
+    def test_filters_use_indexes(self, seeded_titles, params, index):
+        plan = _filtered(params).explain()
+        assert index in plan, (
+            f'Проверьте, что фильтр {params} использует индекс {index}:\n'
+            f'{plan}'
+        )
@@ -0,0 +1,82 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.fragments import TITLES_CACHE
+from api.metrics import CACHE_LOOKUPS
+from api.models import Review
+
+
+def by_id(response):
+    return {item['id']: item for item in response.json()['results']}
+
+
+class TestTitleFragments:
+
+    @pytest.mark.django_db
+    def test_list_is_assembled_from_fragments(self, client, titles):
+        hits = CACHE_LOOKUPS.labels(TITLES_CACHE, 'hit')
+        before = hits._value.get()
+        first = client.get('/api/v1/titles/')
+        with CaptureQueriesContext(connection) as queries:
+            second = client.get('/api/v1/titles/')
+        assert second.json() == first.json()
+        assert len(queries) == 2, (
+            'Проверьте, что при попадании в кеш выполняются только запросы '
+            'числа и ключей страницы'
+        )
+        assert hits._value.get() == before + len(titles)
+
+        detail = client.get(f'/api/v1/titles/{titles[0].id}/').json()
+        assert detail == by_id(first)[titles[0].id]
+        assert client.get('/api/v1/titles/abc/').status_code == 404
+
+    @pytest.mark.django_db
+    def test_fragments_follow_changes(self, client, admin_client, titles,
+                                      genres, categories, user):
+        client.get('/api/v1/titles/')
+        admin_client.patch(
+            f'/api/v1/titles/{titles[0].id}/', {'name': 'Зелёная миля'}
+        )
+        genres[2].name = 'Научная фантастика'
+        genres[2].save()
+        categories[1].name = 'Роман'
+        categories[1].save()
+        Review.objects.create(
+            title=titles[2], author=user, text='Сильно', score=7,
+        )
+
+        data = by_id(client.get('/api/v1/titles/'))
+        assert data[titles[0].id]['name'] == 'Зелёная миля'
+        assert data[titles[2].id]['genre'][0]['name'] == 'Научная фантастика'
+        assert data[titles[1].id]['category']['name'] == 'Роман'
+        assert data[titles[2].id]['rating'] == 7, (
+            'Проверьте, что новый отзыв меняет ключ фрагмента'
+        )
+
+        titles[1].genre.remove(genres[1])
+        data = by_id(client.get('/api/v1/titles/'))
+        assert len(data[titles[1].id]['genre']) == 1
+
+    @pytest.mark.django_db
+    def test_same_instance_saved_twice(self, client, titles):
+        title = titles[0]
+        version = title.version
+        client.get('/api/v1/titles/')
+        title.name = 'Зелёная миля'
+        title.save()
+        assert title.version == version + 1
+        client.get('/api/v1/titles/')
+        title.name = 'Побег'
+        title.save()
+        title.refresh_from_db()
+        assert title.version == version + 2, (
+            'Проверьте, что повторное сохранение экземпляра не возвращает '
+            'прежнюю версию'
+        )
+        data = by_id(client.get('/api/v1/titles/'))
+        assert data[title.id]['name'] == 'Побег'
+
+    def test_cache_is_bounded(self, settings):
+        options = settings.CACHES[TITLES_CACHE]['OPTIONS']
+        assert options['MAX_ENTRIES'] > 0 and options['CULL_FREQUENCY'] > 1
@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.models import Comment, Review
+
+
+def title_page(client, title):
+    return client.get(
+        f'/api/v1/titles/{title.id}/', {'include': 'reviews,comments'}
+    )
+
+
+def add_comments(review, authors, count):
+    now = timezone.now()
+    for number in range(count):
+        comment = Comment.objects.create(
+            review=review, author=authors[number % len(authors)],
+            text=f'{review.id}-{number}',
+        )
+        Comment.objects.filter(id=comment.id).update(
+            pub_date=now - timedelta(days=number)
+        )
+
+
+class TestTitlePage:
+
+    @pytest.mark.django_db
+    def test_reviews_and_comments_are_embedded(self, client, titles,
+                                               reviews, comments):
+        data = title_page(client, titles[0]).json()
+        assert data['name'] == titles[0].name
+        assert [item['id'] for item in data['reviews']] == list(
+            Review.objects.filter(title=titles[0])
+            .order_by('-pub_date', '-id').values_list('id', flat=True)
+        )
+        by_id = {item['id']: item for item in data['reviews']}
+        review = by_id[comments[0].review_id]
+        assert {item['text'] for item in review['comments']} == {
+            comment.text for comment in comments[:2]
+        }
+        assert review['comments'][0]['author']
+
+        data = client.get(
+            f'/api/v1/titles/{titles[0].id}/', {'include': 'reviews'}
+        ).json()
+        assert 'comments' not in data['reviews'][0]
+
+    @pytest.mark.django_db
+    def test_limits_and_constant_queries(self, client, settings, titles,
+                                         reviews, admin, user, moderator):
+        settings.TITLE_PAGE = {'REVIEWS': 2, 'COMMENTS': 3}
+        authors = [admin, user, moderator]
+        for review in reviews[:2]:
+            add_comments(review, authors, 3)
+        with CaptureQueriesContext(connection) as few:
+            title_page(client, titles[0])
+
+        late = Review.objects.create(
+            title=titles[0], author=moderator, text='Ещё', score=5,
+        )
+        add_comments(late, authors, 10)
+        with CaptureQueriesContext(connection) as many:
+            data = title_page(client, titles[0]).json()
+        assert len(many) == len(few), (
+            'Проверьте, что число запросов не зависит от числа отзывов '
+            'и комментариев'
+        )
+        assert [item['id'] for item in data['reviews']] == [
+            late.id, reviews[1].id
+        ]
+        for review in data['reviews']:
+            texts = [item['text'] for item in review['comments']]
+            assert texts == [f'{review["id"]}-{number}' for number in range(3)]
+
+    @pytest.mark.django_db
+    def test_archived_rows_fill_the_page(self, client, titles, reviews,
+                                         user):
+        add_comments(reviews[0], [user], 4)
+        call_command('archive_old_rows', '--days', '2')
+        data = title_page(client, titles[0]).json()
+        review = {item['id']: item for item in data['reviews']}[reviews[0].id]
+        assert [item['text'] for item in review['comments']] == [
+            f'{reviews[0].id}-{number}' for number in range(3)
+        ], 'Проверьте, что недостающие комментарии дочитываются из архива'
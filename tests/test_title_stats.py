@@ -0,0 +1,76 @@
+import pytest
+from django.core.management import call_command
+
+from api.models import Review, TitleStats
+from api.stats import rebuild_title_stats
+
+
+class TestTitleStats:
+
+    @pytest.mark.django_db
+    def test_histogram_follows_reviews(self, titles, reviews):
+        stats = TitleStats.objects.get(title=titles[0])
+        assert stats.histogram[10] == 1 and stats.histogram[8] == 1
+        assert stats.count == 2
+
+        review = Review.objects.get(pk=reviews[1].pk)
+        review.score = 6
+        review.save()
+        stats.refresh_from_db()
+        assert stats.histogram[8] == 0 and stats.histogram[6] == 1, (
+            'Проверьте, что изменение оценки переносит её в другой столбец'
+        )
+
+        review.delete()
+        stats.refresh_from_db()
+        assert stats.count == 1
+
+    @pytest.mark.django_db
+    def test_title_delete_cascades_reviews(self, titles, reviews):
+        Review.objects.create(
+            title=titles[0], author=reviews[2].author, text='Ещё', score=10,
+        )
+        titles[0].delete()
+        assert not TitleStats.objects.filter(title_id=titles[0].id).exists()
+
+    @pytest.mark.django_db
+    def test_stats_endpoint(self, client, titles, reviews):
+        response = client.get(f'/api/v1/titles/{titles[0].id}/stats/')
+        assert response.status_code == 200
+        data = response.json()
+        assert data['count'] == 2
+        assert data['average'] == 9
+        assert data['median'] == 9
+        assert data['histogram']['10'] == 1
+
+        response = client.get(
+            f'/api/v1/titles/{titles[2].id}/', {'include': 'stats'}
+        )
+        assert response.json()['stats']['count'] == 0
+        assert response.json()['stats']['median'] is None
+
+    @pytest.mark.django_db
+    def test_rebuild_command(self, titles, reviews):
+        TitleStats.objects.all().update(score_10=5)
+        call_command('rebuild_title_stats')
+        stats = TitleStats.objects.get(title=titles[0])
+        assert stats.histogram[10] == 1
+        assert TitleStats.objects.count() == len(titles)
+
+    @pytest.mark.django_db
+    def test_rebuild_writes_only_changed_titles(self, titles, reviews):
+        TitleStats.objects.filter(title=titles[1]).update(score_4=0)
+        TitleStats.objects.filter(title=titles[2]).delete()
+        report = rebuild_title_stats(chunk_size=2)
+        assert report.rows == len(reviews)
+        assert (report.titles, report.changed) == (3, 2), (
+            'Проверьте, что пересчёт пишет только изменившиеся счётчики'
+        )
+        assert TitleStats.objects.get(title=titles[1]).histogram[4] == 1
+        assert TitleStats.objects.get(title=titles[2]).count == 0
+
+        TitleStats.objects.all().update(score_10=7)
+        report = rebuild_title_stats([titles[0].id])
+        assert (report.titles, report.rows) == (1, 2)
+        assert TitleStats.objects.get(title=titles[0]).histogram[10] == 1
+        assert TitleStats.objects.get(title=titles[1]).histogram[10] == 7
@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.models import ArchivedComment, Comment, Review
+
+MY_REVIEWS_URL = '/api/v1/users/me/reviews/'
+MY_COMMENTS_URL = '/api/v1/users/me/comments/'
+
+
+def add_comments(review, author, count):
+    now = timezone.now()
+    for number in range(count):
+        comment = Comment.objects.create(
+            review=review, author=author, text=f'Комментарий {number}',
+        )
+        Comment.objects.filter(id=comment.id).update(
+            pub_date=now - timedelta(days=number)
+        )
+
+
+class TestUserActivity:
+
+    @pytest.mark.django_db
+    def test_my_reviews_across_titles(self, user_client, user, titles,
+                                      reviews):
+        Review.objects.create(
+            title=titles[2], author=user, text='Сильно', score=7,
+        )
+        data = user_client.get(MY_REVIEWS_URL).json()
+        assert data['next'] is None
+        assert [item['title'] for item in data['results']] == [
+            titles[2].name, titles[0].name,
+        ], 'Проверьте, что лента содержит только свои отзывы, новые первыми'
+        assert data['results'][0]['title_id'] == titles[2].id
+
+    @pytest.mark.django_db
+    def test_comments_are_paged_in_constant_queries(self, user_client, user,
+                                                    reviews):
+        add_comments(reviews[0], user, 25)
+        pages, counts, url = [], [], MY_COMMENTS_URL
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                data = user_client.get(url).json()
+            counts.append(len(queries))
+            pages.append(data['results'])
+            url = data['next']
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert len(set(counts)) == 1, (
+            'Проверьте, что число запросов не зависит от страницы'
+        )
+        texts = [item['text'] for page in pages for item in page]
+        assert texts == [f'Комментарий {number}' for number in range(25)]
+        first = pages[0][0]
+        assert first['title'] == reviews[0].title.name
+        assert first['review_author'] == reviews[0].author.username
+
+    @pytest.mark.django_db
+    def test_archived_rows_are_merged(self, user_client, user, reviews):
+        add_comments(reviews[0], user, 15)
+        call_command('archive_old_rows', '--days', '7')
+        data = user_client.get(MY_COMMENTS_URL).json()
+        following = user_client.get(data['next']).json()
+        texts = [
+            item['text'] for item in data['results'] + following['results']
+        ]
+        assert texts == [f'Комментарий {number}' for number in range(15)], (
+            'Проверьте, что лента дочитывает архивные комментарии'
+        )
+        assert following['results'][-1]['title'] == reviews[0].title.name
+
+    @pytest.mark.django_db
+    def test_deleted_review_takes_archived_comments(self, user_client, user,
+                                                    reviews):
+        add_comments(reviews[0], user, 15)
+        add_comments(reviews[1], user, 15)
+        add_comments(reviews[2], user, 15)
+        Comment.objects.update(pub_date=F('pub_date') - timedelta(days=30))
+        call_command('archive_old_rows', '--days', '7')
+        Review.objects.filter(id=reviews[1].id).update(is_hidden=True)
+        review_id = reviews[2].id
+        reviews[2].delete()
+        assert not ArchivedComment.objects.filter(
+            review_id=review_id
+        ).exists(), 'Проверьте, что архивные комментарии удаляются с отзывом'
+
+        data = user_client.get(MY_COMMENTS_URL).json()
+        following = user_client.get(data['next']).json()
+        assert [len(data['results']), len(following['results'])] == [10, 5], (
+            'Проверьте, что недоступные комментарии отсекаются до среза '
+            'страницы'
+        )
+        assert following['next'] is None
+
+    @pytest.mark.django_db
+    def test_access(self, client, user_client, admin_client, user, reviews):
+        assert client.get(MY_REVIEWS_URL).status_code == 401
+        url = f'/api/v1/users/{user.username}/reviews/'
+        assert user_client.get(url).status_code == 403
+        response = admin_client.get(url)
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 1
+        response = admin_client.get(
+            f'/api/v1/users/{user.username}/comments/'
+        )
+        assert response.status_code == 200
+        assert user_client.get(
+            MY_REVIEWS_URL, {'cursor': 'broken'}
+        ).status_code == 404